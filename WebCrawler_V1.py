@@ -1,44 +1,70 @@
 import os
 import warnings
-import time
 from datetime import datetime
-from urllib.parse import urljoin, urlparse
 
 # I'm suppressing warnings right at the start so my console stays clean during runs
 warnings.filterwarnings("ignore")
 # I'm also setting this env var to avoid tokenizer issues in parallel processing
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-# Core imports for data handling and scraping
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from newspaper import Article
+# Core imports for data handling and scraping – pandas is only needed for DataFrame reporting
 import nltk
 from nltk.tokenize import sent_tokenize
-from bs4 import BeautifulSoup
 
-# NLP imports with fallback if transformers aren't installed – I'm handling this gracefully
-try:
-    from transformers import pipeline
-
-    NER_MODEL = "Davlan/bert-base-multilingual-cased-ner-hrl"
-    SENTIMENT_MODEL = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
-    ner_pipeline = pipeline("ner", model=NER_MODEL, aggregation_strategy="simple")
-    sentiment_pipeline = pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
-    print("Transformers pipelines loaded successfully – NER and sentiment are ready!")
-except ImportError as e:
-    print(f"Error: Install transformers with 'pip install transformers torch'. Details: {e}")
-    ner_pipeline = None
-    sentiment_pipeline = None
-except Exception as e:
-    print(f"Warning: Failed to load transformers pipelines: {e}")
-    ner_pipeline = None
-    sentiment_pipeline = None
+from fetcher import ArticleFetcher, build_session
+from article_extract import EXTRACT_MODE, extract_article
+from link_extractor import extract_links, rules_for
+from date_prefilter import DatePrefilter
+from browser_pool import HomepageLoader, print_latency_report
+from crawl_state import CrawlState
+from site_scheduler import get_site_scheduler
+from article_pipeline import Stage, run_pipeline
+from sinks import ARTICLE_COLUMNS, CsvSink, PartitionedSink
+from bulk_writer import BulkWriter, SupabaseTransport
+from metrics import get_metrics, new_run, print_stage_summary
+
+# Timers and counters for this crawl go to the "news" collector – a JSON run report is written to
+# run_reports/ at the end (SAFEGUARD_METRICS=off disables it)
+METRICS_JOB = "news"
+
+# Articles older than this are dropped – before download when the link, the homepage, the
+# site's feeds or a HEAD request date them, otherwise after parsing
+MAX_ARTICLE_AGE_DAYS = 30
+
+# Minimum gap between two requests to the same host – other hosts are fetched meanwhile
+POLITE_DELAY_SECONDS = 2
+
+# Already-fetched article URLs are skipped on later runs. Set this to re-request them with a
+# conditional GET once they are older than this many hours (None = never refetch)
+REVALIDATE_AFTER_HOURS = None
+
+# Per-site overrides, keyed by the homepage URL in site_urls.
+# "render": "static" (default) fetches the homepage over plain HTTP and only falls back to
+# Chrome when it has no links; "js" always loads it in the browser pool.
+# Check the latency report after a run – sites that keep falling back belong here as "js".
+# Link rules live here too: "hosts", "include"/"exclude" path regexes and "max_candidates",
+# e.g. {"https://www.standardmedia.co.ke/": {"include": [r"/article/\d+/"], "exclude": [r"/videos?/"]}}
+# "extract": "full" makes a site always go through Newspaper3k instead of trusting its metadata.
+# "feeds": RSS/sitemap URLs that date its links (besides the feeds its homepage declares), and
+# "head_check": True dates the remaining ones with a HEAD request's Last-Modified.
+SITE_SETTINGS = {}
+
+# NLP – the shared engine loads the transformers pipelines lazily on first use (or talks to a
+# running inference_worker.py), so importing this module no longer pays the model load
+from inference import get_engine
+from analysis_cache import get_cache
+from keyword_matcher import KeywordMatcher
+from near_duplicates import get_near_dup_index
+
+# Syndicated copies of a story (the same wire text on several sites) share a cluster_id, and NER and
+# sentiment run once per cluster – later copies, in this run or a later one, reuse the result.
+# Bump when the models or analysis fields change, so results stored for old clusters are ignored
+CLUSTER_RESULT_KIND = "article-nlp-v1"
+
+# How many texts go through each model call – batching is where most of the CPU time is saved.
+# A partial batch is analyzed once no new article has arrived for NLP_MAX_WAIT seconds.
+NLP_BATCH_SIZE = 16
+NLP_MAX_WAIT = 2.0
 
 # NLTK setup – I'm ensuring the punkt tokenizer is available for sentence splitting
 try:
@@ -64,104 +90,232 @@ except Exception as e:
 
 
 # -------------------------- Helper Functions for Categorization and Analysis --------------------------
+# Bump whenever the keyword lists change, so cached categories from the old lists are ignored
+# (v3: the cached value carries the matched terms too)
+CATEGORY_CACHE_MODEL = "keywords-v3"
+CATEGORY_MATCHER = KeywordMatcher.from_lexicon("article_categories")
+
+
 def categorize_article(text):
     """
-    I'm categorizing the article based on keywords in sentences – now including Swahili and Kikuyu terms for better coverage in Kenyan contexts.
-    This helps flag GBV, Cyberbullying, or Scams articles.
+    I'm looking the category up in the persistent analysis cache first – a repeat run over the same
+    article text skips sentence tokenizing and keyword scanning entirely. The matched keywords are
+    cached with it, so the keyword-hit metrics count every article, cached or not.
     """
     if not text:
         return "Other"
+    cache = get_cache()
+    if cache is None:
+        result = _categorize_uncached(text)
+    else:
+        result = cache.cached("category", CATEGORY_CACHE_MODEL, [text],
+                              lambda texts: [_categorize_uncached(t) for t in texts])[0]
+    get_metrics(METRICS_JOB).keyword_hits(result["terms"])
+    return result["category"]
+
+
+def _categorize_uncached(text):
+    """
+    I'm categorizing the article based on keywords in sentences – now including Swahili and Kikuyu terms for better coverage in Kenyan contexts.
+    This helps flag GBV, Cyberbullying, or Scams articles. Returns {"category", "terms"}, the matched keywords per category.
+    """
     # I'm tokenizing the text into sentences and lowercasing for case-insensitive matching
-    sentences = sent_tokenize(text.lower())
+    lowered = text.lower()
+    sentences = sent_tokenize(lowered)
     scores = {"GBV": 0, "Cyberbullying": 0, "Scams": 0}
 
-    # English keywords – original set
-    gbv_keywords = ['gender based violence', 'gbv', 'domestic violence', 'femicide', 'sexual harassment']
-    cyber_keywords = ['cyberbullying', 'online harassment', 'trolling', 'social media abuse']
-    scam_keywords = ['scam', 'fraud', 'phishing', 'fake investment']
-
-    # Swahili keywords – added for local language coverage
-    gbv_keywords += ['unyanyasaji wa kijinsia', 'unyanyasaji wa nyumbani', 'unyanyasi wa jinsia', 'vurugu za kijinsia']
-    cyber_keywords += ['ubaguzi wa kidijitali', 'unyanyasaji wa mtandaoni', 'unyanyasaji']
-    scam_keywords += ['udanganyifu', 'utapeli', 'mdanganyifu', 'ghashi']
-
-    # Kikuyu keywords – limited terms available, but adding what fits for violence/harassment/scams
-    gbv_keywords += ['kĩũra rũga', 'kĩũra']  # 'kĩũra rũga' for relational violence, 'kĩũra' for harm
-    cyber_keywords += ['kagege']  # Term related to derogatory harassment
-    scam_keywords += ['scam', 'laghai']  # 'laghai' for deceit, borrowing from similar contexts
-
-    # I'm scanning each sentence and incrementing scores based on keyword matches
-    for s in sentences:
-        if any(k in s for k in gbv_keywords):
-            scores["GBV"] += 1
-        if any(k in s for k in cyber_keywords):
-            scores["Cyberbullying"] += 1
-        if any(k in s for k in scam_keywords):
-            scores["Scams"] += 1
+    # English, Swahili and Kikuyu keywords live in lexicon.json and are compiled once into
+    # CATEGORY_MATCHER – one pass over the text gives, per category, how many sentences matched
+    # and which keywords did
+    counts, hits = CATEGORY_MATCHER.scan_segments(lowered, sentences, lowered=True)
+    scores.update(counts)
 
     # Picking the category with the highest score, default to "Other" if none match
     best = max(scores, key=scores.get)
-    return best if scores[best] > 0 else "Other"
+    return {"category": best if scores[best] > 0 else "Other", "terms": hits.terms}
 
 
 def extract_article_links(html, base_url, max_links=10):
     """
-    I'm extracting article links from the HTML soup – limiting to same domain and paths like /news/, /article/, etc.
-    Now set to top 10 per site as requested.
-    """
-    # Parsing the HTML with BeautifulSoup
-    soup = BeautifulSoup(html, "html.parser")
-    links = set()  # Using a set to avoid duplicates
-    # Path indicators for news/article paths – this filters for relevant content
-    path_indicators = ["/news/", "/article/", "/story/", "/kenya/", "/swahili/",
-                       "/kikuyu/"]  # Added more for Kenyan/Swahili/Kikuyu sites
-
-    # Finding all <a> tags with href
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        full_url = urljoin(base_url, href)
-        parsed = urlparse(full_url)
-        # Checking if same domain and path matches indicators
-        if (parsed.netloc == urlparse(base_url).netloc and
-                any(indicator in full_url.lower() for indicator in path_indicators)):
-            links.add(full_url)
-            if len(links) >= max_links:
-                break
-
+    I'm extracting the top article links from a homepage in one pass over the HTML – same domain
+    and article-looking paths (/news/, /article/, ... or the site's own rules in SITE_SETTINGS),
+    newest and most prominent stories first. See link_extractor.py.
+    """
+    links = [link.url for link in extract_links(html, rules_for(base_url, SITE_SETTINGS), max_links)]
     print(f"Extracted {len(links)} unique links matching criteria.")
-    return list(links)[:max_links]
+    return links
 
 
 def analyze_article(text):
     """
     I'm running NER (Named Entity Recognition) and sentiment analysis on the text.
     Using transformers pipelines with fallbacks if not available.
-    Limiting text length to avoid model limits.
+    Long texts are split into token windows that cover the whole article, see chunking.py.
     """
-    if ner_pipeline is None or sentiment_pipeline is None:
-        return {"entities": "Analysis unavailable - install transformers", "sentiment": "N/A", "sentiment_score": 0.0}
+    return analyze_articles([text])[0]
+
 
+def analyze_articles(texts):
+    """
+    Batched version of analyze_article – the shared engine sorts the texts by length and runs
+    each model once per batch instead of once per article. Returns one result dict per text.
+    """
+    metrics = get_metrics(METRICS_JOB)
+    nlp_engine = get_engine()
+    if not nlp_engine.ner_available or not nlp_engine.sentiment_available:
+        load_error = getattr(nlp_engine, "load_error", None)
+        if load_error:
+            print(f"Warning: transformers pipelines unavailable: {load_error}")
+        return [{"entities": "Analysis unavailable - install transformers", "sentiment": "N/A",
+                 "sentiment_score": 0.0} for _ in texts]
+
+    # Same as nlp_engine.analyze(), split so NER and sentiment are timed separately
     try:
-        # NER on first 1400 chars, filtering high-confidence entities
-        ner_text = text[:1400]
-        ents = ner_pipeline(ner_text)
-        entities = " | ".join(set([f"{e['entity_group']}: {e['word']}" for e in ents if e['score'] > 0.8]))
-        entities = entities or "None"
-
-        # Sentiment on first 512 chars
-        sent_text = text[:512]
-        sent = sentiment_pipeline(sent_text)[0]
-        sentiment_label = sent['label'].capitalize()
-        sentiment_score = round(sent['score'], 3)
-
-        return {"entities": entities, "sentiment": sentiment_label, "sentiment_score": sentiment_score}
+        with metrics.timer("ner"):
+            entities = nlp_engine.entities(texts)
+        with metrics.timer("sentiment"):
+            sentiments = nlp_engine.sentiments(texts)
     except Exception as e:
         print(f"Analysis error: {e}")
-        return {"entities": "Error", "sentiment": "N/A", "sentiment_score": 0.0}
+        entities = sentiments = [None] * len(texts)
+
+    analyses = []
+    for ents, sent in zip(entities, sentiments):
+        if ents is None or sent is None:
+            metrics.count("analysis_errors")
+            analyses.append({"entities": "Error", "sentiment": "N/A", "sentiment_score": 0.0})
+        else:
+            analyses.append({"entities": ents or "None", **sent})
+    return analyses
+
+
+def add_analysis(records):
+    """
+    I'm running NLP over a batch of parsed article records and filling in their analysis fields.
+    The batch is clustered into near-duplicates first, and only one text per cluster that has no
+    stored result goes to the models (SAFEGUARD_NEAR_DUP_INDEX=off analyzes every record).
+    """
+    index = get_near_dup_index("articles")
+    if index is None:
+        analyses = analyze_articles([r["full_text"] for r in records])
+    else:
+        analyses = analyze_clustered(records, index)
+    for record, analysis in zip(records, analyses):
+        record.update(analysis)
+        # Every record carries the column, clustered or not (upload_to_supabase selects ARTICLE_COLUMNS)
+        record.setdefault("cluster_id", None)
+        print(f"Added analyzed article: {record['title'][:50]}... (Category: {record['keyword_category']})")
+    return records
+
+
+def analyze_clustered(records, index):
+    """I'm assigning each record its cluster_id and analyzing each cluster at most once."""
+    metrics = get_metrics(METRICS_JOB)
+    with metrics.timer("near_dup"):
+        assignments = index.assign_many([(r["article_url"], r["full_text"]) for r in records])
+    clusters = [a.cluster_id for a in assignments]
+    stored = index.results(clusters, CLUSTER_RESULT_KIND)
+    to_analyze = {}
+    for record, assignment in zip(records, assignments):
+        record["cluster_id"] = assignment.cluster_id
+        if not assignment.new:
+            metrics.count("near_duplicates", key=record["site_url"])
+        if assignment.cluster_id not in stored and assignment.cluster_id not in to_analyze:
+            to_analyze[assignment.cluster_id] = record["full_text"]
+
+    fresh = dict(zip(to_analyze, analyze_articles(list(to_analyze.values())))) if to_analyze else {}
+    # Failed or unavailable analyses aren't stored – the next copy gets another try
+    index.put_results(CLUSTER_RESULT_KIND, {c: a for c, a in fresh.items() if a["sentiment"] != "N/A"})
+    if len(to_analyze) < len(records):
+        metrics.skip("near_duplicate_nlp", n=len(records) - len(to_analyze))
+    results = {**stored, **fresh}
+    return [results[c] for c in clusters]
+
+
+# -------------------------- Pipeline Stages --------------------------
+def parse_article(page):
+    """
+    I'm turning an already-downloaded (site, url, html) page into a partial article record – from the
+    page's JSON-LD/OpenGraph metadata when that's enough, otherwise with Newspaper3k (see article_extract.py).
+    """
+    site, url, html = page
+    print(f"Parsing article: {url}")
+    metrics = get_metrics(METRICS_JOB)
+    with metrics.timer("parse", site):
+        article = extract_article(url, html, SITE_SETTINGS.get(site, {}).get("extract", EXTRACT_MODE))
+    metrics.count(f"extract_{article.method}", key=site)
+    return {
+        "site_url": site,
+        "article_url": url,
+        "title": article.title.strip() if article.title else "No title",
+        "publish_date": article.publish_date,
+        "full_text": article.text.strip(),
+    }
+
+
+def filter_article(record):
+    """I'm dropping old (>MAX_ARTICLE_AGE_DAYS) and very short (<150 chars) articles – returns None when skipped."""
+    metrics = get_metrics(METRICS_JOB)
+    # Skipping old articles – only recent (<30 days)
+    if record["publish_date"]:
+        age_days = (datetime.now() - record["publish_date"]).days
+        if age_days > MAX_ARTICLE_AGE_DAYS:
+            print(f"Skipping old article (age: {age_days} days)")
+            metrics.skip("old", key=record["site_url"])
+            return None
+
+    # Skipping very short articles
+    if len(record["full_text"]) < 150:
+        print("Skipping short article (<150 chars)")
+        metrics.skip("short", key=record["site_url"])
+        return None
+    return record
+
+
+def categorize_record(record):
+    """I'm adding the keyword category and summary snippet, and trimming the publish date to a date."""
+    text = record["full_text"]
+    # Categorizing based on keywords (now multilingual)
+    with get_metrics(METRICS_JOB).timer("keywords", record["site_url"]):
+        record["keyword_category"] = categorize_article(text)
+    record["summary_snippet"] = (text[:200] + "...") if len(text) > 200 else text
+    # Preparing publish date
+    record["publish_date"] = record["publish_date"].date() if record["publish_date"] else None
+    return record
+
+
+def process_article(site, url, html):
+    """
+    I'm running one page through parse -> filter -> categorize without the pipeline threads.
+    Returns the article record (NLP fields are filled in later, in batches by add_analysis),
+    or None when the article is skipped.
+    """
+    record = filter_article(parse_article((site, url, html)))
+    return categorize_record(record) if record else None
+
+
+def article_stages(crawl_state=None):
+    """
+    Parsed articles flow through these stages one by one; NLP runs on batches of NLP_BATCH_SIZE,
+    or on whatever has arrived after NLP_MAX_WAIT seconds. I'm marking the articles the filter
+    drops as processed in crawl_state straight away – nothing of theirs has to reach a sink.
+    """
+    def filter_stage(record):
+        kept = filter_article(record)
+        if kept is None and crawl_state is not None:
+            crawl_state.mark_processed([record["article_url"]])
+        return kept
+
+    return [
+        Stage("parse", parse_article),
+        Stage("filter", filter_stage),
+        Stage("categorize", categorize_record),
+        Stage("analyze", add_analysis, batch_size=NLP_BATCH_SIZE, max_wait=NLP_MAX_WAIT),
+    ]
 
 
 # -------------------------- Main Scraper Function --------------------------
-def main_scraper(site_urls=[
+SITE_URLS = [
     'https://www.tuko.co.ke',
     'https://www.citizen.digital',
     'https://pressrelease.co.ke',
@@ -179,106 +333,217 @@ def main_scraper(site_urls=[
     'https://habarinow.com/',
     # Kikuyu site
     'https://corofm.kbc.co.ke/'
-], max_articles=10):
+]
+
+
+def _no_visit(site, **amounts):
+    pass
+
+
+def find_article_links(homepages, budgets, fetcher, visit=_no_visit):
     """
-    This is the heart of my scraper – loading sites with Selenium, extracting links, parsing articles with Newspaper3k,
-    filtering recent ones (<30 days), categorizing, analyzing, and collecting into a DataFrame.
-    Now scraping top 10 articles per site, and including all the requested Kenyan/Swahili/Kikuyu sites.
+    I'm turning loaded homepages into the url -> site links worth downloading: each site's best
+    budgets[site] links, minus the ones the date pre-filter knows are stale. `visit` hears what
+    each site's visit cost (SiteScheduler.add).
     """
-    data = []  # List to hold all article dicts
+    metrics = get_metrics(METRICS_JOB)
+    candidates = {}
+    for page in homepages:
+        metrics.observe("homepage", page.latency, page.site)
+        visit(page.site, homepage_s=page.latency)
+        if page.fell_back:
+            metrics.count("homepage_fallbacks", key=page.site)
+        if page.error or not page.html:
+            print(f"Failed to load site {page.site}: {page.error}")
+            metrics.count("homepage_errors", key=page.site)
+            visit(page.site, errors=1)
+            continue
+        # Extracting links specific to this site – a few spare ones, so links the date
+        # pre-filter drops can be replaced by the next best
+        with metrics.timer("links", page.site):
+            links = extract_links(page.html, rules_for(page.site, SITE_SETTINGS), budgets[page.site] * 2)
+        candidates[page.site] = (links, page.html)
+
+    # Dropping links that are clearly older than MAX_ARTICLE_AGE_DAYS before they're downloaded
+    prefilter = DatePrefilter(fetcher, MAX_ARTICLE_AGE_DAYS)
+    with metrics.timer("prefilter"):
+        fresh = prefilter.filter_sites(candidates, budgets, SITE_SETTINGS)
+    prefilter.print_report()
+
+    site_links = {}
+    for site, links in fresh.items():
+        report = prefilter.reports[site]
+        metrics.skip("stale", key=site, n=report.avoided)
+        metrics.count("prefilter_requests", report.requests, key=site)
+        links = links[:budgets[site]]
+        visit(site, links=len(links))
+        print(f"\n--- Links from site: {site} ---")
+        print(f"Extracted {len(links)} unique links matching criteria.")
+        metrics.count("links_found", len(links), key=site)
+        for link in links:
+            if link.url in site_links:
+                metrics.skip("duplicate", key=site)
+                continue
+            site_links[link.url] = site
+    return site_links
+
+
+def download_articles(site_links, fetcher, crawl_state, visit=_no_visit, on_skip=None):
+    """
+    I'm downloading the links we haven't fetched on earlier runs – or revalidating them with a
+    conditional GET when REVALIDATE_AFTER_HOURS is set – concurrently, and yielding (site, url, html)
+    for each new page as soon as it arrives. on_skip(url, error) hears about every link that isn't
+    yielded: error is None when it was already processed or came back unchanged. A yielded page is
+    only recorded as fetched – the caller marks it processed once its record is persisted.
+    """
+    metrics = get_metrics(METRICS_JOB)
+    on_skip = on_skip or (lambda url, error: None)
+    plan = crawl_state.plan(site_links)
+    for url in plan.skipped:
+        metrics.skip("seen", key=site_links[url])
+        on_skip(url, None)
+
+    for result in fetcher.fetch_many(plan.to_fetch, headers=plan.conditional_headers):
+        site = site_links[result.url]
+        metrics.observe("download", result.elapsed, site)
+        visit(site, download_s=result.elapsed)
+        if result.not_modified:
+            crawl_state.mark_unchanged(result.url, site)
+            metrics.skip("unchanged", key=site)
+            on_skip(result.url, None)
+            continue
+        if not result.ok:
+            print(f"Error fetching {result.url}: {result.error or result.status}")
+            metrics.count("fetch_errors", key=site)
+            visit(site, errors=1)
+            on_skip(result.url, f"fetch failed: {result.error or result.status}")
+            continue
+        if not crawl_state.record(result.url, site, result.html, result.headers):
+            print(f"Unchanged since last fetch: {result.url}")
+            metrics.skip("unchanged", key=site)
+            on_skip(result.url, None)
+            continue
+        visit(site, downloaded=1)
+        yield site, result.url, result.html
 
-    # Selenium setup – I'm configuring headless Chrome to run invisibly and stealthily
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option("useAutomationExtension", False)
 
-    driver = None
+def fetch_article_pages(site_urls=SITE_URLS, max_articles=10, max_workers=16, per_host=2, browser_pool_size=3,
+                        session=None, scheduler=None, crawl_state=None):
+    """
+    I'm loading every homepage, extracting its article links and downloading the new ones concurrently.
+    Yields (site, url, html) pages as soon as each download completes. Pass a session to reuse its
+    keep-alive connections across crawls (the service does). With a scheduler (site_scheduler.py),
+    only the sites it picks are crawled, each with its own link budget instead of max_articles,
+    and what each visit cost is added to the scheduler's history. Pass a crawl_state to mark the
+    pages processed yourself (run_crawl does); otherwise I open one and nothing gets marked.
+    """
+    metrics = get_metrics(METRICS_JOB)
+    session = session or build_session(pool_maxsize=max_workers)
+    budgets = dict.fromkeys(site_urls, max_articles)
+    visit = scheduler.add if scheduler is not None else _no_visit
+    if scheduler is not None:
+        schedule = scheduler.plan(site_urls, max_articles, POLITE_DELAY_SECONDS)
+        scheduler.print_plan(schedule)
+        for site, reason in schedule.deferred.items():
+            metrics.skip(f"site_{reason}", key=site)
+        site_urls, budgets = schedule.sites, schedule.budgets
+
+    # First pass: loading every homepage concurrently – plain HTTP for static sites, a pool of
+    # headless Chrome drivers only for sites marked as needing JavaScript
+    with HomepageLoader(SITE_SETTINGS, pool_size=browser_pool_size, session=session) as loader:
+        homepages = loader.load_all(site_urls)
+    print_latency_report(homepages)
+
+    # One fetcher for feeds, HEADs and articles – hosts are fetched in parallel, while each host
+    # still gets POLITE_DELAY_SECONDS between requests
+    fetcher = ArticleFetcher(max_workers=max_workers, per_host=per_host,
+                             min_host_interval=POLITE_DELAY_SECONDS, session=session)
+    own_state = crawl_state is None
     try:
-        # Initializing the Chrome driver with webdriver-manager for auto-updates
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        # Hiding the webdriver property to avoid detection
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => false});")
-        print("Chrome driver initialized in headless mode – ready to browse.")
-    except Exception as e:
-        print(f"Failed to init Chrome: {e}. Install Chrome and run 'pip install selenium webdriver-manager'.")
-        return pd.DataFrame()
+        site_links = find_article_links(homepages, budgets, fetcher, visit)
+        # Second pass: downloading every new article concurrently – already-processed links are
+        # skipped before any download/parse/NLP work
+        if own_state:
+            crawl_state = CrawlState(revalidate_after_hours=REVALIDATE_AFTER_HOURS)
+        yield from download_articles(site_links, fetcher, crawl_state, visit)
+    finally:
+        fetcher.close()
+        if own_state and crawl_state is not None:
+            crawl_state.print_report()
+            crawl_state.close()
+
+
+def iter_articles(site_urls=SITE_URLS, max_articles=10, max_workers=16, per_host=2, browser_pool_size=3,
+                  session=None, scheduler=None, crawl_state=None):
+    """
+    This is the heart of my scraper – a streaming pipeline of fetch -> parse -> filter -> categorize -> analyze.
+    Stages run concurrently with bounded queues between them, and each analyzed article is yielded
+    as soon as it's ready, so memory stays flat no matter how big the crawl is.
+    """
+    pages = fetch_article_pages(site_urls, max_articles, max_workers, per_host, browser_pool_size, session, scheduler,
+                                crawl_state)
+    yield from run_pipeline(pages, article_stages(crawl_state))
 
-    # Looping through each site in the expanded list
-    for site in site_urls:
-        print(f"\n--- Loading site: {site} ---")
-        try:
-            # Getting the site page
-            driver.get(site)
-            # Waiting for body to load
-            WebDriverWait(driver, 60).until(EC.presence_of_element_located(("tag name", "body")))
-            time.sleep(10)  # Brief pause to let dynamic content load
-
-            # Extracting links specific to this site
-            html = driver.page_source
-            links = extract_article_links(html, site, max_articles)
-
-            # Processing each link
-            for url in links:
-                try:
-                    print(f"Fetching article: {url}")
-                    # Downloading and parsing with Newspaper3k
-                    article = Article(url)
-                    article.download()
-                    time.sleep(2)  # Polite delay between requests
-                    article.parse()
-
-                    # Skipping old articles – only recent (<30 days)
-                    if article.publish_date:
-                        age_days = (datetime.now() - article.publish_date).days
-                        if age_days > 30:
-                            print(f"Skipping old article (age: {age_days} days)")
-                            continue
-
-                    # Skipping very short articles
-                    text = article.text.strip()
-                    if len(text) < 150:
-                        print("Skipping short article (<150 chars)")
-                        continue
-
-                    # Categorizing based on keywords (now multilingual)
-                    category = categorize_article(text)
-
-                    # Running NLP analysis
-                    analysis = analyze_article(text)
-
-                    # Preparing publish date
-                    pub_date = article.publish_date.date() if article.publish_date else None
-
-                    # Appending to data list
-                    data.append({
-                        "site_url": site,
-                        "article_url": url,
-                        "title": article.title.strip() if article.title else "No title",
-                        "publish_date": pub_date,
-                        "keyword_category": category,
-                        "summary_snippet": (text[:200] + "...") if len(text) > 200 else text,
-                        "full_text": text,
-                        "entities": analysis["entities"],
-                        "sentiment": analysis["sentiment"],
-                        "sentiment_score": analysis["sentiment_score"]
-                    })
-                    print(f"Added analyzed article: {article.title[:50]}... (Category: {category})")
-                except Exception as e:
-                    print(f"Error processing {url}: {e}")
-                    continue
-        except Exception as e:
-            print(f"Failed to load site {site}: {e}")
-            continue
 
-    # Cleaning up the driver
-    if driver:
-        driver.quit()
+def _count_relevant(scheduler, record):
+    # Relevant = made it past the age, length and keyword checks into a real category
+    if scheduler is not None:
+        scheduler.add(record["site_url"], saved=1, relevant=int(record.get("keyword_category") != "Other"))
+
 
+def run_crawl(sinks, scheduler=None, **crawl_args):
+    """
+    I'm writing every article to all sinks the moment it's analyzed. Returns the article count.
+    The run's timings and counters end up in a JSON report under run_reports/, and with a
+    scheduler each site's visit goes into its history once the crawl completes.
+    """
+    metrics = get_metrics(METRICS_JOB)
+    crawl_state = CrawlState(revalidate_after_hours=REVALIDATE_AFTER_HOURS)
+    written = []
+    count = 0
+    try:
+        for record in iter_articles(scheduler=scheduler, crawl_state=crawl_state, **crawl_args):
+            with metrics.timer("write", record["site_url"]):
+                for sink in sinks:
+                    sink.write(record)
+            written.append(record["article_url"])
+            metrics.count("articles_saved", key=record["site_url"])
+            _count_relevant(scheduler, record)
+            count += 1
+        if scheduler is not None:
+            scheduler.finish()
+    finally:
+        try:
+            for sink in sinks:
+                sink.close()
+            # The sinks buffer, so only now are these records persisted – anything downloaded but
+            # not written by here (a crash, a failed batch) is fetched again on the next run
+            crawl_state.mark_processed(written)
+        finally:
+            crawl_state.print_report()
+            crawl_state.close()
+        if metrics.enabled:
+            metrics.finish()
+            print_stage_summary(metrics.report())
+    print(f"\nScraping complete. Streamed {count} articles across all sites.")
+    return count
+
+
+def main_scraper(site_urls=SITE_URLS, max_articles=10, max_workers=16, per_host=2, browser_pool_size=3,
+                 scheduler=None):
+    """
+    Collects the whole crawl into a DataFrame – only for reporting/notebooks, the scheduled run streams
+    through run_crawl instead. Needs pandas. The articles aren't marked processed in the crawl state
+    (nothing here persists them), so the next crawl downloads them again.
+    """
+    import pandas as pd
+
+    data = []
+    for record in iter_articles(site_urls, max_articles, max_workers, per_host, browser_pool_size, scheduler=scheduler):
+        _count_relevant(scheduler, record)
+        data.append(record)
+    if scheduler is not None:
+        scheduler.finish()
     print(f"\nScraping complete. Collected {len(data)} articles across all sites.")
     return pd.DataFrame(data) if data else pd.DataFrame()
 
@@ -287,8 +552,10 @@ def main_scraper(site_urls=[
 def upload_to_supabase(df):
     """
     I'm upserting the DataFrame to Supabase 'scraped_articles' table, using article_url as conflict key to avoid duplicates.
-    Also saving a local CSV backup.
+    Also adding the rows to the local date-partitioned archive (new part files, nothing rewritten).
     """
+    import pandas as pd
+
     if df.empty:
         print("No data to upload – nothing scraped.")
         return
@@ -302,16 +569,17 @@ def upload_to_supabase(df):
     df['publish_date'] = df['publish_date'].dt.strftime('%Y-%m-%d').where(pd.notna(df['publish_date']), None)
 
     # Ensuring columns match the table schema
-    cols = ["site_url", "article_url", "title", "publish_date", "keyword_category",
-            "summary_snippet", "full_text", "entities", "sentiment", "sentiment_score"]
-    final_df = df[cols].copy()
+    final_df = df[ARTICLE_COLUMNS].copy()
 
     # Converting to list of dicts for Supabase
     records = final_df.to_dict(orient="records")
 
-    # Local backup – always save CSV for safety
-    final_df.to_csv("scraped_articles.csv", index=False, encoding="utf-8")
-    print(f"Saved local backup: scraped_articles.csv ({len(final_df)} articles)")
+    # Local backup – always archive for safety
+    archive = PartitionedSink()
+    for record in records:
+        archive.write(record)
+    archive.close()
+    print(f"Saved local backup: {archive.root}/ ({archive.count} articles, {len(archive.files)} files)")
 
     # Upsert to Supabase
     try:
@@ -332,14 +600,33 @@ if __name__ == "__main__":
     print("=== My Upgraded Article Scraper & Analyzer Starting (Target: scraped_articles table) ===")
     print(f"Current date/time: {datetime.now()} – scraping recent articles only.")
 
-    # Running the scraper with expanded sites and top 10 per site
-    raw_df = main_scraper(max_articles=10)
+    # Running the scraper with expanded sites and top 10 per site – every analyzed article is appended to
+    # the CSV backup and upserted to Supabase in retried batches as soon as it's ready (batches that
+    # can't be sent are spooled to disk and replayed on the next run). The date-partitioned archive
+    # (Parquet when pyarrow is installed) gets the same records, flushed in part files.
+    metrics = new_run(METRICS_JOB)
+    sinks = [CsvSink("scraped_articles.csv"), PartitionedSink()]
+    if supabase is not None:
+        sinks.append(BulkWriter(SupabaseTransport(supabase), "scraped_articles", on_conflict="article_url",
+                                columns=ARTICLE_COLUMNS, batch_size=50, metrics=metrics))
+    else:
+        print("Supabase not initialized. Saving to the local CSV only.")
+    # Sites that keep yielding nothing are visited less often and high-yield ones get more links
+    # (site_scheduler.py, SAFEGUARD_SITE_SCHEDULE=off crawls every site with 10 links every run)
+    count = run_crawl(sinks, scheduler=get_site_scheduler(), max_articles=10)
 
-    if raw_df.empty:
+    if count == 0:
         print(
-            "No articles scraped. Check: Sites up? Adjust path_indicators in extract_article_links? Increase timeouts?")
+            "No articles scraped. Check: Sites up? Adjust the link rules in SITE_SETTINGS? Increase timeouts?")
     else:
-        print(f"\nUploading {len(raw_df)} analyzed articles to Supabase...")
-        upload_to_supabase(raw_df)
+        print(f"Saved {count} analyzed articles to scraped_articles.csv.")
+    print(f"Archive: {sinks[1].root}/ ({sinks[1].fmt}, {len(sinks[1].files)} part files)")
+    if len(sinks) > 2:
+        print(f"Supabase writer: {sinks[2].stats}")
+
+    if get_cache() is not None:
+        print(f"Analysis cache: {get_cache().stats()}")
+    if get_near_dup_index("articles") is not None:
+        print(f"Near-duplicate clusters: {get_near_dup_index('articles').summary()}")
 
     print("\n=== All done! Check CSV file and Supabase 'scraped_articles' table. ===")
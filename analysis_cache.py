@@ -0,0 +1,177 @@
+"""
+Persistent cache of NLP/categorization results, keyed by content.
+
+Keys are sha256(normalized text + model name), so the same article text or a tweet repeated
+under several keywords is only analyzed once, across runs. Entries expire after ttl_days and
+the table is trimmed to max_entries (least recently used first). Hit/miss counters are kept
+per process.
+
+    SAFEGUARD_ANALYSIS_CACHE=analysis_cache.sqlite   (default; "off" disables the cache)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Optional
+
+CACHE_PATH = os.getenv("SAFEGUARD_ANALYSIS_CACHE", "analysis_cache.sqlite")
+CACHE_TTL_DAYS = float(os.getenv("SAFEGUARD_ANALYSIS_CACHE_TTL_DAYS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("SAFEGUARD_ANALYSIS_CACHE_MAX_ENTRIES", "200000"))
+EVICT_EVERY_PUTS = 1000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    # Case is kept – the NER model is cased – but Unicode form and whitespace are not significant
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(kind: str, model: str, text: str) -> str:
+    return hashlib.sha256(f"{kind}\0{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, path: str = CACHE_PATH, ttl_days: float = CACHE_TTL_DAYS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS analysis_cache (
+            key TEXT PRIMARY KEY, kind TEXT NOT NULL, result TEXT NOT NULL,
+            created_at REAL NOT NULL, last_used REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache(last_used)")
+        self.evict()
+
+    def get_many(self, kind: str, model: str, texts: List[str]) -> List:
+        """Cached results in input order, None where there's no fresh entry."""
+        keys = [cache_key(kind, model, t) for t in texts]
+        now = time.time()
+        found: Dict[str, object] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, result FROM analysis_cache WHERE created_at >= ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})", [now - self.ttl, *chunk]).fetchall()
+                found.update((k, json.loads(r)) for k, r in rows)
+            if found:
+                self._db.executemany("UPDATE analysis_cache SET last_used = ? WHERE key = ?",
+                                     [(now, k) for k in found])
+                self._db.commit()
+            results = [found.get(k) for k in keys]
+            hits = sum(r is not None for r in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def get(self, kind: str, model: str, text: str):
+        return self.get_many(kind, model, [text])[0]
+
+    def put_many(self, kind: str, model: str, texts: List[str], results: List):
+        now = time.time()
+        rows = [(cache_key(kind, model, t), kind, json.dumps(r, ensure_ascii=False), now, now)
+                for t, r in zip(texts, results) if r is not None]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO analysis_cache VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+            self._puts += len(rows)
+            due = self._puts >= EVICT_EVERY_PUTS
+        if due:
+            self.evict()
+
+    def put(self, kind: str, model: str, text: str, result):
+        self.put_many(kind, model, [text], [result])
+
+    def cached(self, kind: str, model: str, texts: List[str], compute: Callable[[List[str]], List]) -> List:
+        """Looks texts up, computes only the unique misses, stores them and returns all results in order."""
+        results = self.get_many(kind, model, texts)
+        missing = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+        if missing:
+            fresh = dict(zip(missing, compute(missing)))
+            self.put_many(kind, model, missing, [fresh[t] for t in missing])
+            results = [fresh[t] if r is None else r for t, r in zip(texts, results)]
+        return results
+
+    def evict(self) -> int:
+        """Drops expired entries, then the least recently used ones beyond max_entries."""
+        with self._lock:
+            self._puts = 0
+            removed = self._db.execute("DELETE FROM analysis_cache WHERE created_at < ?",
+                                       (time.time() - self.ttl,)).rowcount
+            count = self._db.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+            if count > self.max_entries:
+                removed += self._db.execute(
+                    "DELETE FROM analysis_cache WHERE key IN "
+                    "(SELECT key FROM analysis_cache ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)).rowcount
+            self._db.commit()
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": entries,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachedEngine:
+    """Puts an AnalysisCache in front of an InferenceEngine (or the remote worker client)."""
+
+    def __init__(self, engine, cache: AnalysisCache, ner_model: str, sentiment_model: str):
+        self.engine = engine
+        self.cache = cache
+        self.ner_model = ner_model
+        self.sentiment_model = sentiment_model
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    @property
+    def ner_available(self) -> bool:
+        return self.engine.ner_available
+
+    @property
+    def sentiment_available(self) -> bool:
+        return self.engine.sentiment_available
+
+    def entities(self, texts: List[str]) -> List[Optional[str]]:
+        return self.cache.cached("ner", self.ner_model, texts, self.engine.entities)
+
+    def sentiments(self, texts: List[str]) -> List[Optional[Dict]]:
+        return self.cache.cached("sentiment", self.sentiment_model, texts, self.engine.sentiments)
+
+    def analyze(self, texts: List[str]) -> List[Optional[Dict]]:
+        return [None if ents is None or sent is None else {"entities": ents, **sent}
+                for ents, sent in zip(self.entities(texts), self.sentiments(texts))]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[AnalysisCache]:
+    """The process-wide cache, or None when SAFEGUARD_ANALYSIS_CACHE=off."""
+    global _cache
+    if CACHE_PATH.lower() in ("off", "none", ""):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache(CACHE_PATH)
+        return _cache
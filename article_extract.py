@@ -0,0 +1,158 @@
+"""
+Article extraction from HTML the crawler has already fetched.
+
+Two modes, per site via SITE_SETTINGS["extract"] or for all sites via SAFEGUARD_EXTRACT_MODE:
+
+    full   newspaper's Article.parse() on the prefetched HTML – no second download
+    fast   (default) title, publish date and body from the page's own metadata: a JSON-LD
+           NewsArticle/Article object (headline, datePublished, articleBody), OpenGraph /
+           article:published_time tags, and the <p> paragraphs of <article> or the
+           itemprop="articleBody" element. Falls back to the full parse when that gives no
+           title or less than MIN_FAST_TEXT characters of body.
+
+Both return the same ArticleData; `method` says which one produced it. HTML may be passed as
+str or bytes.
+"""
+import html as html_lib
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
+
+from fetcher import decode_html
+
+EXTRACT_MODES = ("fast", "full")
+EXTRACT_MODE = os.getenv("SAFEGUARD_EXTRACT_MODE", "fast").lower()
+# Same bar filter_article applies – anything shorter goes to the full parse, which may find more
+MIN_FAST_TEXT = 150
+
+ARTICLE_TYPES = {"newsarticle", "article", "reportagenewsarticle", "blogposting", "analysisnewsarticle",
+                 "opinionnewsarticle", "backgroundnewsarticle"}
+
+_JSON_LD = re.compile(r"""<script[^>]+type\s*=\s*["']application/ld\+json["'][^>]*>(.*?)</script>""", re.S | re.I)
+_META = re.compile(r"<meta\b[^>]*>", re.I)
+_ATTR = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.S | re.I)
+_BODY_REGION = re.compile(r"<article\b[^>]*>(.*?)</article>|<[^>]+itemprop\s*=\s*[\"']articleBody[\"'][^>]*>(.*)",
+                          re.S | re.I)
+_PARAGRAPH = re.compile(r"<p\b[^>]*>(.*?)</p>", re.S | re.I)
+_SCRIPT = re.compile(r"<(script|style)\b.*?</\1\s*>", re.S | re.I)
+_TAGS = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"[ \t\r\n ]+")
+
+
+@dataclass
+class ArticleData:
+    title: str
+    publish_date: Optional[datetime]
+    text: str
+    method: str  # "json-ld", "meta" or "newspaper"
+
+
+def _clean(fragment: str) -> str:
+    return _SPACE.sub(" ", html_lib.unescape(_TAGS.sub(" ", fragment))).strip()
+
+
+def parse_date(value) -> Optional[datetime]:
+    """ISO 8601 as found in metadata, as a naive local datetime (what filter_article compares with)."""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip().replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = datetime.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def _json_ld_objects(page: str) -> Iterator[Dict]:
+    for block in _JSON_LD.findall(page):
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        stack: List = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                if "@graph" in item:
+                    stack.extend(item["@graph"] if isinstance(item["@graph"], list) else [item["@graph"]])
+                yield item
+
+
+def _is_article(obj: Dict) -> bool:
+    types = obj.get("@type")
+    types = types if isinstance(types, list) else [types]
+    return any(isinstance(t, str) and t.lower() in ARTICLE_TYPES for t in types)
+
+
+def _meta_tags(page: str) -> Dict[str, str]:
+    tags: Dict[str, str] = {}
+    for tag in _META.findall(page):
+        attrs = {k.lower(): (a if a is not None else b) for k, a, b in _ATTR.findall(tag)}
+        key = (attrs.get("property") or attrs.get("name") or attrs.get("itemprop") or "").lower()
+        if key and "content" in attrs and key not in tags:
+            tags[key] = html_lib.unescape(attrs["content"]).strip()
+    return tags
+
+
+def _body_paragraphs(page: str) -> str:
+    m = _BODY_REGION.search(page)
+    if not m:
+        return ""
+    region = _SCRIPT.sub(" ", m.group(1) if m.group(1) is not None else m.group(2))
+    paragraphs = (_clean(p) for p in _PARAGRAPH.findall(region))
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+def from_metadata(page: Union[str, bytes]) -> Optional[ArticleData]:
+    """The fast path – None when the page's metadata isn't enough to skip the full parse."""
+    if isinstance(page, bytes):
+        page = decode_html(page)
+    article = next((obj for obj in _json_ld_objects(page) if _is_article(obj)), None)
+    meta = _meta_tags(page)
+
+    title = (article or {}).get("headline") or meta.get("og:title") or meta.get("twitter:title")
+    if not title:
+        m = _TITLE.search(page)
+        title = _clean(m.group(1)) if m else ""
+    published = (parse_date((article or {}).get("datePublished"))
+                 or parse_date(meta.get("article:published_time"))
+                 or parse_date(meta.get("datepublished")))
+    body = (article or {}).get("articleBody")
+    method = "json-ld"
+    if not isinstance(body, str) or len(body) < MIN_FAST_TEXT:
+        body, method = _body_paragraphs(page), "meta"
+    else:
+        body = html_lib.unescape(body).strip()
+    if not title or len(body) < MIN_FAST_TEXT:
+        return None
+    return ArticleData(_clean(str(title)), published, body, method)
+
+
+def parse_full(url: str, page: Union[str, bytes]) -> ArticleData:
+    from newspaper import Article
+
+    if isinstance(page, bytes):
+        page = decode_html(page)
+    article = Article(url)
+    article.download(input_html=page)  # no request – newspaper just takes the HTML
+    article.parse()
+    return ArticleData(article.title or "", article.publish_date, article.text or "", "newspaper")
+
+
+def extract_article(url: str, page: Union[str, bytes], mode: str = EXTRACT_MODE) -> ArticleData:
+    if mode not in EXTRACT_MODES:
+        raise ValueError(f"unknown extract mode {mode!r} (expected one of {', '.join(EXTRACT_MODES)})")
+    if mode == "fast":
+        data = from_metadata(page)
+        if data is not None:
+            return data
+    return parse_full(url, page)
@@ -0,0 +1,148 @@
+"""
+A small threaded streaming pipeline: source -> stage -> stage -> ... -> consumer.
+
+Every stage runs in its own thread and talks to the next through a bounded queue, so a slow
+stage applies back-pressure instead of letting items pile up in memory, and items reach the
+consumer as soon as they are ready rather than when the whole crawl is done.
+
+A stage function takes one item and returns the (possibly updated) item, or None to drop it.
+Batch stages (batch_size set) take a list and return a list; a partial batch is flushed after
+max_wait seconds without new input. An exception drops the item (or batch) and is reported,
+the pipeline keeps going. If the consumer stops early (breaks out, or raises), every thread
+winds down and the source is closed, so its own cleanup (a generator's finally) still runs.
+"""
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+_DONE = object()
+# How often a blocked put/get looks up to see whether the pipeline was stopped
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable
+    batch_size: Optional[int] = None
+    max_wait: float = 1.0
+
+
+def _put(q: "queue.Queue", item, stop: threading.Event) -> bool:
+    """q.put that gives up once the pipeline is stopped. Returns False when it gave up."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: "queue.Queue", stop: threading.Event, timeout: Optional[float] = None):
+    """q.get that returns _DONE once the pipeline is stopped; raises queue.Empty after timeout."""
+    waited = 0.0
+    while not stop.is_set():
+        wait = _POLL_SECONDS if timeout is None else min(_POLL_SECONDS, timeout - waited)
+        try:
+            return q.get(timeout=wait)
+        except queue.Empty:
+            waited += wait
+            if timeout is not None and waited >= timeout:
+                raise
+    return _DONE
+
+
+def _feed(source: Iterable, out_q: "queue.Queue", errors: List, stop: threading.Event):
+    try:
+        for item in source:
+            if not _put(out_q, item, stop):
+                break
+    except Exception as e:
+        errors.append(e)
+    finally:
+        # Closing the source here, in the thread that iterated it, runs its cleanup even when
+        # the consumer gave up halfway
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+        _put(out_q, _DONE, stop)
+
+
+def _run_stage(stage: Stage, in_q: "queue.Queue", out_q: "queue.Queue", stop: threading.Event):
+    try:
+        if stage.batch_size:
+            _run_batch_stage(stage, in_q, out_q, stop)
+            return
+        while True:
+            item = _get(in_q, stop)
+            if item is _DONE:
+                return
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                print(f"[{stage.name}] dropped item: {e}")
+                continue
+            if result is not None and not _put(out_q, result, stop):
+                return
+    finally:
+        _put(out_q, _DONE, stop)
+
+
+def _run_batch_stage(stage: Stage, in_q: "queue.Queue", out_q: "queue.Queue", stop: threading.Event):
+    batch: List[Any] = []
+    done = False
+    while not done:
+        try:
+            item = _get(in_q, stop, timeout=stage.max_wait if batch else None)
+        except queue.Empty:
+            item = None
+        if item is _DONE:
+            if stop.is_set():
+                return
+            done = True
+        elif item is not None:
+            batch.append(item)
+            if len(batch) < stage.batch_size:
+                continue
+        if not batch:
+            continue
+        try:
+            results = stage.fn(batch)
+        except Exception as e:
+            print(f"[{stage.name}] dropped batch of {len(batch)}: {e}")
+            results = []
+        for result in results:
+            if result is not None and not _put(out_q, result, stop):
+                return
+        batch = []
+
+
+def run_pipeline(source: Iterable, stages: List[Stage], queue_size: int = 32) -> Iterator:
+    """Streams source through the stages, yielding finished items in completion order."""
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    errors: List[Exception] = []
+    stop = threading.Event()
+    threads = [threading.Thread(target=_feed, args=(source, queues[0], errors, stop), name="pipeline-source",
+                                daemon=True)]
+    for i, stage in enumerate(stages):
+        threads.append(threading.Thread(target=_run_stage, args=(stage, queues[i], queues[i + 1], stop),
+                                        name=f"pipeline-{stage.name}", daemon=True))
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        # A no-op after a normal finish; when the consumer stopped early, the blocked threads
+        # give up their puts and the source gets closed before we return
+        stop.set()
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,133 @@
+"""
+Equivalence and speed of the NLP backends (SAFEGUARD_NLP_BACKEND): pipeline, int8, onnx.
+
+    python benchmarks/bench_backends.py
+    python benchmarks/bench_backends.py --backends pipeline int8 --threads 4
+    python benchmarks/bench_backends.py --ner-model <tiny ner model> --sentiment-model <tiny cls model>
+
+Each backend runs in its own child process so its peak RSS is its own. A child loads both
+pipelines, analyzes the language fixtures plus stand-in articles in one batched call, then
+times single short texts for latency. The parent compares every backend's output with the
+first one's: sentiment label agreement, mean |score difference| and entity-set overlap
+(Jaccard). Needs transformers + torch; the onnx backend also needs optimum[onnxruntime].
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_language import load_samples
+from stand_in_server import PARAGRAPH, TOWNS  # also puts the repo root on sys.path
+from inference import BACKENDS, NER_MODEL, SENTIMENT_MODEL, InferenceEngine, load_pipeline, set_num_threads
+from metrics import percentile
+
+
+def make_texts(n_articles, seed=11):
+    rng = random.Random(seed)
+    articles = [" ".join(PARAGRAPH.format(town=rng.choice(TOWNS), day="Friday") for _ in range(rng.randint(1, 6)))
+                for _ in range(n_articles)]
+    return [s["text"] for s in load_samples()] + articles
+
+
+def child(args):
+    set_num_threads(args.threads)
+    started = time.perf_counter()
+    engine = InferenceEngine(load_pipeline("ner", args.ner_model, -1, args.child, args.threads),
+                             load_pipeline("sentiment", args.sentiment_model, -1, args.child, args.threads))
+    load_s = time.perf_counter() - started
+
+    texts = make_texts(args.articles)
+    engine.analyze(texts[:4])  # warm-up
+    started = time.perf_counter()
+    results = engine.analyze(texts)
+    batch_s = time.perf_counter() - started
+
+    latencies = []
+    for text in texts[:args.latency_samples]:
+        started = time.perf_counter()
+        engine.analyze([text])
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"backend": args.child, "load_s": load_s, "batch_s": batch_s, "texts": len(texts),
+                   "p50_ms": percentile(latencies, 0.5) * 1000, "p95_ms": percentile(latencies, 0.95) * 1000,
+                   # ru_maxrss is in KiB on Linux
+                   "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                   "results": results}, f, ensure_ascii=False)
+
+
+def run_child(backend, args):
+    fd, out = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", backend, "--out", out,
+           "--ner-model", args.ner_model, "--sentiment-model", args.sentiment_model,
+           "--articles", str(args.articles), "--latency-samples", str(args.latency_samples)]
+    if args.threads:
+        cmd += ["--threads", str(args.threads)]
+    try:
+        subprocess.run(cmd, check=True)
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+    except subprocess.CalledProcessError:
+        print(f"{backend}: child failed, skipped")
+        return None
+    finally:
+        os.unlink(out)
+
+
+def entity_set(value):
+    return {e.strip() for e in (value or "").split("|") if e.strip()}
+
+
+def compare(base, other):
+    agree = score_diff = jaccard = n = 0
+    for a, b in zip(base["results"], other["results"]):
+        if a is None or b is None:
+            continue
+        n += 1
+        agree += a["sentiment"] == b["sentiment"]
+        score_diff += abs(a["sentiment_score"] - b["sentiment_score"])
+        ea, eb = entity_set(a["entities"]), entity_set(b["entities"])
+        jaccard += len(ea & eb) / len(ea | eb) if ea | eb else 1.0
+    return {"n": n, "label_agreement": agree / n if n else 0.0, "score_diff": score_diff / n if n else 0.0,
+            "entity_jaccard": jaccard / n if n else 0.0}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    ap.add_argument("--ner-model", default=NER_MODEL)
+    ap.add_argument("--sentiment-model", default=SENTIMENT_MODEL)
+    ap.add_argument("--articles", type=int, default=40)
+    ap.add_argument("--latency-samples", type=int, default=30)
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    ap.add_argument("--out", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    reports = [r for r in (run_child(b, args) for b in args.backends) if r is not None]
+    if not reports:
+        return
+    base = reports[0]
+    print(f"\nmodels: {args.ner_model}, {args.sentiment_model}; baseline: {base['backend']}")
+    print(f"{'backend':>9} {'load s':>7} {'batch s':>8} {'texts/s':>8} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'RSS MB':>7} {'labels':>7} {'|dscore|':>8} {'entities':>8}")
+    for r in reports:
+        c = compare(base, r)
+        print(f"{r['backend']:>9} {r['load_s']:7.1f} {r['batch_s']:8.2f} {r['texts'] / r['batch_s']:8.1f} "
+              f"{r['p50_ms']:7.1f} {r['p95_ms']:7.1f} {r['peak_rss_mb']:7.0f} {c['label_agreement']:7.1%} "
+              f"{c['score_diff']:8.3f} {c['entity_jaccard']:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Per-record vs batched upserts against a local PostgREST stand-in, plus an outage drill.
+
+    python benchmarks/bench_bulk_writer.py --records 2000 --latency 0.005
+
+"per-record" reproduces the old path: one upsert request per record (batch_size=1).
+"batched" sends batch_size records per request. Both go through bulk_writer.RestTransport.
+
+The outage drill takes the server down, writes records (they end up in the spool once
+retries run out), brings it back and starts a fresh writer, which replays the spool.
+It checks every record arrived exactly once.
+"""
+import argparse
+import tempfile
+import time
+
+from fake_postgrest import FakePostgrest
+from bulk_writer import BulkWriter, RestTransport
+
+
+def make_records(n, prefix="r"):
+    return [{"tweet_hash": f"{prefix}{i}", "text": f"tweet number {i} from nairobi", "threat_level": "medium"}
+            for i in range(n)]
+
+
+def run_writer(server, records, batch_size, spool_dir, **kwargs):
+    writer = BulkWriter(RestTransport(server.base_url, "anon-key"), "twitter_threats", on_conflict="tweet_hash",
+                        batch_size=batch_size, flush_interval=0, spool_dir=spool_dir, **kwargs)
+    start = time.perf_counter()
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return time.perf_counter() - start, writer
+
+
+def outage_drill(latency, spool_dir):
+    records = make_records(500, prefix="outage-")
+    with FakePostgrest(latency=latency) as server:
+        server.outage = True
+        _, writer = run_writer(server, records, 100, spool_dir, max_retries=2, backoff=0.01)
+        print(f"during outage: {writer.stats}")
+        assert writer.stats["spooled"] == len(records) and not server.rows("twitter_threats")
+
+        server.outage = False
+        _, writer = run_writer(server, [], 100, spool_dir)
+        print(f"after recovery: {writer.stats}")
+        rows = server.rows("twitter_threats")
+        assert len(rows) == len(records), f"{len(rows)} of {len(records)} records arrived"
+    print("outage drill: all records delivered after replay")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--records", type=int, default=2000)
+    ap.add_argument("--batch-size", type=int, default=100)
+    ap.add_argument("--latency", type=float, default=0.005, help="server latency per request (s)")
+    ap.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered 503")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        for name, batch_size in (("per-record", 1), ("batched", args.batch_size)):
+            with FakePostgrest(latency=args.latency, failure_rate=args.failure_rate) as server:
+                elapsed, writer = run_writer(server, make_records(args.records), batch_size, spool_dir,
+                                             backoff=0.01)
+                print(f"{name:11s} {elapsed:7.2f}s  {args.records / elapsed:8.0f} records/s  "
+                      f"requests={server.requests} retries={writer.stats['retries']} "
+                      f"stored={len(server.rows('twitter_threats'))}")
+        outage_drill(args.latency, spool_dir)
+
+
+if __name__ == "__main__":
+    main()
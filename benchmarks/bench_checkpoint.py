@@ -0,0 +1,129 @@
+"""
+Repeated scheduled scans with and without the since_id checkpoint.
+
+    python benchmarks/bench_checkpoint.py --scans 6 --new-per-scan 40
+
+Starts from a corpus of recent tweets and adds --new-per-scan fresh tweets before each
+scan. "full window" re-searches everything each time (the old behaviour); "checkpoint"
+passes the stored since_id. For both it reports requests and tweets downloaded per scan,
+and how many tweets reached processing more than once. Then it deletes the checkpoint file
+and corrupts it, checking that each scan falls back to a full search and RecentHashes
+keeps already-processed tweets from being handled twice. Last, a burst of --burst tweets
+arrives with only --burst-pages pages allowed per search: the truncated searches leave gaps
+that the following scans fill, until every tweet the full window holds has been processed.
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from bench_query_planner import KEYWORDS, LOCATIONS, MockSearchClient, make_corpus
+from query_planner import SearchTruncated, plan_queries, search_all
+from scan_checkpoint import QueryCheckpoint, RecentHashes
+
+# The synthetic corpus is dated around 2026-01-01; checkpoints older than the search window are ignored
+CLOCK = lambda: datetime(2026, 1, 1, tzinfo=timezone.utc)  # noqa: E731
+
+
+def scan(client, plans, checkpoint, recent, processed, max_pages=20):
+    downloaded = 0
+    for plan in plans:
+        for window in checkpoint.windows(plan.query) if checkpoint else [(None, None)]:
+            since_id, until_id = window
+            extra = {k: v for k, v in (("since_id", since_id), ("until_id", until_id)) if v}
+            tweets, complete = [], True
+            try:
+                for tweet in search_all(client.search_recent_tweets, plan, max_results=100, max_pages=max_pages,
+                                        **extra):
+                    tweets.append(tweet)
+            except SearchTruncated:
+                complete = False  # as in the scanner: the rest becomes a gap for the next scans
+            downloaded += len(tweets)
+            for tweet in tweets:
+                if recent is None or recent.add(str(tweet.id)):
+                    processed[tweet.id] = processed.get(tweet.id, 0) + 1
+            if checkpoint:
+                checkpoint.advance(plan.query, tweets, complete, window)
+    if checkpoint:
+        checkpoint.save()
+    return downloaded
+
+
+def run(label, corpus, fresh_batches, plans, checkpoint=None, recent=None, events=None, max_pages=20):
+    client = MockSearchClient(list(corpus))
+    processed = {}
+    for i, batch in enumerate([[]] + fresh_batches):
+        client.corpus = batch + client.corpus  # newest first
+        if events and i in events:
+            events[i](checkpoint)
+        before = client.requests
+        downloaded = scan(client, plans, checkpoint, recent, processed, max_pages)
+        gaps = sum(len(e.get("gaps", [])) for e in checkpoint.entries.values()) if checkpoint else 0
+        print(f"  {label:12s} scan {i}: requests={client.requests - before:3d} downloaded={downloaded:5d}"
+              + (f" open gaps={gaps}" if gaps or max_pages < 20 else ""))
+    repeats = sum(1 for n in processed.values() if n > 1)
+    print(f"  {label:12s} processed {len(processed)} tweets, {repeats} of them more than once")
+    return repeats, processed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tweets", type=int, default=3000)
+    ap.add_argument("--scans", type=int, default=6)
+    ap.add_argument("--new-per-scan", type=int, default=40)
+    ap.add_argument("--burst", type=int, default=2000)
+    ap.add_argument("--burst-pages", type=int, default=3)
+    args = ap.parse_args()
+
+    corpus, _ = make_corpus(args.tweets + args.scans * args.new_per_scan)
+    # The corpus is newest first: its head is split into the batches that arrive before each scan
+    fresh, base = corpus[:args.scans * args.new_per_scan], corpus[args.scans * args.new_per_scan:]
+    batches = [fresh[len(fresh) - (i + 1) * args.new_per_scan:len(fresh) - i * args.new_per_scan]
+               for i in range(args.scans)]
+    plans = plan_queries(KEYWORDS, LOCATIONS)
+
+    print("full window:")
+    _, everything = run("full window", base, batches, plans)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoint.json")
+        print("checkpoint:")
+        repeats, _ = run("checkpoint", base, batches, plans, QueryCheckpoint(path, clock=CLOCK), RecentHashes())
+        assert repeats == 0
+
+        path = os.path.join(tmp, "lost.json")
+
+        def lose(checkpoint):
+            os.remove(checkpoint.path)
+            checkpoint.entries = checkpoint._load()
+
+        def corrupt(checkpoint):
+            with open(checkpoint.path, "w") as f:
+                f.write("{not json")
+            checkpoint.entries = checkpoint._load()
+
+        print("checkpoint lost before scan 2, corrupted before scan 4:")
+        repeats, _ = run("recovering", base, batches, plans, QueryCheckpoint(path, clock=CLOCK), RecentHashes(),
+                         events={2: lose, 4: corrupt})
+        assert repeats == 0, "RecentHashes should stop re-fetched tweets from being processed again"
+        assert os.path.exists(path + ".corrupt")
+        print("recovery: full-window rescans after loss, no tweet processed twice")
+
+        # The first scan sees the base corpus, the second a burst far past --burst-pages pages
+        burst, _ = make_corpus(args.burst)
+        top = max(t.id for t in base + fresh)
+        burst = [t._replace(id=t.id - min(b.id for b in burst) + top + 1) for t in burst]
+        checkpoint = QueryCheckpoint(os.path.join(tmp, "burst.json"), clock=CLOCK)
+        print(f"burst of {args.burst} tweets, {args.burst_pages} page(s) per search:")
+        repeats, processed = run("burst", base, [burst] + [[]] * args.scans, plans, checkpoint, RecentHashes(),
+                                 max_pages=args.burst_pages)
+        _, expected = run("burst full", base, [burst], plans)
+        assert repeats == 0
+        assert not any(e.get("gaps") for e in checkpoint.entries.values()), "gaps left open"
+        assert processed.keys() == expected.keys(), \
+            f"{len(expected.keys() - processed.keys())} tweets never fetched"
+    print("burst: truncated searches backfilled, every tweet processed once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Parse time per article for the extraction modes in article_extract.py.
+
+    python benchmarks/bench_extract.py --articles 200 --paragraphs 12
+
+Three kinds of page: with a JSON-LD NewsArticle, with only OpenGraph tags around an
+<article>, and a bare page with neither (which the fast mode has to hand to newspaper).
+"fast" is timed on all three; "full" (newspaper's parse of the same prefetched HTML) only
+when newspaper is installed, and then the fast results are also checked against it for
+title and publish date. Pages go in as bytes, the way the fetcher could hand them over.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from stand_in_server import PARAGRAPH, TOWNS, make_article_html  # also puts the repo root on sys.path
+from article_extract import extract_article, from_metadata
+
+
+def bare_html(index, paragraphs):
+    town = TOWNS[index % len(TOWNS)]
+    body = "".join(f"<div class='p'>{PARAGRAPH.format(town=town, day='Monday')}</div>" for _ in range(paragraphs))
+    return f"<html><head><title>Story {index}</title></head><body><div id='content'>{body}</div></body></html>"
+
+
+def make_pages(kind, n, paragraphs):
+    now = datetime(2026, 10, 1, 9, 30)
+    pages = []
+    for i in range(n):
+        if kind == "bare":
+            html = bare_html(i, paragraphs)
+        else:
+            html = make_article_html(i, now - timedelta(hours=i), paragraphs, json_ld=kind == "json-ld")
+        pages.append((f"https://example.co.ke/news/story-{i}", html.encode("utf-8")))
+    return pages
+
+
+def timed(fn, pages):
+    start = time.perf_counter()
+    results = [fn(url, page) for url, page in pages]
+    return (time.perf_counter() - start) / len(pages), results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--articles", type=int, default=200)
+    ap.add_argument("--paragraphs", type=int, default=12)
+    args = ap.parse_args()
+
+    try:
+        import newspaper  # noqa: F401
+        have_newspaper = True
+    except ImportError:
+        have_newspaper = False
+        print("newspaper not installed – timing the fast mode only\n")
+
+    print(f"{'page kind':>10} {'mode':>5} {'ms/article':>11} {'fast hits':>10}")
+    for kind in ("json-ld", "meta", "bare"):
+        pages = make_pages(kind, args.articles, args.paragraphs)
+        hits = sum(from_metadata(page) is not None for _, page in pages)
+        if kind != "bare":
+            assert hits == len(pages), f"fast mode missed {kind} pages"
+        else:
+            assert hits == 0, "bare pages have no metadata to trust"
+
+        if kind != "bare":
+            fast_s, fast = timed(lambda u, p: extract_article(u, p, "fast"), pages)
+            print(f"{kind:>10} {'fast':>5} {fast_s * 1000:11.3f} {hits:>6}/{len(pages)}")
+            assert {r.method for r in fast} == {kind}
+        if have_newspaper:
+            full_s, full = timed(lambda u, p: extract_article(u, p, "full"), pages)
+            print(f"{kind:>10} {'full':>5} {full_s * 1000:11.3f}")
+            if kind != "bare":
+                same_title = sum(a.title == b.title for a, b in zip(fast, full))
+                same_date = sum(b.publish_date is None or a.publish_date.date() == b.publish_date.date()
+                                for a, b in zip(fast, full))
+                print(f"{'':>10} fast vs full: title {same_title}/{len(pages)}, date {same_date}/{len(pages)}, "
+                      f"{full_s / fast_s:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Serial vs concurrent article download against local stand-in sites.
+
+    python benchmarks/bench_fetcher.py --sites 5 --articles 10 --latency 0.05 --delay 0.2
+
+"serial" reproduces the old loop: one unpooled requests.get per article followed by a
+fixed sleep. "concurrent" uses fetcher.ArticleFetcher with per-host pacing set to the
+same delay. Pass --parse to also run newspaper's Article.parse() on each page.
+"""
+import argparse
+import time
+
+import requests
+
+from stand_in_server import StandInSite, news_site_pages
+from fetcher import ArticleFetcher
+
+
+def parse_html(url, html):
+    from newspaper import Article
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+
+
+def run_serial(urls, delay, parse):
+    for url in urls:
+        html = requests.get(url, timeout=20).text
+        time.sleep(delay)
+        if parse:
+            parse_html(url, html)
+
+
+def run_concurrent(urls, delay, parse, workers, per_host):
+    with ArticleFetcher(max_workers=workers, per_host=per_host, min_host_interval=delay) as fetcher:
+        for result in fetcher.fetch_many(urls):
+            if parse and result.ok:
+                parse_html(result.url, result.html)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sites", type=int, default=5)
+    ap.add_argument("--articles", type=int, default=10, help="articles per site")
+    ap.add_argument("--latency", type=float, default=0.05, help="server latency per response (s)")
+    ap.add_argument("--delay", type=float, default=0.2, help="politeness delay (s)")
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--per-host", type=int, default=2)
+    ap.add_argument("--parse", action="store_true")
+    args = ap.parse_args()
+
+    sites = [StandInSite(news_site_pages(args.articles, i), latency=args.latency) for i in range(args.sites)]
+    for site in sites:
+        site.__enter__()
+    try:
+        urls = [site.url(path) for site in sites for path in site.pages if path != "/"]
+        print(f"{len(urls)} articles across {args.sites} stand-in sites "
+              f"(latency {args.latency}s, polite delay {args.delay}s)")
+        for mode, run in (("serial", lambda: run_serial(urls, args.delay, args.parse)),
+                          ("concurrent", lambda: run_concurrent(urls, args.delay, args.parse,
+                                                                args.workers, args.per_host))):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            print(f"{mode:>10}: {elapsed:7.2f}s  {len(urls) / elapsed:8.1f} articles/s")
+    finally:
+        for site in sites:
+            site.__exit__()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Per-item vs batched NER + sentiment on CPU.
+
+    python benchmarks/bench_inference.py --texts 200 --batch-sizes 1 8 16 32
+    python benchmarks/bench_inference.py --ner-model <tiny ner model> --sentiment-model <tiny cls model>
+
+Without model names a stub pipeline is used: it burns CPU for a fixed per-call overhead
+plus a per-token cost on the padded batch (longest text x batch size), which is the cost
+shape batching and length-sorting attack. With model names, real transformers pipelines
+are loaded on CPU (use tiny checkpoints to keep it quick).
+"""
+import argparse
+import random
+import time
+
+from stand_in_server import PARAGRAPH, TOWNS  # also puts the repo root on sys.path
+from inference import InferenceEngine, format_entities, format_sentiment, load_pipelines
+
+
+def burn(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class StubPipeline:
+    def __init__(self, kind, call_overhead=0.004, token_cost=0.00001):
+        self.kind = kind
+        self.call_overhead = call_overhead
+        self.token_cost = token_cost
+
+    def _output(self, text):
+        if self.kind == "ner":
+            return [{"entity_group": "LOC", "word": w, "score": 0.95} for w in TOWNS if w in text]
+        return {"label": "negative" if "violence" in text else "neutral", "score": 0.9}
+
+    def __call__(self, inputs, batch_size=1, **kwargs):
+        single = isinstance(inputs, str)
+        inputs = [inputs] if single else inputs
+        for start in range(0, len(inputs), batch_size):
+            chunk = inputs[start:start + batch_size]
+            burn(self.call_overhead + max(len(t.split()) for t in chunk) * len(chunk) * self.token_cost)
+        outputs = [self._output(t) for t in inputs]
+        # Like transformers: a single string gets NER's entity list, or a one-item list of labels
+        return outputs[0] if single and self.kind == "ner" else outputs
+
+
+def make_texts(n, seed=7):
+    rng = random.Random(seed)
+    return [" ".join(PARAGRAPH.format(town=rng.choice(TOWNS), day="Monday") for _ in range(rng.randint(1, 8)))
+            for _ in range(n)]
+
+
+def per_item(ner, sentiment, texts):
+    # The old code path: two pipeline calls per text
+    return [(format_entities(ner(t[:1400])), format_sentiment(sentiment(t[:512])[0])) for t in texts]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--texts", type=int, default=200)
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32])
+    ap.add_argument("--ner-model")
+    ap.add_argument("--sentiment-model")
+    ap.add_argument("--threads", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.ner_model and args.sentiment_model:
+        ner, sentiment = load_pipelines(args.ner_model, args.sentiment_model, device=-1, num_threads=args.threads)
+        print(f"models: {args.ner_model}, {args.sentiment_model}")
+    else:
+        ner, sentiment = StubPipeline("ner"), StubPipeline("sentiment")
+        print("models: stub pipelines")
+
+    texts = make_texts(args.texts)
+    start = time.perf_counter()
+    per_item(ner, sentiment, texts)
+    elapsed = time.perf_counter() - start
+    print(f"{'per-item':>12}: {elapsed:7.2f}s  {len(texts) / elapsed:8.1f} texts/s")
+
+    for bs in args.batch_sizes:
+        engine = InferenceEngine(ner, sentiment, batch_size=bs)
+        start = time.perf_counter()
+        engine.analyze(texts)
+        elapsed = time.perf_counter() - start
+        print(f"{'batch=' + str(bs):>12}: {elapsed:7.2f}s  {len(texts) / elapsed:8.1f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
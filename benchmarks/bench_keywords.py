@@ -0,0 +1,118 @@
+"""
+Keyword scanning throughput: the old per-keyword substring checks vs keyword_matcher.
+
+    python benchmarks/bench_keywords.py --articles 3000 --tweets 5000
+    python benchmarks/bench_keywords.py --extra-terms 500   # a bigger lexicon
+
+Builds a synthetic corpus of articles and tweets mixing English/Swahili filler with lexicon
+terms, then times article categorization (per sentence, as categorize_article does) and
+tweet threat scoring (as ThreatAnalyzer.analyze_threat does) both ways. Sentences are split
+with a simple regex for both sides, so only the keyword matching differs. The old checks
+cost grows with every keyword added; --extra-terms pads each category with synthetic
+terms to show how both sides scale as the lexicon grows.
+"""
+import argparse
+import random
+import re
+import time
+
+from stand_in_server import PARAGRAPH, TOWNS  # also puts the repo root on sys.path
+import keyword_matcher
+from keyword_matcher import KeywordMatcher, load_lexicon
+
+LOCATIONS = ['nairobi', 'mombasa', 'kisumu', 'nakuru', 'eldoret', 'thika',
+             'kakamega', 'machakos', 'kitui', 'meru', 'nyeri', 'kajiado', 'narok']
+FILLER = ("wananchi walikusanyika sokoni leo asubuhi kujadili hali ya usalama. "
+          "the skilled workers attended a community meeting about the new market. ")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def flat(section):
+    return {cat: [t for terms in langs.values() for t in terms] for cat, langs in section.items()}
+
+
+def old_categorize(text, lists):
+    scores = {c: 0 for c in lists}
+    for s in SENTENCE_END.split(text.lower()):
+        for category, keywords in lists.items():
+            if any(k in s for k in keywords):
+                scores[category] += 1
+    best = max(scores, key=scores.get)
+    return best if scores[best] > 0 else "Other"
+
+
+def new_categorize(text, matcher):
+    lower = text.lower()
+    scores = matcher.segment_counts(lower, SENTENCE_END.split(lower), lowered=True)
+    return max(scores, key=scores.get) if scores else "Other"
+
+
+def old_threat(text, levels):
+    lower = text.lower()
+    score = 0
+    for level, value in (("critical", 85), ("high", 75), ("medium", 60)):
+        if any(w in lower for w in levels[level]):
+            score = value
+            break
+    if any(loc in lower for loc in LOCATIONS):
+        score = min(95, score + 10)
+    return score
+
+
+def new_threat(text, matcher):
+    counts = matcher.scan(text).counts
+    score = next((v for lvl, v in (("critical", 85), ("high", 75), ("medium", 60)) if counts.get(lvl)), 0)
+    return min(95, score + 10) if counts.get("location") else score
+
+
+def make_corpus(n_articles, n_tweets, terms, seed=11):
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(n_articles):
+        parts = [PARAGRAPH.format(town=rng.choice(TOWNS), day="Monday") if rng.random() < 0.5 else FILLER
+                 for _ in range(rng.randint(4, 12))]
+        parts.insert(rng.randrange(len(parts)), f"Reports of {rng.choice(terms)} rose. ")
+        articles.append("".join(parts))
+    tweets = [f"{rng.choice(['watch out', 'sikiliza', 'breaking'])} {rng.choice(terms)} "
+              f"{rng.choice(LOCATIONS + ['somewhere'])} {FILLER[:rng.randint(20, 120)]}" for _ in range(n_tweets)]
+    return articles, tweets
+
+
+def timed(label, fn, items, unit):
+    start = time.perf_counter()
+    results = [fn(x) for x in items]
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<8} {elapsed:7.3f}s  {len(items) / elapsed:10.0f} {unit}/s")
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--articles", type=int, default=3000)
+    ap.add_argument("--tweets", type=int, default=5000)
+    ap.add_argument("--extra-terms", type=int, default=0, help="synthetic terms added per category")
+    args = ap.parse_args()
+
+    lexicon = {section: {cat: {**langs, "xx": [f"zq{cat.lower()}{i}" for i in range(args.extra_terms)]}
+                         for cat, langs in load_lexicon()[section].items()}
+               for section in ("article_categories", "threat_levels")}
+    categories, levels = flat(lexicon["article_categories"]), flat(lexicon["threat_levels"])
+    category_matcher = KeywordMatcher(lexicon["article_categories"])
+    threat_matcher = KeywordMatcher({**lexicon["threat_levels"], "location": LOCATIONS})
+    terms = [t for ts in list(categories.values()) + list(levels.values()) for t in ts] + ["skill"]
+    articles, tweets = make_corpus(args.articles, args.tweets, terms)
+    print(f"matcher backend: {'pyahocorasick' if keyword_matcher.AHOCORASICK_AVAILABLE else 'trie regex'}")
+
+    print(f"categorize {len(articles)} articles:")
+    old = timed("old", lambda t: old_categorize(t, categories), articles, "articles")
+    new = timed("matcher", lambda t: new_categorize(t, category_matcher), articles, "articles")
+    print(f"  differing categories: {sum(a != b for a, b in zip(old, new))} (word-boundary fixes)")
+
+    print(f"threat-score {len(tweets)} tweets:")
+    old = timed("old", lambda t: old_threat(t, levels), tweets, "tweets")
+    new = timed("matcher", lambda t: new_threat(t, threat_matcher), tweets, "tweets")
+    print(f"  differing scores: {sum(a != b for a, b in zip(old, new))} (word-boundary fixes)")
+
+
+if __name__ == "__main__":
+    main()
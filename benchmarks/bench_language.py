@@ -0,0 +1,134 @@
+"""
+Language ID, full-text chunking and per-language model routing.
+
+    python benchmarks/bench_language.py
+    python benchmarks/bench_language.py --real                    # models from the SAFEGUARD_* env
+    SAFEGUARD_FAST_ENGLISH=1 python benchmarks/bench_language.py --real
+
+Reports language-ID accuracy per language on benchmarks/fixtures/language_samples.json,
+how much of a long article the old character cut-offs left out, and per-language
+throughput with one shared model vs English routed to a cheaper one. With stub pipelines
+(the default) the "distilled" English stub costs a third as much per token; with --real the
+configured transformers models are loaded and sentiment accuracy against the fixture
+labels is reported too.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+
+from bench_inference import StubPipeline
+from stand_in_server import PARAGRAPH, TOWNS  # also puts the repo root on sys.path
+from chunking import chunk_spans
+from inference import (NER_CHUNK_OVERLAP, NER_CHUNK_TOKENS, InferenceEngine, LanguageRouter, build_engine,
+                       model_routes)
+from language import LANGUAGES, detect_language
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "language_samples.json")
+
+
+def load_samples():
+    with open(FIXTURES, encoding="utf-8") as f:
+        return json.load(f)["samples"]
+
+
+def language_id(samples):
+    print("language ID on the fixture set")
+    confusion = defaultdict(Counter)
+    for s in samples:
+        confusion[s["lang"]][detect_language(s["text"])] += 1
+    for lang in LANGUAGES:
+        row = confusion[lang]
+        total = sum(row.values())
+        print(f"  {lang}: {row[lang]}/{total} correct  {dict(row)}")
+        assert row[lang] / total >= 0.9, f"language ID accuracy for {lang} dropped below 90%"
+
+    texts = [s["text"] for s in samples] * 200
+    start = time.perf_counter()
+    for t in texts:
+        detect_language(t)
+    elapsed = time.perf_counter() - start
+    print(f"  {len(texts) / elapsed:,.0f} texts/s ({elapsed / len(texts) * 1e6:.0f} µs each)")
+
+
+def coverage(texts):
+    print("\nlong-article coverage")
+    kept = total = windows = 0
+    for text in texts:
+        spans = chunk_spans(text, NER_CHUNK_TOKENS, NER_CHUNK_OVERLAP)
+        windows += len(spans)
+        covered = set()
+        for start, end in spans:
+            # Windows start and end on word boundaries
+            assert start == 0 or text[start - 1].isspace(), "window starts mid-word"
+            assert end == len(text) or text[end].isspace(), "window ends mid-word"
+            covered.update(range(start, end))
+        assert all(i in covered or text[i].isspace() for i in range(len(text))), "text not fully covered"
+        kept += min(len(text), 1400)
+        total += len(text)
+    print(f"  {len(texts)} articles, {total / len(texts):,.0f} chars on average")
+    print(f"  text[:1400] reached the NER model: {kept / total:.0%} of the text")
+    print(f"  token windows ({NER_CHUNK_TOKENS} tokens, {NER_CHUNK_OVERLAP} overlap): 100% in "
+          f"{windows / len(texts):.1f} windows per article")
+
+
+def throughput(engine, texts, label):
+    router = engine if isinstance(engine, LanguageRouter) else LanguageRouter({}, engine)
+    start = time.perf_counter()
+    results = router.analyze(texts)
+    elapsed = time.perf_counter() - start
+    print(f"  {label}: {elapsed:.2f}s total")
+    for lang, row in sorted(router.stats.items()):
+        print(f"    {lang:>7}: {row['texts']:4d} texts  {row['texts'] / row['seconds']:7.1f} texts/s  "
+              f"{row['words'] / row['seconds']:9,.0f} words/s")
+    return results
+
+
+def accuracy(samples, results):
+    right, seen = Counter(), Counter()
+    for s, r in zip(samples, results):
+        seen[s["lang"]] += 1
+        right[s["lang"]] += r is not None and r["sentiment"] == s["sentiment"]
+    for lang in LANGUAGES:
+        print(f"    {lang}: sentiment {right[lang]}/{seen[lang]} correct")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--articles", type=int, default=60)
+    ap.add_argument("--real", action="store_true", help="load the configured transformers models")
+    args = ap.parse_args()
+
+    samples = load_samples()
+    language_id(samples)
+
+    rng = random.Random(3)
+    articles = [" ".join(PARAGRAPH.format(town=rng.choice(TOWNS), day="Monday") for _ in range(rng.randint(4, 20)))
+                for _ in range(args.articles)]
+    coverage(articles)
+
+    # A mixed stream: English articles plus short Swahili/Kikuyu posts built from the fixtures
+    by_lang = defaultdict(list)
+    for s in samples:
+        by_lang[s["lang"]].append(s["text"])
+    stream = articles + [" ".join(rng.sample(by_lang[lang], 3)) for lang in ("sw", "ki") for _ in range(args.articles)]
+
+    print("\nper-language throughput")
+    if args.real:
+        print(f"  routes: {model_routes()}")
+        engine = build_engine()
+        throughput(engine, stream, "configured routes")
+        accuracy(samples, engine.analyze([s["text"] for s in samples]))
+        return
+
+    shared = InferenceEngine(StubPipeline("ner"), StubPipeline("sentiment"))
+    throughput(shared, stream, "one multilingual model")
+    fast = InferenceEngine(StubPipeline("ner", token_cost=0.0000033), StubPipeline("sentiment", token_cost=0.0000033))
+    throughput(LanguageRouter({"en": fast}, shared), stream, "English -> distilled stub")
+    print("  (sentiment accuracy needs --real – the stubs don't model it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Homepage link extraction: the old BeautifulSoup pass vs link_extractor.
+
+    python benchmarks/bench_links.py
+    python benchmarks/bench_links.py --repeat 50 --max-links 10
+    python benchmarks/bench_links.py --write-fixtures      # regenerate fixtures/homepages/
+
+Runs over every homepage listed in benchmarks/fixtures/homepages/index.json – saved pages can
+be dropped in there with their site URL. The bundled ones are synthetic but shaped like the
+real sites: a heavy <head> full of inline scripts (some with "<a href" inside strings),
+section navigation, story cards (an image link and a headline link to the same story, plus
+a <time>) mostly newest first under a block of older featured stories, sidebars and a
+footer. Their index entries list the newest stories, so the benchmark can check that the
+ranking picks them.
+
+The old extractor needs bs4; without it the baseline is the same logic on the stdlib
+html.parser without a tree, which flatters the old side.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+import stand_in_server  # noqa: F401 – puts the repo root on sys.path
+from link_extractor import LinkRules, extract_links
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "homepages")
+PATH_INDICATORS = ["/news/", "/article/", "/story/", "/kenya/", "/swahili/", "/kikuyu/"]
+
+
+def old_extract(html, base_url, max_links=10):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    links = set()
+    for a in soup.find_all("a", href=True):
+        full_url = urljoin(base_url, a["href"])
+        parsed = urlparse(full_url)
+        if (parsed.netloc == urlparse(base_url).netloc and
+                any(indicator in full_url.lower() for indicator in PATH_INDICATORS)):
+            links.add(full_url)
+            if len(links) >= max_links:
+                break
+    return list(links)[:max_links]
+
+
+class _Anchors(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.hrefs.append(href)
+
+
+def old_extract_stdlib(html, base_url, max_links=10):
+    parser = _Anchors()
+    parser.feed(html)
+    links = set()
+    for href in parser.hrefs:
+        full_url = urljoin(base_url, href)
+        parsed = urlparse(full_url)
+        if (parsed.netloc == urlparse(base_url).netloc and
+                any(indicator in full_url.lower() for indicator in PATH_INDICATORS)):
+            links.add(full_url)
+            if len(links) >= max_links:
+                break
+    return list(links)[:max_links]
+
+
+# -------------------------- fixtures --------------------------
+SECTIONS = ["news/kenya", "news/africa", "news/world", "business", "sports", "swahili/habari", "opinion",
+            "lifestyle", "counties", "kikuyu/uhoro", "health", "education"]
+
+
+def _script(rng, kb):
+    blob = json.dumps({"ads": [{"slot": i, "html": f"<a href='/promo/{i}'>promo</a>"} for i in range(20)],
+                       "pad": "x" * 200})
+    out = []
+    while sum(map(len, out)) < kb * 1024:
+        out.append(f"<script>window.__cfg{rng.randint(0, 1 << 30)} = {blob};</script>\n")
+    return "".join(out)
+
+
+def make_fixture(site, rng, stories=180, dated_urls=True):
+    today = date(2026, 10, 1)
+    items = []
+    for i in range(stories):
+        published = today - timedelta(days=rng.choice([0, 0, 1, 1, 2, 3, 5, 8, 13, 30, 60, 200]))
+        slug = "-".join(rng.choice(["police", "court", "women", "county", "school", "market", "rains", "vote",
+                                    "hospital", "youth", "road", "price"]) for _ in range(5))
+        section = rng.choice(["news/kenya", "news/counties", "article", "story", "swahili/habari"])
+        path = (f"/{section}/{published:%Y/%m/%d}/{slug}-{i}" if dated_urls else f"/{section}/{slug}-{i}")
+        items.append((path, published, f"{slug.replace('-', ' ').title()} {i}"))
+
+    # Roughly newest first, like the real pages, under a featured block of older stories
+    items.sort(key=lambda it: it[1], reverse=True)
+    featured = rng.sample(items[40:], 8)
+    items = featured + [it for it in items if it not in featured]
+
+    nav = "".join(f'<li><a href="/{s}/">{s.split("/")[-1].title()}</a></li>' for s in SECTIONS)
+    cards = []
+    for path, published, title in items:
+        cards.append(
+            f'<div class="card"><a href="{path}"><img src="/img/{rng.randint(1, 9999)}.jpg" alt=""></a>'
+            f'<h3 class="title"><a href="{path}">{title}</a></h3>'
+            f'<time datetime="{published.isoformat()}T08:00:00+03:00">{published:%d %b %Y}</time>'
+            f'<a href="{path}#comments">Comments</a></div>\n')
+    sidebar = "".join(f'<li><a href="https://twitter.com/share?u={p}">Share</a>'
+                      f'<a href="/news/trending/{i}">Trending {i}</a></li>' for i, (p, _, _) in enumerate(items[:30]))
+    footer = "".join(f'<a href="/{s}/">{s}</a> ' for s in SECTIONS * 3)
+    page = (f"<!DOCTYPE html><html><head><title>{site}</title>{_script(rng, 120)}</head><body>"
+            f"<header><nav><ul>{nav}</ul></nav></header>"
+            f"<!-- <a href='/news/old-commented-out'>old</a> -->"
+            f"<main>{''.join(cards)}</main><aside><ul>{sidebar}</ul></aside>"
+            f"<footer>{footer}</footer>{_script(rng, 60)}</body></html>")
+    newest = [site.rstrip("/") + p for p, _, _ in sorted(items, key=lambda it: it[1], reverse=True)]
+    fresh_day = max(it[1] for it in items)
+    return page, newest, sum(1 for it in items if it[1] == fresh_day)
+
+
+def write_fixtures():
+    rng = random.Random(2026)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    index = {}
+    for name, site, dated in [("nation.html", "https://nation.africa/", True),
+                              ("standard.html", "https://www.standardmedia.co.ke/", False),
+                              ("taifa.html", "https://taifaleo.nation.co.ke/", True)]:
+        page, newest, fresh = make_fixture(site, rng, dated_urls=dated)
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(page)
+        index[name] = {"site": site, "newest": newest[:max(fresh, 10)]}
+    with open(os.path.join(FIXTURE_DIR, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    print(f"wrote {len(index)} fixtures to {FIXTURE_DIR}")
+
+
+# -------------------------- benchmark --------------------------
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--max-links", type=int, default=10)
+    ap.add_argument("--write-fixtures", action="store_true")
+    args = ap.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures()
+        return
+    with open(os.path.join(FIXTURE_DIR, "index.json"), encoding="utf-8") as f:
+        index = json.load(f)
+
+    try:
+        import bs4  # noqa: F401
+        old, old_name = old_extract, "bs4 html.parser"
+    except ImportError:
+        old, old_name = old_extract_stdlib, "stdlib HTMLParser"
+
+    print(f"{'page':>14} {'KB':>5} {old_name + ' ms':>22} {'link_extractor ms':>18} {'speedup':>8} "
+          f"{'newest (old)':>13} {'newest (new)':>13}")
+    for name, entry in index.items():
+        with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+            page = f.read()
+        site = entry["site"]
+        rules = LinkRules(site)
+        old_s, old_links = timed(lambda: old(page, site, args.max_links), args.repeat)
+        new_s, new_links = timed(lambda: [l.url for l in extract_links(page, rules, args.max_links)], args.repeat)
+        newest = set(entry.get("newest", []))
+        old_fresh = sum(u in newest for u in old_links)
+        new_fresh = sum(u in newest for u in new_links)
+        print(f"{name:>14} {len(page) / 1024:5.0f} {old_s * 1000:22.2f} {new_s * 1000:18.2f} {old_s / new_s:7.1f}x "
+              f"{old_fresh:>8}/{len(old_links):<4} {new_fresh:>8}/{len(new_links):<4}")
+        assert len(set(new_links)) == len(new_links), "duplicate links returned"
+        assert all("#" not in u and "/promo/" not in u and "old-commented-out" not in u for u in new_links)
+        if newest:
+            assert new_fresh >= min(len(new_links), len(newest)) * 0.8, f"{name}: ranking missed the newest stories"
+
+
+if __name__ == "__main__":
+    main()
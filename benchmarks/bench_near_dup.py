@@ -0,0 +1,157 @@
+"""
+Insert and query speed, and clustering quality, of near_duplicates.NearDuplicateIndex.
+
+    python benchmarks/bench_near_dup.py --docs 100000 --copy-share 0.3
+
+A synthetic corpus of --docs texts, half articles (150–400 words) and half tweets (15–30
+words), drawn Zipf-style from a made-up vocabulary. A --copy-share of them are copies of an
+earlier text, edited the way syndication and copy-paste edit them: articles get a new
+opening sentence, a "read more" footer and ~2% of words swapped; tweets get an RT prefix,
+@mentions, a link, a hashtag and one word changed. Texts go into the index in batches of
+--batch (as the crawler's NLP stage sends them), then --queries held-out texts are looked up.
+
+Reported: inserts/s, query latency, how many copies landed in their original's cluster
+(recall) and how many new texts were wrongly merged into an existing one, NLP calls saved
+(texts vs clusters), and the reload time and size of the SQLite state.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import stand_in_server  # noqa: F401 – puts the repo root on sys.path
+from metrics import percentile
+from near_duplicates import NEAR_DUP_THRESHOLD, NearDuplicateIndex, cluster_id_for
+from triage import near_duplicate_key
+
+SYLLABLES = ["ka", "ma", "ri", "to", "ne", "lu", "si", "wa", "ba", "go", "de", "nyi", "mu", "ki", "ra", "zo"]
+
+
+def make_vocabulary(rng, size=20000):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    cumulative, total = [], 0.0
+    for rank in range(len(words)):
+        total += 1 / (rank + 1)
+        cumulative.append(total)
+    return words, cumulative
+
+
+def make_corpus(n, copy_share, seed):
+    """(space, text, root) per document; root is the index of the original it copies, or its own."""
+    rng = random.Random(seed)
+    vocab, cumulative = make_vocabulary(rng)
+
+    def words(k):
+        return rng.choices(vocab, cum_weights=cumulative, k=k)
+
+    docs = []
+    originals = {"articles": [], "tweets": []}
+    for i in range(n):
+        space = "articles" if rng.random() < 0.5 else "tweets"
+        if originals[space] and rng.random() < copy_share:
+            root = rng.choice(originals[space])
+            tokens = docs[root][1].split()
+            if space == "articles":
+                tokens = words(15) + tokens[15:] + ["read", "more", "stories", "like", "this", "on"] + words(2)
+                tokens = [rng.choice(vocab) if rng.random() < 0.02 else t for t in tokens]
+                text = " ".join(tokens)
+            else:
+                tokens = [t for t in tokens if not t.startswith(("@", "http", "#", "RT"))]
+                tokens[rng.randrange(len(tokens))] = rng.choice(vocab)
+                text = (f"RT @{rng.choice(vocab)}: " if rng.random() < 0.5 else "") + " ".join(tokens) + \
+                    f" #{rng.choice(vocab)} https://t.co/{rng.randrange(10 ** 8)}"
+            docs.append((space, text, root))
+        else:
+            length = rng.randint(150, 400) if space == "articles" else rng.randint(15, 30)
+            docs.append((space, " ".join(words(length)), i))
+            originals[space].append(i)
+    return docs
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=100000)
+    ap.add_argument("--copy-share", type=float, default=0.3)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--threshold", type=float, default=NEAR_DUP_THRESHOLD)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    started = time.perf_counter()
+    corpus = make_corpus(args.docs + args.queries, args.copy_share, args.seed)
+    docs, held_out = corpus[:args.docs], corpus[args.docs:]
+    print(f"corpus: {len(docs)} texts + {len(held_out)} queries, "
+          f"{sum(d[2] != i for i, d in enumerate(docs))} copies ({time.perf_counter() - started:.1f}s to build)\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "near_duplicates.sqlite")
+        indexes = {space: NearDuplicateIndex(path, space, threshold=args.threshold) for space in ("articles", "tweets")}
+        keys = [near_duplicate_key(text) if space == "tweets" else f"https://example.co.ke/news/{i}"
+                for i, (space, text, _) in enumerate(docs)]
+        cluster = [None] * len(docs)
+        batch_seconds = []
+        started = time.perf_counter()
+        for start in range(0, len(docs), args.batch):
+            t0 = time.perf_counter()
+            for space in indexes:
+                members = [i for i in range(start, min(start + args.batch, len(docs))) if docs[i][0] == space]
+                for i, a in zip(members, indexes[space].assign_many([(keys[i], docs[i][1]) for i in members])):
+                    cluster[i] = a.cluster_id
+            batch_seconds.append(time.perf_counter() - t0)
+        insert_s = time.perf_counter() - started
+
+        latencies = []
+        for space, text, root in held_out:
+            t0 = time.perf_counter()
+            indexes[space].query(text)
+            latencies.append(time.perf_counter() - t0)
+        latencies.sort()
+
+        copies = [i for i, d in enumerate(docs) if d[2] != i]
+        found = sum(cluster[i] == cluster[docs[i][2]] for i in copies)
+        originals = [i for i, d in enumerate(docs) if d[2] == i]
+        # An original wrongly merged is one whose cluster id isn't its own
+        merged = sum(cluster[i] != cluster_id_for(keys[i]) for i in originals)
+        clusters = len(set(cluster))
+        for index in indexes.values():
+            index.close()
+        del indexes, index  # so the peak below is one loaded index, not two
+
+        started = time.perf_counter()
+        reloaded = {space: NearDuplicateIndex(path, space) for space in ("articles", "tweets")}
+        reload_s = time.perf_counter() - started
+        assert sum(len(i) for i in reloaded.values()) == len(set(keys)), "reload lost entries"
+        for index in reloaded.values():
+            index.close()
+        size_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6
+
+    print(f"insert: {len(docs) / insert_s:,.0f} texts/s ({insert_s:.1f}s, "
+          f"batch of {args.batch}: p50 {percentile(sorted(batch_seconds), 0.5) * 1000:.0f} ms)")
+    print(f"query:  p50 {percentile(latencies, 0.5) * 1e6:.0f} µs, p95 {percentile(latencies, 0.95) * 1e6:.0f} µs")
+    print(f"copies in their original's cluster: {found}/{len(copies)} ({found / len(copies):.1%})")
+    print(f"new texts wrongly merged: {merged}/{len(originals)}")
+    print(f"NLP runs: {clusters} clusters for {len(docs)} texts ({1 - clusters / len(docs):.0%} saved)")
+    print(f"state: {size_mb:.0f} MB on disk, reloaded in {reload_s:.1f}s; peak RSS {peak_rss_mb():.0f} MB")
+    assert found / len(copies) >= 0.95, "near-duplicate recall below 95%"
+    assert merged / len(originals) <= 0.001, "too many distinct texts merged"
+
+
+if __name__ == "__main__":
+    main()
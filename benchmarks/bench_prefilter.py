@@ -0,0 +1,132 @@
+"""
+Downloads avoided by the date pre-filter, per site, against local stand-in sites.
+
+    python benchmarks/bench_prefilter.py --articles 40 --fresh 6 --max-articles 10
+
+Every stand-in homepage links to --articles stories of which only --fresh are from the last
+week; the rest are months old, in random page order – like the evergreen links real
+homepages carry. The sites differ only in where a story's date can be found:
+
+    url    /news/2026/08/14/slug URLs
+    time   a <time datetime> next to each headline
+    feed   nowhere on the homepage, but it declares an RSS feed with every pubDate
+    head   only in the articles' Last-Modified headers (head_check on)
+    none   nowhere – the control, nothing can be skipped
+
+"before" downloads the top --max-articles ranked links of each homepage, as the crawler did;
+"after" runs DatePrefilter first. Requests are counted on the servers, so feed and HEAD
+requests show up in the cost.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from stand_in_server import StandInSite, make_article_html  # also puts the repo root on sys.path
+from date_prefilter import DatePrefilter
+from fetcher import ArticleFetcher
+from link_extractor import LinkRules, extract_links
+
+KINDS = ("url", "time", "feed", "head", "none")
+
+
+def make_site(kind, articles, fresh, rng):
+    today = date.today()
+    stories = []
+    for i in range(articles):
+        age = rng.randint(0, 6) if i < fresh else rng.randint(45, 900)
+        published = today - timedelta(days=age)
+        path = f"/news/{published:%Y/%m/%d}/story-{i}" if kind == "url" else f"/news/story-{i}"
+        stories.append((path, published))
+    rng.shuffle(stories)
+
+    cards = []
+    for i, (path, published) in enumerate(stories):
+        stamp = f'<time datetime="{published.isoformat()}">{published:%d %b}</time>' if kind == "time" else ""
+        cards.append(f'<div class="card"><h3><a href="{path}">Headline number {i} about the county</a></h3>'
+                     f"{stamp}</div>")
+    feed_link = '<link rel="alternate" type="application/rss+xml" href="/feed.xml">' if kind == "feed" else ""
+    pages = {"/": f"<html><head>{feed_link}</head><body><main>{''.join(cards)}</main></body></html>"}
+    headers = {}
+    for i, (path, published) in enumerate(stories):
+        stamp = datetime.combine(published, datetime.min.time())
+        pages[path] = make_article_html(i, stamp)
+        if kind == "head":
+            headers[path] = {"Last-Modified": stamp.strftime("%a, %d %b %Y 08:00:00 GMT")}
+    if kind == "feed":
+        items = "".join(f"<item><link>{{base}}{path}</link><pubDate>{published:%a, %d %b %Y} 08:00:00 +0300"
+                        f"</pubDate></item>" for path, published in stories)
+        pages["/feed.xml"] = f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'
+    return pages, headers, {path: published for path, published in stories}
+
+
+def run(sites, max_articles, delay, prefilter):
+    for s in sites.values():
+        s["server"].hits = s["server"].head_hits = 0
+    cutoff = date.today() - timedelta(days=30)
+    stats = {}
+    start = time.perf_counter()
+    with ArticleFetcher(max_workers=16, per_host=2, min_host_interval=delay) as fetcher:
+        homepages = {r.url: r for r in fetcher.fetch_many([s["server"].url("/") for s in sites.values()])}
+        candidates = {}
+        for kind, s in sites.items():
+            base = s["server"].url("/")
+            links = extract_links(homepages[base].html, LinkRules(base), max_articles * (2 if prefilter else 1))
+            candidates[base] = (links, homepages[base].html)
+        if prefilter:
+            settings = {sites["head"]["server"].url("/"): {"head_check": True}}
+            kept = DatePrefilter(fetcher).filter_sites(candidates, max_articles, settings)
+        else:
+            kept = {base: links for base, (links, _) in candidates.items()}
+        urls = [l.url for links in kept.values() for l in links[:max_articles]]
+        list(fetcher.fetch_many(urls))
+    elapsed = time.perf_counter() - start
+
+    for kind, s in sites.items():
+        base = s["server"].base_url
+        fetched = [u[len(base):] for u in urls if u.startswith(base + "/")]
+        stale = sum(s["dates"][p] < cutoff for p in fetched)
+        fresh_total = sum(d >= cutoff for d in s["dates"].values())
+        stats[kind] = {"downloads": len(fetched), "stale": stale, "fresh": len(fetched) - stale,
+                       "fresh_available": fresh_total,
+                       "requests": s["server"].hits + s["server"].head_hits - 1}  # minus the homepage
+    return stats, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--articles", type=int, default=40)
+    ap.add_argument("--fresh", type=int, default=6)
+    ap.add_argument("--max-articles", type=int, default=10)
+    ap.add_argument("--delay", type=float, default=0.02, help="politeness delay per host (s)")
+    ap.add_argument("--seed", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    sites = {}
+    for kind in KINDS:
+        pages, headers, dates = make_site(kind, args.articles, args.fresh, rng)
+        server = StandInSite(pages, headers=headers).__enter__()
+        if "/feed.xml" in pages:
+            pages["/feed.xml"] = pages["/feed.xml"].replace("{base}", server.base_url)
+        sites[kind] = {"server": server, "dates": dates}
+    try:
+        before, before_s = run(sites, args.max_articles, args.delay, prefilter=False)
+        after, after_s = run(sites, args.max_articles, args.delay, prefilter=True)
+    finally:
+        for s in sites.values():
+            s["server"].__exit__()
+
+    print(f"{'site':>6} {'requests':>17} {'stale downloads':>16} {'fresh downloads':>16} {'avoided':>8}")
+    for kind in KINDS:
+        b, a = before[kind], after[kind]
+        print(f"{kind:>6} {b['requests']:>8} -> {a['requests']:<6} {b['stale']:>7} -> {a['stale']:<6} "
+              f"{b['fresh']:>7} -> {a['fresh']:<6} {b['stale'] - a['stale']:>8}")
+        assert a["fresh"] >= b["fresh"], f"{kind}: the pre-filter dropped a fresh story"
+        if kind != "none":
+            assert a["stale"] == 0, f"{kind}: stale stories still downloaded"
+    print(f"wall clock: {before_s:.2f}s -> {after_s:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
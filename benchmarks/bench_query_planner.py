@@ -0,0 +1,145 @@
+"""
+One query per keyword vs packed queries, against a mock recent-search endpoint.
+
+    python benchmarks/bench_query_planner.py --tweets 5000
+
+The mock holds a synthetic corpus of tweets (keywords and Kenyan towns mixed into filler
+text), evaluates the (a OR b) (c OR d) queries both planners produce, returns newest first
+and paginates with next_token. For each approach it reports API requests, matching tweets
+retrieved out of all matching tweets in the corpus, and tweets per request. It also checks
+that KeywordAttributor recovers exactly the keywords each retrieved tweet was built with.
+"""
+import argparse
+import random
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import stand_in_server  # noqa: F401 – puts the repo root on sys.path
+from query_planner import KeywordAttributor, SearchTruncated, plan_queries, search_all
+
+# twitter_crawler imports tweepy at module level, so its lists are mirrored here
+KEYWORDS = ['kill you', 'kukuua', 'nitakuua', 'femicide', 'death threats', 'rape threats', 'sexual assault',
+            'unyanyasaji wa kijinsia', 'domestic violence', 'gbv', 'assault', 'kupigwa', 'stalking',
+            'blackmail', 'human trafficking']
+LOCATIONS = ['nairobi', 'mombasa', 'kisumu', 'nakuru', 'eldoret', 'thika', 'kakamega', 'machakos', 'kitui',
+             'meru', 'nyeri', 'kajiado', 'narok']
+FILLER = ("people in town were talking about the news today and the weather was fine "
+          "watu wengi walikuwa sokoni leo asubuhi").split()
+
+Tweet = namedtuple("Tweet", "id text created_at lang")
+Response = namedtuple("Response", "data includes errors meta")
+
+
+def make_corpus(n, seed=0):
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1)
+    tweets, truth = [], {}
+    for i in range(n):
+        words = rng.sample(FILLER, 8)
+        keywords = rng.sample(KEYWORDS, rng.choice([0, 0, 1, 1, 2]))
+        # 'assault' is inside 'sexual assault' – the ground truth has to say so too
+        if "sexual assault" in keywords and "assault" not in keywords:
+            keywords.append("assault")
+        place = rng.choice(LOCATIONS) if rng.random() < 0.6 else None
+        parts = words + keywords + ([place.capitalize()] if place else [])
+        rng.shuffle(parts)
+        # Newest first, and like real tweet ids, newer tweets have bigger ids
+        tweet = Tweet(id=10_000_000 + n - i, text=" ".join(parts), created_at=now - timedelta(minutes=i), lang="en")
+        tweets.append(tweet)
+        truth[tweet.id] = (sorted(keywords), place)
+    return tweets, truth
+
+
+def parse_query(query):
+    """AND of OR-groups, ignoring operators the mock doesn't model."""
+    groups = []
+    for paren, quoted, bare in re.findall(r'\(([^()]*)\)|"([^"]*)"|(\S+)', query):
+        if paren:
+            terms = [t.strip().strip('"') for t in paren.split(" OR ")]
+        elif quoted:
+            terms = [quoted]
+        else:
+            terms = [bare]
+        terms = [t.lower() for t in terms if t != "OR" and not t.startswith(("lang:", "-is:"))]
+        if terms:
+            groups.append(terms)
+    return groups
+
+
+class MockSearchClient:
+    def __init__(self, corpus):
+        self.corpus = corpus  # newest first, like the API
+        self.requests = 0
+
+    @staticmethod
+    def _matches(text, groups):
+        words = f" {text.lower()} "
+        return all(any(f" {term} " in words for term in group) for group in groups)
+
+    def search_recent_tweets(self, query, max_results=10, next_token=None, since_id=None, until_id=None, **kwargs):
+        self.requests += 1
+        groups = parse_query(query)
+        hits = [t for t in self.corpus if self._matches(t.text, groups) and (not since_id or t.id > int(since_id))
+                and (not until_id or t.id < int(until_id))]
+        offset = int(next_token or 0)
+        page = hits[offset:offset + max_results]
+        meta = {"result_count": len(page)}
+        if offset + max_results < len(hits):
+            meta["next_token"] = str(offset + max_results)
+        return Response(page or None, {}, [], meta)
+
+
+def old_scan(client):
+    location_string = " OR ".join(LOCATIONS[:5])
+    found = {}
+    for keyword in KEYWORDS:
+        query = f'"{keyword}" ({location_string}) -is:retweet lang:en OR lang:sw'
+        for tweet in client.search_recent_tweets(query=query, max_results=10).data or []:
+            found[tweet.id] = tweet
+    return found
+
+
+def packed_scan(client, max_length, max_pages):
+    attributor = KeywordAttributor(KEYWORDS)
+    found, triggers = {}, {}
+    for plan in plan_queries(KEYWORDS, LOCATIONS, max_length=max_length):
+        try:
+            for tweet in search_all(client.search_recent_tweets, plan, max_results=100, max_pages=max_pages):
+                found[tweet.id] = tweet
+                triggers[tweet.id] = attributor.match(tweet.text)
+        except SearchTruncated:
+            pass  # what max_pages leaves out is part of what's being measured
+    return found, triggers
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tweets", type=int, default=5000)
+    ap.add_argument("--max-length", type=int, default=512)
+    ap.add_argument("--max-pages", type=int, default=3)
+    args = ap.parse_args()
+
+    corpus, truth = make_corpus(args.tweets)
+    relevant = {tid for tid, (kws, place) in truth.items() if kws and place}
+
+    client = MockSearchClient(corpus)
+    found = old_scan(client)
+    hit = len(relevant & set(found))
+    print(f"per-keyword  requests={client.requests:3d}  retrieved {hit}/{len(relevant)} matching tweets  "
+          f"{hit / client.requests:6.1f} per request")
+
+    client = MockSearchClient(corpus)
+    found, triggers = packed_scan(client, args.max_length, args.max_pages)
+    hit = len(relevant & set(found))
+    print(f"packed       requests={client.requests:3d}  retrieved {hit}/{len(relevant)} matching tweets  "
+          f"{hit / client.requests:6.1f} per request")
+
+    wrong = [tid for tid in found if sorted(triggers[tid]) != truth[tid][0]]
+    assert not (set(found) - relevant), "packed queries returned tweets outside the keyword x location filter"
+    assert not wrong, f"{len(wrong)} tweets attributed to the wrong keywords, e.g. {found[wrong[0]].text!r}"
+    print("keyword attribution matches the ground truth for every retrieved tweet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Simulated Twitter scans: the old sequential loop vs RateLimiter + SearchScheduler.
+
+    python benchmarks/bench_rate_limiter.py --queries 15 --latency 0.3
+
+Runs against a mock search client that enforces a fixed rate-limit window and answers
+with x-rate-limit-* headers (429 once the window is spent). Time is a fake clock: request
+latency is real but scaled down by --speedup, and every sleep just moves the clock forward,
+so a scan that would take minutes is simulated in a second.
+
+  old        – one search at a time, random 8–15 s pause after each (the previous run())
+  scheduler  – searches on a 4-thread pool, waiting only when the limiter says so
+  exhausted  – more queries than one window allows; checks the limiter never triggers a 429
+"""
+import argparse
+import random
+import threading
+import time
+
+import stand_in_server  # noqa: F401 – puts the repo root on sys.path
+from rate_limiter import RateLimiter, SearchScheduler
+
+
+class FakeClock:
+    """Wall clock = start + real elapsed * speedup + time skipped by sleep()."""
+
+    def __init__(self, speedup: float = 100.0, start: float = 1_700_000_000.0):
+        self.speedup = speedup
+        self.start = start
+        self._real_start = time.perf_counter()
+        self._offset = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        return self.start + (time.perf_counter() - self._real_start) * self.speedup + self._offset
+
+    def sleep(self, seconds: float):
+        # Sleepers waiting for the same moment don't add up – the clock jumps to the latest target
+        with self._lock:
+            target = self() + seconds
+            self._offset += max(0.0, target - self())
+
+    def latency(self, seconds: float):
+        time.sleep(seconds / self.speedup)
+
+
+class MockSearchApi:
+    """Fixed-window rate limiting like the v2 search endpoint."""
+
+    def __init__(self, clock: FakeClock, limit: int, window: float, latency: float):
+        self.clock = clock
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.window_start = clock()
+        self.used = 0
+        self.calls = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def search(self, query: str):
+        self.clock.latency(self.latency)
+        with self._lock:
+            now = self.clock()
+            if now >= self.window_start + self.window:
+                self.window_start, self.used = now, 0
+            self.calls += 1
+            reset = self.window_start + self.window
+            if self.used >= self.limit:
+                self.rejected += 1
+                return 429, {"x-rate-limit-limit": str(self.limit), "x-rate-limit-remaining": "0",
+                             "x-rate-limit-reset": str(int(reset))}
+            self.used += 1
+            return 200, {"x-rate-limit-limit": str(self.limit),
+                         "x-rate-limit-remaining": str(self.limit - self.used),
+                         "x-rate-limit-reset": str(int(reset))}
+
+
+class MockClient:
+    """What LimitedClient + TwitterClient.search_keyword do, minus tweepy."""
+
+    def __init__(self, api: MockSearchApi, limiter: RateLimiter):
+        self.api = api
+        self.limiter = limiter
+
+    def search(self, query: str):
+        for _ in range(2):
+            self.limiter.acquire()
+            status, headers = 0, None
+            try:
+                status, headers = self.api.search(query)
+            finally:
+                self.limiter.release(headers)
+            if status == 200:
+                return [query]
+        return []
+
+
+def run_old(queries, args):
+    clock = FakeClock(args.speedup)
+    api = MockSearchApi(clock, args.limit, args.window, args.latency)
+    start = clock()
+    for query in queries:
+        api.search(query)
+        clock.sleep(random.uniform(8, 15))
+    return clock() - start, api
+
+
+def run_scheduler(queries, args, limit=None):
+    clock = FakeClock(args.speedup)
+    api = MockSearchApi(clock, limit or args.limit, args.window, args.latency)
+    limiter = RateLimiter(limit or args.limit, args.window, clock=clock, sleep=clock.sleep)
+    scheduler = SearchScheduler(args.workers)
+    client = MockClient(api, limiter)
+    start = clock()
+    found = sum(len(result) for _, result in scheduler.run(client.search, queries))
+    scheduler.close()
+    return clock() - start, api, found
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--queries", type=int, default=15)
+    ap.add_argument("--latency", type=float, default=0.3, help="simulated API latency per request (s)")
+    ap.add_argument("--limit", type=int, default=150, help="requests per window")
+    ap.add_argument("--window", type=float, default=900.0, help="window length (s)")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--speedup", type=float, default=100.0, help="simulated seconds per real second")
+    args = ap.parse_args()
+    queries = [f"keyword {i}" for i in range(args.queries)]
+
+    elapsed, api = run_old(queries, args)
+    print(f"old        {elapsed:8.1f}s simulated  requests={api.calls} 429s={api.rejected}")
+    elapsed, api, found = run_scheduler(queries, args)
+    print(f"scheduler  {elapsed:8.1f}s simulated  requests={api.calls} 429s={api.rejected} results={found}")
+
+    small_limit = 20
+    many = [f"keyword {i}" for i in range(60)]
+    elapsed, api, found = run_scheduler(many, args, limit=small_limit)
+    print(f"exhausted  {elapsed:8.1f}s simulated  requests={api.calls} 429s={api.rejected} results={found} "
+          f"(limit {small_limit}/{args.window:.0f}s)")
+    assert found == len(many), "every query should eventually run"
+    assert api.rejected == 0, "the limiter should wait for the reset instead of hitting 429"
+
+
+if __name__ == "__main__":
+    main()
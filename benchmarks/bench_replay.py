@@ -0,0 +1,392 @@
+"""
+Both crawlers replayed offline from recorded fixtures (replay.py): per-stage throughput,
+wall-clock and peak memory for a run, and a comparison of two runs to catch regressions.
+
+    python benchmarks/bench_replay.py synth --fixtures /tmp/fx              # synthetic fixtures
+    python benchmarks/bench_replay.py record --fixtures fixtures/oct18      # a live crawl + scan, kept
+    python benchmarks/bench_replay.py run --fixtures /tmp/fx --out before.json
+    ... change something ...
+    python benchmarks/bench_replay.py run --fixtures /tmp/fx --out after.json
+    python benchmarks/bench_replay.py compare before.json after.json
+
+run replays each crawler in a fresh interpreter (--repeat times, keeping the fastest) with its
+state in a scratch directory – crawl state, near-duplicate index, Twitter checkpoint, archive
+– and the analysis cache and site scheduler off, so every run does the same work. The news
+crawl goes through run_crawl, the pipeline main_scraper collects into a DataFrame: homepages,
+extract_article_links' link extraction, the date pre-filter, downloads, parsing,
+categorize_article, analyze_article in batches, the archive write. The Twitter scan goes
+through SafeGuardScanner.run, so every search page reaches _process_tweets. NLP is a stub –
+fixed CPU per call plus per padded token, as in bench_inference – unless --ner-model and
+--sentiment-model name real checkpoints (pick tiny ones).
+
+Reported per crawler: wall-clock, peak RSS, items out, fixtures hit and missed, and per stage
+(the run's metrics report) the call count, total seconds, p95 and calls per second of stage
+time. compare flags every stage whose total time, and every crawler whose wall-clock or peak
+memory, grew by more than --threshold – and by more than --min-seconds / --min-mb, to stay
+clear of noise – and exits 1 when anything did.
+
+synth needs no network: --sites stand-in news sites with --articles stories each (the same
+wire copy turns up on several sites) and, when twitter_crawler imports, --pages search pages
+per planned query mixing threat posts, near-copies and noise. Articles are dated when they're
+written, so make fresh fixtures instead of keeping these – a month on, they'd all be skipped
+as old. record runs the real crawlers against the live sites and API with SAFEGUARD_RECORD_DIR
+set; replay them soon after for the same reason.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+from stand_in_server import PARAGRAPH, REPO_ROOT, TOWNS, make_article_html, make_homepage_html
+
+RESULT_MARKER = "REPLAY_RESULT "
+MANIFEST = "manifest.json"
+TWITTER_SEARCH_URL = "https://api.twitter.com/2/tweets/search/recent"
+# What TwitterClient.search asks for; tweepy sends list fields comma-joined under dotted names
+TWEET_FIELDS = "id,text,created_at,lang"
+
+
+def peak_rss_mb():
+    # VmHWM starts afresh at exec, so a child reports its own peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def read_manifest(fixtures):
+    try:
+        with open(os.path.join(fixtures, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_manifest(fixtures, manifest):
+    with open(os.path.join(fixtures, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+# -------------------------- synthetic fixtures --------------------------
+def synth_news(store, sites, articles, rng):
+    from replay import Fixture
+
+    now = datetime.now()
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+    urls = []
+    for s in range(sites):
+        base = f"https://site-{s}.replay.test"
+        paths = [f"/news/{s}-{i}" for i in range(articles)]
+        store.save(Fixture("GET", base + "/", 200, headers, make_homepage_html(paths).encode("utf-8"), 0.4))
+        for i, path in enumerate(paths):
+            # Every third story is wire copy that other sites carry too
+            story = rng.randrange(articles * 2) if i % 3 == 0 else s * 1000 + i
+            html = make_article_html(story, now - timedelta(days=i % 20), paragraphs=rng.randint(3, 12),
+                                     json_ld=i % 2 == 0)
+            store.save(Fixture("GET", base + path, 200, headers, html.encode("utf-8"), rng.uniform(0.1, 0.6)))
+        urls.append(base + "/")
+    return urls
+
+
+def synth_tweets(store, pages, rng):
+    """Search pages for every query the scanner plans, or None when twitter_crawler can't be imported."""
+    try:
+        from twitter_crawler import Config, SafeGuardScanner  # noqa: F401 – Config is what the scanner plans from
+    except ImportError as e:
+        print(f"twitter fixtures skipped: {e}")
+        return None
+    from keyword_matcher import load_lexicon
+    from query_planner import plan_queries
+    from replay import Fixture
+
+    threat_terms = [t for terms in load_lexicon()["threat_levels"].values() for t in terms]
+    plans = plan_queries(Config.KEYWORDS, Config.KENYAN_LOCATIONS, Config.SEARCH_LANGS,
+                         max_length=Config.MAX_QUERY_LENGTH)
+    now = datetime.now(timezone.utc)
+    tweet_id = 1_800_000_000_000_000_000
+    templates = ["{term} – this is happening in {town} again, someone help",
+                 "Police in {town} say the {term} case is under investigation",
+                 "Nimechoka na {term} hapa {town} #EndFemicide",
+                 "Great match today in {town}, what a goal!",
+                 "Traffic on the way to {town} is terrible this morning"]
+    pages = min(pages, Config.MAX_PAGES)
+    for plan in plans:
+        next_token = None
+        for page in range(pages):
+            data = []
+            for _ in range(Config.MAX_RESULTS):
+                tweet_id += rng.randint(1, 1000)
+                text = rng.choice(templates).format(term=rng.choice(threat_terms), town=rng.choice(TOWNS))
+                if rng.random() < 0.3:
+                    text += f" https://t.co/{rng.randrange(16 ** 8):08x} @user{rng.randrange(500)}"
+                created = now - timedelta(minutes=rng.randint(0, 600))
+                data.append({"id": str(tweet_id), "text": text, "edit_history_tweet_ids": [str(tweet_id)],
+                             "created_at": created.strftime("%Y-%m-%dT%H:%M:%S.000Z"), "lang": "en"})
+            params = {"query": plan.query, "max_results": Config.MAX_RESULTS, "tweet.fields": TWEET_FIELDS}
+            if next_token:
+                params["next_token"] = next_token
+            next_token = f"page{page + 1}-{rng.randrange(16 ** 10):010x}" if page + 1 < pages else None
+            meta = {"result_count": len(data), "newest_id": data[-1]["id"], "oldest_id": data[0]["id"]}
+            if next_token:
+                meta["next_token"] = next_token
+            store.save(Fixture("GET", f"{TWITTER_SEARCH_URL}?{urlencode(params)}", 200,
+                               {"Content-Type": "application/json; charset=utf-8"},
+                               json.dumps({"data": data, "meta": meta}).encode("utf-8"), rng.uniform(0.3, 0.9)))
+    return len(plans) * pages
+
+
+def synth(args):
+    from replay import FixtureStore
+
+    rng = random.Random(args.seed)
+    store = FixtureStore(args.fixtures)
+    sites = synth_news(store, args.sites, args.articles, rng)
+    search_pages = synth_tweets(store, args.pages, rng)
+    write_manifest(args.fixtures, {"kind": "synthetic", "created_at": datetime.now().isoformat(timespec="seconds"),
+                                   "news_sites": sites, "max_articles": args.max_articles,
+                                   "twitter": search_pages is not None})
+    print(f"wrote {len(store)} responses to {args.fixtures}: {len(sites)} sites x {args.articles} articles, "
+          f"{search_pages or 0} search pages")
+
+
+# -------------------------- one crawler, in a fresh interpreter --------------------------
+def use_nlp(ner_model, sentiment_model):
+    from inference import InferenceEngine, build_engine, use_engine
+
+    if ner_model and sentiment_model:
+        use_engine(build_engine({"default": (ner_model, sentiment_model)}))
+    else:
+        from bench_inference import StubPipeline
+        use_engine(InferenceEngine(StubPipeline("ner"), StubPipeline("sentiment")))
+
+
+def crawl_news(manifest):
+    import WebCrawler_V1 as crawler
+    from metrics import new_run
+    from sinks import PartitionedSink
+
+    metrics = new_run(crawler.METRICS_JOB)
+    start = time.perf_counter()
+    count = crawler.run_crawl([PartitionedSink()], scheduler=None, site_urls=manifest.get("news_sites") or crawler.SITE_URLS,
+                              max_articles=manifest.get("max_articles", 10), browser_pool_size=1)
+    return time.perf_counter() - start, count, metrics.report()
+
+
+def scan_twitter(manifest):
+    import twitter_crawler
+    from metrics import new_run
+
+    metrics = new_run("twitter", breakdown="query")
+    scanner = twitter_crawler.SafeGuardScanner(metrics)
+    start = time.perf_counter()
+    scanner.run()
+    wall = time.perf_counter() - start
+    scanner.close()
+    report = metrics.report()
+    return wall, sum(q["counters"].get("threats_saved", 0) for q in report["by_query"].values()), report
+
+
+def child(crawler, fixtures, ner_model, sentiment_model):
+    try:
+        use_nlp(ner_model, sentiment_model)
+        wall, items, report = (crawl_news if crawler == "news" else scan_twitter)(read_manifest(fixtures))
+    except ImportError as e:
+        result = {"skipped": f"{type(e).__name__}: {e}"}
+    else:
+        import replay
+        stages = {name: {**s, "per_s": round(s["count"] / s["total_s"], 1) if s["total_s"] else None}
+                  for name, s in report["stages"].items()}
+        result = {"wall_s": round(wall, 3), "peak_rss_mb": round(peak_rss_mb(), 1), "items": items,
+                  "items_per_s": round(items / wall, 2) if wall else None, "replay": dict(replay.get_store().stats),
+                  "stages": stages, "counters": report["counters"], "skipped": report["skipped"]}
+    print(RESULT_MARKER + json.dumps(result))
+
+
+def run_child(crawler, fixtures, mode, args):
+    """Runs one crawler over the fixtures in a fresh interpreter with scratch state; returns its result."""
+    scratch = tempfile.mkdtemp(prefix=f"bench_replay_{crawler}_")
+    env = dict(os.environ)
+    for name in ("SAFEGUARD_REPLAY_DIR", "SAFEGUARD_RECORD_DIR", "SAFEGUARD_INFERENCE_SOCKET"):
+        env.pop(name, None)
+    env.update({
+        "SAFEGUARD_REPLAY_DIR" if mode == "replay" else "SAFEGUARD_RECORD_DIR": os.path.abspath(fixtures),
+        "SAFEGUARD_ANALYSIS_CACHE": "off",
+        "SAFEGUARD_SITE_SCHEDULE": "off",
+        "SAFEGUARD_CRAWL_STATE": os.path.join(scratch, "crawl_state.sqlite"),
+        "SAFEGUARD_NEAR_DUP_INDEX": os.path.join(scratch, "near_duplicates.sqlite"),
+        "SAFEGUARD_TWITTER_CHECKPOINT": os.path.join(scratch, "checkpoint.json"),
+        "SAFEGUARD_ARCHIVE_DIR": os.path.join(scratch, "archive"),
+        "SAFEGUARD_RUN_REPORT_DIR": os.path.join(scratch, "run_reports"),
+        "SAFEGUARD_SPOOL_DIR": os.path.join(scratch, "spool"),
+        # Nothing gets written to Supabase from a benchmark
+        "SUPABASE_URL": "", "SUPABASE_KEY": "",
+    })
+    if mode == "replay":
+        env.setdefault("TWITTER_BEARER_TOKEN", "replay")
+    try:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "_child", crawler, os.path.abspath(fixtures),
+                               args.ner_model or "", args.sentiment_model or ""],
+                              cwd=scratch, env=env, capture_output=True, text=True)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{crawler} run failed (exit {proc.returncode}):\n{(proc.stdout + proc.stderr)[-3000:]}")
+
+
+def print_result(crawler, r):
+    if "skipped" in r and "wall_s" not in r:
+        print(f"\n{crawler}: skipped – {r['skipped']}")
+        return
+    print(f"\n{crawler}: {r['wall_s']:.2f}s wall, {r['items']} items ({r['items_per_s']}/s), "
+          f"peak RSS {r['peak_rss_mb']:.0f} MB, fixtures {r['replay']}")
+    print(f"  {'stage':14} {'calls':>6} {'total s':>8} {'p95 s':>7} {'calls/s':>8}")
+    for stage, s in r["stages"].items():
+        print(f"  {stage:14} {s['count']:>6} {s['total_s']:>8.3f} {s['p95_s']:>7.3f} {s['per_s'] or 0:>8.1f}")
+
+
+def crawlers_for(args, manifest):
+    wanted = args.crawlers.split(",")
+    return [c for c in wanted if c == "news" or manifest.get("twitter", True)]
+
+
+def record(args):
+    from WebCrawler_V1 import SITE_URLS  # the live site list; also fails early without the crawler's deps
+
+    os.makedirs(args.fixtures, exist_ok=True)
+    write_manifest(args.fixtures, {"kind": "recorded", "created_at": datetime.now().isoformat(timespec="seconds"),
+                                   "news_sites": SITE_URLS, "max_articles": args.max_articles,
+                                   "twitter": "twitter" in args.crawlers.split(",")})
+    for crawler in args.crawlers.split(","):
+        print_result(crawler, run_child(crawler, args.fixtures, "record", args))
+
+
+def run(args):
+    manifest = read_manifest(args.fixtures)
+    report = {"fixtures": os.path.abspath(args.fixtures), "fixture_kind": manifest.get("kind", "recorded"),
+              "created_at": datetime.now().isoformat(timespec="seconds"), "repeat": args.repeat,
+              "nlp": f"{args.ner_model} + {args.sentiment_model}" if args.ner_model else "stub", "crawlers": {}}
+    for crawler in crawlers_for(args, manifest):
+        runs = [run_child(crawler, args.fixtures, "replay", args) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r.get("wall_s", 0))
+        report["crawlers"][crawler] = best
+        print_result(crawler, best)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nreport written to {args.out}")
+    ran = [r for r in report["crawlers"].values() if "wall_s" in r]
+    assert ran, "no crawler could run here – see the skip reasons above"
+    for crawler, r in report["crawlers"].items():
+        if "wall_s" in r:
+            assert r["replay"].get("hits", 0) > 0, f"{crawler} never used a fixture"
+            assert r["items"] > 0, f"{crawler} produced nothing from the fixtures"
+    return report
+
+
+# -------------------------- comparing two runs --------------------------
+def compare_reports(before, after, threshold=0.1, min_seconds=0.05, min_mb=10.0):
+    """Prints the side-by-side table; returns the regressions as strings."""
+    regressions = []
+
+    def check(label, old, new, floor, unit):
+        change = (new - old) / old if old else 0.0
+        flag = change > threshold and new - old > floor
+        if flag:
+            regressions.append(f"{label}: {old:.3f} -> {new:.3f} {unit} ({change:+.0%})")
+        return f"{change:+7.1%}{'  <-- regression' if flag else ''}"
+
+    for crawler in sorted(set(before["crawlers"]) | set(after["crawlers"])):
+        a, b = before["crawlers"].get(crawler, {}), after["crawlers"].get(crawler, {})
+        if "wall_s" not in a or "wall_s" not in b:
+            print(f"\n{crawler}: didn't run in both")
+            continue
+        print(f"\n{crawler}")
+        print(f"  {'':14} {'before':>9} {'after':>9} {'change':>8}")
+        print(f"  {'wall s':14} {a['wall_s']:>9.3f} {b['wall_s']:>9.3f} "
+              f"{check(f'{crawler} wall', a['wall_s'], b['wall_s'], min_seconds, 's')}")
+        print(f"  {'peak RSS MB':14} {a['peak_rss_mb']:>9.1f} {b['peak_rss_mb']:>9.1f} "
+              f"{check(f'{crawler} peak RSS', a['peak_rss_mb'], b['peak_rss_mb'], min_mb, 'MB')}")
+        print(f"  {'items':14} {a['items']:>9} {b['items']:>9}"
+              f"{'  (output changed – stage times compare different work)' if a['items'] != b['items'] else ''}")
+        for stage in sorted(set(a["stages"]) | set(b["stages"])):
+            sa, sb = a["stages"].get(stage), b["stages"].get(stage)
+            if not sa or not sb:
+                print(f"  {stage:14} {'-' if not sa else sa['total_s']:>9} {'-' if not sb else sb['total_s']:>9}")
+                continue
+            print(f"  {stage:14} {sa['total_s']:>9.3f} {sb['total_s']:>9.3f} "
+                  f"{check(f'{crawler} {stage}', sa['total_s'], sb['total_s'], min_seconds, 's')}")
+    if before.get("fixtures") != after.get("fixtures") or before.get("nlp") != after.get("nlp"):
+        print("\nnote: the runs used different fixtures or NLP – the numbers may not be comparable")
+    return regressions
+
+
+def compare(args):
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    regressions = compare_reports(before, after, args.threshold, args.min_seconds, args.min_mb)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nno regressions over {args.threshold:.0%}")
+    return 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "_child":
+        crawler, fixtures, ner_model, sentiment_model = sys.argv[2:6]
+        return child(crawler, fixtures, ner_model or None, sentiment_model or None)
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+    for name in ("synth", "record", "run"):
+        p = sub.add_parser(name)
+        p.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "safeguard_fixtures"))
+        p.add_argument("--crawlers", default="news,twitter")
+        p.add_argument("--max-articles", type=int, default=10, help="links per site")
+        if name == "synth":
+            p.add_argument("--sites", type=int, default=12)
+            p.add_argument("--articles", type=int, default=20, help="stories per site")
+            p.add_argument("--pages", type=int, default=3, help="search pages per query")
+            p.add_argument("--seed", type=int, default=7)
+        else:
+            p.add_argument("--ner-model", help="real NER checkpoint instead of the stub")
+            p.add_argument("--sentiment-model", help="real sentiment checkpoint instead of the stub")
+        if name == "run":
+            p.add_argument("--repeat", type=int, default=3, help="runs per crawler; the fastest is kept")
+            p.add_argument("--out", help="write the run report here")
+    p = sub.add_parser("compare")
+    p.add_argument("before")
+    p.add_argument("after")
+    p.add_argument("--threshold", type=float, default=0.10, help="relative growth that counts as a regression")
+    p.add_argument("--min-seconds", type=float, default=0.05, help="ignore smaller absolute time changes")
+    p.add_argument("--min-mb", type=float, default=10.0, help="ignore smaller peak memory changes")
+    args = ap.parse_args()
+    if args.command == "synth":
+        return synth(args)
+    if args.command == "record":
+        return record(args)
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Import time and first-result latency for the news crawler module.
+
+    python benchmarks/bench_startup.py                  # this tree, local lazy loading
+    python benchmarks/bench_startup.py --worker         # also via a running inference_worker.py
+    git worktree add /tmp/before <ref>
+    python benchmarks/bench_startup.py --tree /tmp/before   # the same numbers for an older tree
+
+Each measurement runs in a fresh interpreter, so nothing is cached between runs beyond
+the OS page cache and the Hugging Face model cache on disk.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from stand_in_server import PARAGRAPH, REPO_ROOT
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import WebCrawler_V1
+t1 = time.perf_counter()
+WebCrawler_V1.analyze_article(sys.argv[1])
+t2 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "first_result_s": t2 - t1}))
+"""
+
+
+def probe(tree, env, runs):
+    text = PARAGRAPH.format(town="Nairobi", day="Monday") * 3
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE, text], cwd=tree, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    best = lambda key: min(r[key] for r in results)
+    return best("import_s"), best("first_result_s")
+
+
+def start_worker(tree, socket_path, env):
+    proc = subprocess.Popen([sys.executable, "inference_worker.py", "--socket", socket_path],
+                            cwd=tree, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 600
+    while not os.path.exists(socket_path):
+        if proc.poll() is not None or time.time() > deadline:
+            raise RuntimeError("inference worker failed to start")
+        time.sleep(0.2)
+    return proc
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tree", default=REPO_ROOT, help="checkout to measure (default: this one)")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--worker", action="store_true", help="also measure with a shared inference worker")
+    args = ap.parse_args()
+
+    env = {**os.environ, "TOKENIZERS_PARALLELISM": "false"}
+    env.pop("SAFEGUARD_INFERENCE_SOCKET", None)
+    imp, first = probe(args.tree, env, args.runs)
+    print(f"{'local':>8}: import {imp:7.3f}s   first result {first:7.3f}s")
+
+    if args.worker:
+        socket_path = os.path.join(tempfile.mkdtemp(), "inference.sock")
+        worker = start_worker(args.tree, socket_path, env)
+        try:
+            imp, first = probe(args.tree, {**env, "SAFEGUARD_INFERENCE_SOCKET": socket_path}, args.runs)
+            print(f"{'worker':>8}: import {imp:7.3f}s   first result {first:7.3f}s")
+        finally:
+            worker.terminate()
+            worker.wait()
+
+
+if __name__ == "__main__":
+    main()
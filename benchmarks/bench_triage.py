@@ -0,0 +1,116 @@
+"""
+Tweet triage under heavy keyword traffic: gate + per-page NLP vs gate + dedupe + one batch.
+
+    python benchmarks/bench_triage.py --tweets 2000 --duplicate-share 0.5
+
+Builds pages of synthetic tweets in which --threat-share mention threat terms and
+--duplicate-share of those are retweets / copies of an earlier tweet (different links,
+mentions, punctuation). Both paths use the same stub pipelines as bench_inference.py.
+
+  old     – matcher scan for the score, again for keyword hits and a substring pass for
+            locations, then batched sentiment and NER over every flagged tweet
+  triage  – one matcher pass, near-duplicates folded (across pages too), one
+            engine.analyze() call per page over the distinct survivors
+
+Reports texts sent to the models, wall time and the per-tier pass rates.
+"""
+import argparse
+import random
+import time
+
+from bench_inference import StubPipeline
+from inference import InferenceEngine
+from keyword_matcher import KeywordMatcher, load_lexicon
+from triage import TriageStats, triage
+
+LOCATIONS = ['nairobi', 'mombasa', 'kisumu', 'nakuru', 'eldoret', 'thika', 'kakamega', 'machakos', 'kitui',
+             'meru', 'nyeri', 'kajiado', 'narok']
+MATCHER = KeywordMatcher({**load_lexicon()["threat_levels"], "location": LOCATIONS})
+CALM = ["Traffic is slow on the highway this morning", "Great match at the stadium last night",
+        "Prices at the market went up again", "Heavy rain expected over the weekend"]
+THREATS = ["I will kill you if you show up again", "They threatened to rape her after the meeting",
+           "Stop the femicide, another woman attacked", "He keeps harassing and stalking my sister",
+           "Wanasema watamkuua kesho", "Domestic violence case reported, the husband beat her"]
+
+
+def score(hits):
+    value = 85 if hits.counts.get("critical") else 75 if hits.counts.get("high") else \
+        60 if hits.counts.get("medium") else 0
+    return min(95, value + 10) if hits.counts.get("location") and value else value
+
+
+def make_pages(n, page_size, threat_share, duplicate_share, seed=3):
+    rng = random.Random(seed)
+    tweets, originals = [], []
+    for i in range(n):
+        if rng.random() >= threat_share:
+            text = f"{rng.choice(CALM)} in {rng.choice(LOCATIONS).title()} #{i}"
+        elif originals and rng.random() < duplicate_share:
+            base = rng.choice(originals)
+            text = rng.choice([f"RT @user{i}: {base}", f"{base} https://t.co/{i:08x}", f"{base.upper()}!!"])
+        else:
+            text = f"{rng.choice(THREATS)} near {rng.choice(LOCATIONS).title()} case {i}"
+            originals.append(text)
+        tweets.append(text)
+    return [tweets[i:i + page_size] for i in range(0, n, page_size)]
+
+
+def old_path(engine, pages):
+    sent = 0
+    for page in pages:
+        flagged = []
+        for text in page:
+            if score(MATCHER.scan(text)) > 50:
+                MATCHER.scan(text)  # keyword hits for the report
+                any(loc in text.lower() for loc in LOCATIONS)  # location_boosted
+                flagged.append(text)
+        if flagged:
+            engine.sentiments(flagged)
+            engine.entities(flagged)
+            sent += len(flagged)
+    return sent
+
+
+def triage_path(engine, pages):
+    totals = TriageStats()
+
+    def gate(text):
+        hits = MATCHER.scan(text)
+        return hits if score(hits) > 50 else None
+
+    results = {}
+    for page in pages:
+        survivors, to_analyze, stats = triage(page, gate, known=results)
+        totals.add(stats)
+        if to_analyze:
+            results.update(zip(to_analyze, engine.analyze(list(to_analyze.values()))))
+        assert all(s.key in results for s in survivors)
+    return totals
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tweets", type=int, default=2000)
+    ap.add_argument("--page-size", type=int, default=100)
+    ap.add_argument("--threat-share", type=float, default=0.6)
+    ap.add_argument("--duplicate-share", type=float, default=0.5)
+    args = ap.parse_args()
+
+    pages = make_pages(args.tweets, args.page_size, args.threat_share, args.duplicate_share)
+    engine = InferenceEngine(StubPipeline("ner"), StubPipeline("sentiment"), batch_size=16)
+
+    start = time.perf_counter()
+    sent = old_path(engine, pages)
+    elapsed = time.perf_counter() - start
+    print(f"old     {elapsed:6.2f}s  texts to NLP={sent}")
+
+    start = time.perf_counter()
+    totals = triage_path(engine, pages)
+    elapsed = time.perf_counter() - start
+    print(f"triage  {elapsed:6.2f}s  texts to NLP={totals.distinct}")
+    print("        " + totals.summary())
+    print("        pass rates: " + ", ".join(f"{k}={v:.0%}" for k, v in totals.pass_rates().items()))
+
+
+if __name__ == "__main__":
+    main()
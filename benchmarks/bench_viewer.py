@@ -0,0 +1,164 @@
+"""
+Reading scraped_articles back: one select('*') vs keyset pages, against the local PostgREST stand-in.
+
+    python benchmarks/bench_viewer.py --rows 100000 --text-chars 3000
+
+The stand-in is filled with --rows articles (a year of publish dates, five categories, the
+crawler's sites, a full_text of --text-chars each). Every read runs in its own child process
+so its peak RSS is the client's alone:
+
+    select-all   the old viewer: GET select=* in one response
+    offset       the viewer's columns, 1000-row pages by limit/offset
+    keyset       view_scraped_articles.ArticlePager: id=gt.<last>&order=id.asc pages
+    filtered     keyset with server-side filters (one category, the last 90 days)
+    export       keyset with every column into a month-partitioned archive (sinks.PartitionedSink),
+                 read back with iter_archive (Parquet with pyarrow, jsonl without)
+
+First/last columns are the mean time of the first and last five pages – offset pages slow
+down with depth, keyset pages don't. Checks: every id read exactly once, the filtered
+count matches the data, the archive holds every row.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from fake_postgrest import FakePostgrest
+from sinks import ARTICLE_COLUMNS, iter_archive
+from view_scraped_articles import DEFAULT_COLUMNS, PAGE_SIZE, ArticlePager, build_filters, open_export
+
+MODES = ("select-all", "offset", "keyset", "filtered", "export")
+CATEGORIES = ["GBV", "Crime", "Politics", "Health", "Cyber"]
+SITES = ["https://nation.africa/kenya/", "https://www.standardmedia.co.ke/", "https://www.the-star.co.ke/",
+         "https://taifaleo.nation.co.ke/", "https://www.kenyans.co.ke/"]
+TODAY = date(2026, 10, 1)
+FILTER_DAYS = 90
+
+
+def fill(server, n, text_chars, seed=3):
+    rng = random.Random(seed)
+    text = ("Police in Nakuru said they were investigating reports of online harassment. " * 60)[:text_chars]
+    records = []
+    for i in range(n):
+        records.append({"site_url": SITES[i % len(SITES)], "article_url": f"{SITES[i % len(SITES)]}news/story-{i}",
+                        "title": f"Story {i} about the county", "keyword_category": rng.choice(CATEGORIES),
+                        "publish_date": (TODAY - timedelta(days=rng.randint(0, 364))).isoformat(),
+                        "summary_snippet": text[:200], "full_text": text, "entities": "LOC: Nakuru",
+                        "sentiment": "NEGATIVE", "sentiment_score": round(rng.random(), 3)})
+    server.upsert("scraped_articles", "article_url", records)
+    since = (TODAY - timedelta(days=FILTER_DAYS)).isoformat()
+    expected = sum(r["keyword_category"] == "GBV" and r["publish_date"] >= since for r in records)
+    return expected
+
+
+def peak_rss_mb():
+    # VmHWM starts afresh at exec; ru_maxrss would carry over the parent's (the stand-in's) peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _timed_pages(pages):
+    times, rows = [], []
+    start = time.perf_counter()
+    for page in pages:
+        times.append(time.perf_counter() - start)
+        rows.extend(r["id"] for r in page)
+        start = time.perf_counter()
+    return times, rows
+
+
+def _offset_pages(pager, columns):
+    offset = 0
+    while True:
+        page = pager._get([("select", ",".join(columns)), ("order", "id.asc"),
+                           ("limit", str(PAGE_SIZE)), ("offset", str(offset))])
+        if not page:
+            return
+        yield page
+        offset += len(page)
+
+
+def child(mode, url):
+    pager = ArticlePager(url, "anon-key")
+    out = {"mode": mode}
+    start = time.perf_counter()
+    if mode == "select-all":
+        rows = pager._get([("select", "*")])
+        ids, times = [r["id"] for r in rows], []
+        del rows
+    elif mode == "offset":
+        times, ids = _timed_pages(_offset_pages(pager, DEFAULT_COLUMNS))
+    elif mode == "keyset":
+        times, ids = _timed_pages(pager.pages(DEFAULT_COLUMNS))
+    elif mode == "filtered":
+        since = (TODAY - timedelta(days=FILTER_DAYS)).isoformat()
+        times, ids = _timed_pages(pager.pages(DEFAULT_COLUMNS, build_filters(since=since, categories=["GBV"])))
+    else:
+        with tempfile.TemporaryDirectory(prefix="bench-archive-") as root:
+            sink = open_export(root, ["id"] + ARTICLE_COLUMNS, partition="month")
+            times, ids = [], []
+            for page in pager.pages(["id"] + ARTICLE_COLUMNS):
+                for row in page:
+                    sink.write(row)
+                    ids.append(row["id"])
+            sink.close()
+            out["archive"] = {"format": sink.fmt, "files": len(sink.files),
+                              "bytes": sum(os.path.getsize(f) for f in sink.files),
+                              "read_back": len({r["id"] for r in iter_archive(root, columns=["id"])})}
+    out.update(seconds=time.perf_counter() - start, rows=len(ids), unique=len(set(ids)),
+               requests=pager.stats["requests"], bytes=pager.stats["bytes"],
+               first=sum(times[:5]) / max(1, len(times[:5])), last=sum(times[-5:]) / max(1, len(times[-5:])),
+               peak_rss_mb=peak_rss_mb())
+    print(json.dumps(out))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--text-chars", type=int, default=3000)
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    ap.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    ap.add_argument("--url", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(args.child, args.url)
+
+    with FakePostgrest() as server:
+        started = time.perf_counter()
+        expected_filtered = fill(server, args.rows, args.text_chars)
+        print(f"stand-in filled with {args.rows} rows in {time.perf_counter() - started:.1f}s\n")
+        print(f"{'mode':>10} {'rows':>7} {'requests':>8} {'MB sent':>8} {'seconds':>8} {'peak RSS MB':>11} "
+              f"{'first ms':>9} {'last ms':>8}")
+        for mode in args.modes:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--url", server.base_url],
+                                  capture_output=True, text=True, check=True)
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            paged = mode not in ("select-all", "export")
+            print(f"{mode:>10} {r['rows']:>7} {r['requests']:>8} {r['bytes'] / 1e6:>8.1f} {r['seconds']:>8.2f} "
+                  f"{r['peak_rss_mb']:>11.0f} " + (f"{r['first'] * 1000:>9.1f} {r['last'] * 1000:>8.1f}" if paged else ""))
+            assert r["rows"] == r["unique"], f"{mode}: ids read more than once"
+            if mode == "filtered":
+                assert r["rows"] == expected_filtered, f"filtered: {r['rows']} rows, expected {expected_filtered}"
+            else:
+                assert r["rows"] == args.rows, f"{mode}: {r['rows']} of {args.rows} rows"
+            if mode == "export":
+                a = r["archive"]
+                print(f"{'':>10} archive: {a['format']}, {a['files']} part files, {a['bytes'] / 1e6:.1f} MB, "
+                      f"{a['read_back']} rows read back")
+                assert a["read_back"] == args.rows
+
+
+if __name__ == "__main__":
+    main()
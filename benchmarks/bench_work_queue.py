@@ -0,0 +1,229 @@
+"""
+Crawl throughput with 1..N worker processes sharing a work_queue.WorkQueue, against local
+stand-in sites.
+
+    python benchmarks/bench_work_queue.py --sites 32 --articles 15 --workers 1,2,4,8
+
+Each run starts with a fresh queue holding one "site" item per stand-in site. Worker processes
+(crawl_worker.Worker) claim sites, fetch the homepage and queue its article links, then claim
+article batches, download them (fetcher.ArticleFetcher, per-host pacing at --delay), extract
+them (article_extract, fast mode) and spend --cpu-ms of CPU per article standing in for the
+NLP pass. The crawler's own handlers need newspaper, Selenium and the models, so the benchmark
+wires up these lighter ones around the same Worker and queue.
+
+Reported per worker count: wall-clock until the queue is drained, articles/s, speedup over one
+worker, and the smallest gap between two requests to one host – any two, and two from different
+workers (the handoff the queue's group_gap paces). Throughput gains come from overlapping
+network waits and pacing across processes; CPU work only scales with cores, and the header
+line says how many this box has. A host is worked by one worker at a time and a batch takes at
+most two of a host's articles, so past sites / (batch / 2) workers the extra ones mostly wait.
+
+The crash drill (--crash) runs the largest worker count and SIGKILLs one worker while it holds
+a batch of articles: every article must still be processed – the dead worker's batch by
+another worker once the lease (--lease) runs out. --server runs the same through a
+QueueServer over HTTP, the way workers on other hosts reach the queue.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Tuple
+
+import stand_in_server  # noqa: F401 – puts the repo root on sys.path
+from stand_in_server import StandInSite, news_site_pages
+from work_queue import QueueServer, WorkQueue, open_queue
+
+
+def burn(seconds: float):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def bench_handlers(fetcher, name: str, cpu_seconds: float, results_path: str):
+    from article_extract import extract_article
+    from crawl_worker import host_of
+    from link_extractor import extract_links, rules_for
+
+    out = open(results_path, "a", encoding="utf-8")
+    tag = {"X-Client": name}  # lets the stand-in sites tell the workers' requests apart
+
+    def sites(items, queue):
+        budgets = {item.payload["site"]: item.payload["budget"] for item in items}
+        errors = {}
+        by_site = {item.payload["site"]: item for item in items}
+        for result in fetcher.fetch_many(budgets, headers=dict.fromkeys(budgets, tag)):
+            if not result.ok:
+                errors[by_site[result.url].id] = result.error or f"HTTP {result.status}"
+                continue
+            links = extract_links(result.html, rules_for(result.url), max_links=budgets[result.url])
+            queue.put_many(("article", {"site": result.url, "url": link.url}, link.url, host_of(link.url))
+                           for link in links)
+        return errors
+
+    def articles(items, queue):
+        by_url = {item.payload["url"]: item for item in items}
+        errors = {}
+        for result in fetcher.fetch_many(by_url, headers=dict.fromkeys(by_url, tag)):
+            if not result.ok:
+                errors[by_url[result.url].id] = result.error or f"HTTP {result.status}"
+                continue
+            extract_article(result.url, result.html, "fast")
+            burn(cpu_seconds)
+            out.write(result.url + "\n")
+        out.flush()
+        return errors
+
+    return {"site": sites, "article": articles}, out
+
+
+def worker_main(target: str, results_path: str, barrier, batch: int, lease: float, delay: float, cpu_ms: float):
+    from crawl_worker import Worker
+    from fetcher import ArticleFetcher
+
+    queue = open_queue(target)
+    with ArticleFetcher(max_workers=16, per_host=2, min_host_interval=delay) as fetcher:
+        name = os.path.splitext(os.path.basename(results_path))[0]
+        handlers, out = bench_handlers(fetcher, name, cpu_ms / 1000, results_path)
+        worker = Worker(queue, handlers, batch_size=batch, lease_seconds=lease, poll_seconds=0.05, group_gap=delay,
+                        name=name)
+        barrier.wait()
+        stats = worker.run(drain=True)
+        out.close()
+    with open(results_path + ".stats", "w") as f:
+        json.dump(dict(stats), f)
+
+
+def min_host_gaps(sites) -> Tuple[float, float]:
+    """The smallest gap between two requests to one host, and between two from different workers."""
+    gaps, handoffs = [float("inf")], [float("inf")]
+    for site in sites:
+        times = sorted(site.get_times)
+        for (a, client_a), (b, client_b) in zip(times, times[1:]):
+            (gaps if client_a == client_b else handoffs).append(b - a)
+    return min(gaps + handoffs), min(handoffs)
+
+
+def run(sites, workers: int, args, crash: bool = False, server: bool = False) -> dict:
+    tmp = tempfile.mkdtemp(prefix="bench_work_queue_")
+    try:
+        queue = WorkQueue(os.path.join(tmp, "queue.sqlite"), lease_seconds=args.lease)
+        queue_server = QueueServer(queue, port=0).start() if server else None
+        target = queue_server.url if server else queue.path
+        for site in sites:
+            site.get_times.clear()
+        from crawl_worker import host_of
+
+        queue.put_many(("site", {"site": site.url("/"), "budget": args.articles}, site.url("/"), host_of(site.url("/")))
+                       for site in sites)
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(workers + 1)
+        paths = [os.path.join(tmp, f"worker-{i}.txt") for i in range(workers)]
+        processes = [context.Process(target=worker_main, args=(target, path, barrier, args.batch, args.lease,
+                                                                 args.delay, args.cpu_ms))
+                     for path in paths]
+        for process in processes:
+            process.start()
+        barrier.wait()
+        start = time.perf_counter()
+        killed = None
+        if crash:
+            # Kill the first worker seen holding a batch of articles
+            watch = sqlite3.connect(queue.path, timeout=30)
+            while killed is None and any(process.is_alive() for process in processes):
+                row = watch.execute("SELECT owner FROM work_items WHERE state = 'leased' AND kind = 'article' "
+                                    "LIMIT 1").fetchone()
+                if row:
+                    killed = int(row[0].rsplit("-", 1)[1])
+                    processes[killed].kill()
+                time.sleep(0.005)
+            watch.close()
+        for process in processes:
+            process.join()
+        wall = time.perf_counter() - start
+
+        processed = []
+        stats = {}
+        for i, path in enumerate(paths):
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    processed.extend(line.strip() for line in f if line.strip())
+            if os.path.exists(path + ".stats"):
+                for name, n in json.load(open(path + ".stats")).items():
+                    stats[name] = stats.get(name, 0) + n
+        counts = queue.counts()
+        if queue_server is not None:
+            queue_server.close()
+        queue.close()
+        return {"workers": workers, "wall": wall, "processed": processed, "unique": len(set(processed)),
+                "counts": counts, "stats": stats, "gaps": min_host_gaps(sites), "killed": killed}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sites", type=int, default=32)
+    ap.add_argument("--articles", type=int, default=15, help="articles per site")
+    ap.add_argument("--latency", type=float, default=0.05, help="server latency per response (s)")
+    ap.add_argument("--delay", type=float, default=0.25, help="per-host politeness delay (s)")
+    ap.add_argument("--cpu-ms", type=float, default=5.0, help="CPU per article standing in for NLP")
+    ap.add_argument("--workers", default="1,2,4,8", help="worker counts to compare")
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--lease", type=float, default=2.0)
+    ap.add_argument("--crash", action="store_true", help="also kill a worker mid-run")
+    ap.add_argument("--server", action="store_true", help="also run the largest count through a QueueServer")
+    args = ap.parse_args()
+
+    counts = [int(n) for n in args.workers.split(",")]
+    sites = [StandInSite(news_site_pages(args.articles, i), latency=args.latency) for i in range(args.sites)]
+    for site in sites:
+        site.__enter__()
+    expected = {site.url(path) for site in sites for path in site.pages if path != "/"}
+    try:
+        print(f"{len(expected)} articles across {args.sites} stand-in sites (latency {args.latency}s, "
+              f"polite delay {args.delay}s, {args.cpu_ms:.0f}ms CPU per article), {os.cpu_count()} CPU core(s)\n")
+        print(f"{'run':>14} {'wall s':>7} {'articles/s':>10} {'speedup':>7} {'host gap s':>10} "
+              f"{'handoff gap s':>13} {'retried':>7} {'duplicates':>10}")
+        runs = [(f"{n} workers", n, False, False) for n in counts]
+        if args.server:
+            runs.append((f"{counts[-1]} via server", counts[-1], False, True))
+        if args.crash:
+            runs.append((f"{counts[-1]} + crash", counts[-1], True, False))
+        results = {}
+        for label, n, crash, server in runs:
+            r = results[label] = run(sites, n, args, crash, server)
+            base = results[f"{counts[0]} workers"]["wall"]
+            print(f"{label:>14} {r['wall']:>7.2f} {r['unique'] / r['wall']:>10.1f} {base / r['wall']:>6.2f}x "
+                  f"{r['gaps'][0]:>10.3f} {r['gaps'][1]:>13.3f} {r['stats'].get('retried', 0):>7} "
+                  f"{len(r['processed']) - r['unique']:>10}")
+
+        for label, r in results.items():
+            assert set(r["processed"]) == expected, f"{label}: {len(expected - set(r['processed']))} articles missing"
+            assert r["counts"]["failed"] == 0 and r["counts"]["ready"] == 0 and r["counts"]["leased"] == 0, \
+                f"{label}: queue not drained cleanly: {r['counts']}"
+            # Pacing holds across workers: another worker only gets a host `delay` seconds after the
+            # last one acked (one worker's own pacing is bench_fetcher's job). Arrival times at the
+            # stand-in sites jitter on a busy box – a broken handoff shows up as ~0, not 0.2
+            handoff = r["gaps"][1]
+            assert handoff >= args.delay * 0.8, f"{label}: two workers hit one host {handoff:.3f}s apart"
+            if r["killed"] is None:
+                assert len(r["processed"]) == r["unique"], f"{label}: articles processed twice without a crash"
+        one, most = results[f"{counts[0]} workers"], results[f"{counts[-1]} workers"]
+        if len(counts) > 1:
+            assert most["wall"] < one["wall"], "more workers weren't faster"
+        if args.crash:
+            crashed = results[f"{counts[-1]} + crash"]
+            assert crashed["killed"] is not None, "no worker was ever seen holding a batch"
+            assert crashed["stats"].get("retried", 0) > 0, "the dead worker's batch wasn't retried"
+    finally:
+        for site in sites:
+            site.__exit__()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Local in-memory stand-in for Supabase's PostgREST endpoint, used by the offline benchmarks.
+
+Understands just enough of the REST API for the crawlers and the viewer:
+
+    POST /rest/v1/<table>?on_conflict=<col>     upserts a JSON array into a per-table dict keyed
+                                                by that column; new rows get an increasing "id"
+    GET  /rest/v1/<table>?select=a,b&order=id.asc&limit=1000&id=gt.5000&publish_date=gte.2025-11-01
+                                                filters eq/neq/gt/gte/lt/lte/like/ilike/in/is
+
+A GET ordered by a column walks a sorted index of it (built on first use, dropped on writes)
+and starts from a gt/gte filter on that column by bisection – like a Postgres index scan, so
+keyset pages stay cheap deep into a big table while offset pages get slower. Set `outage` to
+answer 503, or `failure_rate` to fail a random share of requests, to exercise retries.
+"""
+import bisect
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, parse_qsl, urlparse
+
+import stand_in_server  # noqa: F401 – puts the repo root on sys.path
+
+
+class FakePostgrest:
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.outage = False
+        self.requests = 0
+        self.bytes_sent = 0
+        self.tables: Dict[str, Dict[str, Dict]] = {}
+        self._next_id: Dict[str, int] = {}
+        self._indexes: Dict[Tuple[str, str], Tuple[List, List[Dict]]] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body: bytes = b"", content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _start(self) -> bool:
+                with fake._lock:
+                    fake.requests += 1
+                    failing = fake.outage or fake._random.random() < fake.failure_rate
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if failing:
+                    self._reply(503, b'{"message": "service unavailable"}')
+                    return False
+                if not urlparse(self.path).path.startswith("/rest/v1/"):
+                    self._reply(404, b'{"message": "not found"}')
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self._start():
+                    return
+                parsed = urlparse(self.path)
+                try:
+                    rows = fake.select(parsed.path[len("/rest/v1/"):], parse_qsl(parsed.query))
+                except ValueError as e:
+                    return self._reply(400, json.dumps({"code": "PGRST100", "message": str(e)}).encode("utf-8"))
+                body = json.dumps(rows, ensure_ascii=False).encode("utf-8")
+                with fake._lock:
+                    fake.bytes_sent += len(body)
+                self._reply(200, body)
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self._start():
+                    return
+                table = parsed.path[len("/rest/v1/"):]
+                key = parse_qs(parsed.query).get("on_conflict", ["id"])[0]
+                try:
+                    records = json.loads(payload)
+                except ValueError:
+                    return self._reply(400, b'{"message": "invalid json"}')
+                if isinstance(records, dict):
+                    records = [records]
+                keys = [r.get(key) for r in records]
+                if len(set(keys)) != len(keys):
+                    # Postgres: ON CONFLICT DO UPDATE command cannot affect row a second time
+                    return self._reply(400, b'{"code": "21000", "message": "duplicate conflict key in batch"}')
+                fake.upsert(table, key, records)
+                self._reply(201)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def upsert(self, table: str, key: str, records):
+        with self._lock:
+            rows = self.tables.setdefault(table, {})
+            for record in records:
+                row = rows.get(record.get(key))
+                if row is None:
+                    row = rows[record.get(key)] = {}
+                    if "id" not in record:
+                        row["id"] = self._next_id[table] = self._next_id.get(table, 0) + 1
+                row.update(record)
+            for index in [i for i in self._indexes if i[0] == table]:
+                del self._indexes[index]
+
+    def _index(self, table: str, column: str) -> Tuple[List, List[Dict]]:
+        with self._lock:
+            index = self._indexes.get((table, column))
+            if index is None:
+                rows = sorted((r for r in self.tables.get(table, {}).values() if r.get(column) is not None),
+                              key=lambda r: r[column])
+                index = self._indexes[(table, column)] = ([r[column] for r in rows], rows)
+            return index
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict]:
+        columns, order, limit, offset, filters = None, None, None, 0, []
+        for name, value in params:
+            if name == "select":
+                columns = None if value.strip() == "*" else [c.strip() for c in value.split(",") if c.strip()]
+            elif name == "order":
+                column, _, direction = value.partition(".")
+                order = (column, direction.startswith("desc"))
+            elif name == "limit":
+                limit = int(value)
+            elif name == "offset":
+                offset = int(value)
+            else:
+                op, _, operand = value.partition(".")
+                if op not in _OPS:
+                    raise ValueError(f"unknown operator {op!r} in {name}={value}")
+                filters.append((name, op, operand))
+
+        start = 0
+        if order is None:
+            with self._lock:
+                candidates = list(self.tables.get(table, {}).values())
+        else:
+            keys, candidates = self._index(table, order[0])
+            if order[1]:
+                candidates = candidates[::-1]
+            else:
+                for name, op, operand in filters:
+                    if name == order[0] and op in ("gt", "gte") and keys:
+                        value = _coerce(keys[0], operand)
+                        start = (bisect.bisect_right if op == "gt" else bisect.bisect_left)(keys, value)
+
+        out = []
+        for i in range(start, len(candidates)):
+            row = candidates[i]
+            if not all(_matches(row.get(name), op, operand) for name, op, operand in filters):
+                continue
+            if offset:
+                offset -= 1
+                continue
+            out.append({c: row.get(c) for c in columns} if columns else dict(row))
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def rows(self, table: str) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self.tables.get(table, {}))
+
+
+_OPS = {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "in", "is"}
+
+
+def _coerce(sample, operand: str):
+    """The filter operand as the type of the column's values (numbers compare as numbers)."""
+    if isinstance(sample, bool):
+        return operand == "true"
+    if isinstance(sample, int):
+        return int(operand)
+    if isinstance(sample, float):
+        return float(operand)
+    return operand
+
+
+def _matches(value, op: str, operand: str) -> bool:
+    if op == "is":
+        return value is None if operand == "null" else value == (operand == "true")
+    if value is None:
+        return False
+    if op == "in":
+        items = [i.strip().strip('"') for i in operand.strip("()").split(",")]
+        return str(value) in items
+    if op in ("like", "ilike"):
+        pattern = re.escape(operand).replace(r"\*", ".*").replace("%", ".*")
+        return re.fullmatch(pattern, str(value), re.I if op == "ilike" else 0) is not None
+    operand = _coerce(value, operand)
+    if op == "eq":
+        return value == operand
+    if op == "neq":
+        return value != operand
+    if op == "gt":
+        return value > operand
+    if op == "gte":
+        return value >= operand
+    if op == "lt":
+        return value < operand
+    return value <= operand
@@ -0,0 +1,120 @@
+"""
+Local HTTP stand-in for the news sites, used by the offline benchmarks.
+
+Each StandInSite runs on its own port, so host-keyed logic (per-host limits, pacing)
+sees them as different sites. Pages are canned HTML with an optional artificial
+latency per response to mimic network time.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Benchmarks import the crawler modules from the repo root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+PARAGRAPH = ("Police in {town} said on {day} that they were investigating reports of domestic violence "
+             "and online harassment targeting women in the area. Residents urged the county government "
+             "to expand support services, while activists called for faster prosecution of GBV cases. ")
+TOWNS = ["Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret", "Thika"]
+
+
+def make_article_html(index: int, published: datetime, paragraphs: int = 8, json_ld: bool = False) -> str:
+    town = TOWNS[index % len(TOWNS)]
+    texts = [PARAGRAPH.format(town=town, day=published.strftime('%A')) for _ in range(paragraphs)]
+    body = "".join(f"<p>{t}</p>" for t in texts)
+    ld = ""
+    if json_ld:
+        ld = ('<script type="application/ld+json">' + json.dumps({
+            "@context": "https://schema.org", "@type": "NewsArticle", "headline": f"Story {index} from {town}",
+            "datePublished": published.isoformat(), "articleBody": "\n\n".join(t.strip() for t in texts)}) + "</script>")
+    return (f"<html><head><title>Story {index} from {town}</title>"
+            f'<meta property="og:title" content="Story {index} from {town}">'
+            f'<meta property="article:published_time" content="{published.isoformat()}">{ld}'
+            f"</head><body><article><h1>Story {index} from {town}</h1>{body}</article></body></html>")
+
+
+def make_homepage_html(links: List[str]) -> str:
+    anchors = "".join(f'<li><a href="{href}">Headline {i}</a></li>' for i, href in enumerate(links))
+    return f"<html><head><title>Home</title></head><body><nav><a href='/about'>About</a></nav><ul>{anchors}</ul></body></html>"
+
+
+class StandInSite:
+    """
+    Serves a dict of path -> HTML body from a background thread. `headers` adds per-path
+    response headers (e.g. Last-Modified); paths ending in .xml are served as XML. HEAD
+    requests get the headers without the body and are counted in head_hits; get_times keeps
+    when each GET arrived (time.monotonic()) and its X-Client header, if any.
+    """
+
+    def __init__(self, pages: Dict[str, str], latency: float = 0.0, headers: Optional[Dict[str, Dict]] = None):
+        self.pages = pages
+        self.latency = latency
+        self.headers = headers or {}
+        self.hits = 0
+        self.head_hits = 0
+        self.get_times: List[Tuple[float, Optional[str]]] = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse sockets
+
+            def _respond(self, send_body: bool):
+                if site.latency:
+                    time.sleep(site.latency)
+                path = self.path.split("?")[0]
+                body = site.pages.get(path)
+                status = 200 if body is not None else 404
+                payload = (body or "not found").encode("utf-8")
+                self.send_response(status)
+                kind = "application/xml" if path.endswith(".xml") else "text/html"
+                self.send_header("Content-Type", f"{kind}; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in site.headers.get(path, {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(payload)
+
+            def do_GET(self):
+                site.hits += 1
+                site.get_times.append((time.monotonic(), self.headers.get("X-Client")))
+                self._respond(True)
+
+            def do_HEAD(self):
+                site.head_hits += 1
+                self._respond(False)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+
+def news_site_pages(articles: int, site_index: int = 0, paragraphs: int = 8) -> Dict[str, str]:
+    """A homepage plus `articles` recent article pages under /news/."""
+    now = datetime.now()
+    paths = [f"/news/{site_index}-{i}" for i in range(articles)]
+    pages = {path: make_article_html(i, now - timedelta(days=i % 20), paragraphs) for i, path in enumerate(paths)}
+    pages["/"] = make_homepage_html(paths)
+    return pages
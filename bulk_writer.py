@@ -0,0 +1,308 @@
+"""
+Batched, retrying upserts to Supabase with a local write-ahead spool.
+
+BulkWriter buffers records and flushes them in batches – when batch_size records are
+waiting or flush_interval seconds have passed. Transient failures (network errors, 5xx, 429)
+are retried with exponential backoff. A batch that still can't be sent is appended to an
+on-disk spool (one JSON line per batch) and replayed the next time a writer for that table
+starts, so an outage never loses records. Batches the server rejects outright (4xx) go to
+a separate .rejected file instead of being retried forever. Writers in several processes
+(crawl_worker.py) share a table's spool: replays and appends hold an exclusive lock on
+<spool>.lock, so a spool is replayed once, by whichever writer gets there first.
+
+Transports: SupabaseTransport wraps a supabase-py client; RestTransport talks to the
+PostgREST endpoint directly with a pooled requests session (also what the offline
+stand-in in benchmarks/ speaks).
+
+    SAFEGUARD_SPOOL_DIR=spool
+"""
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from sinks import to_row
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SPOOL_DIR = os.getenv("SAFEGUARD_SPOOL_DIR", "spool")
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after ~10s, so keep asking
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class TransientError(Exception):
+    """The batch may succeed if retried."""
+
+
+class PermanentError(Exception):
+    """The server rejected the batch – retrying won't help."""
+
+
+def _permanent_api_error(e: Exception) -> bool:
+    """
+    Same split as RestTransport, read off whatever the client raised. postgrest-py's APIError
+    carries either a Postgres SQLSTATE – data (22), integrity (23) and schema (42) errors won't
+    go away on retry – a PostgREST code (PGRST1xx and up are bad requests, PGRST0xx means it
+    couldn't reach the database), or the bare HTTP status when the body wasn't JSON. Network
+    errors, 5xx and 429 are worth retrying, any other 4xx isn't.
+    """
+    code = str(getattr(e, "code", "") or "")
+    if code.startswith("PGRST"):
+        return not code.startswith("PGRST0")
+    if len(code) == 5 and code[:2] in ("22", "23", "42"):
+        return True
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is None and code.isdigit() and len(code) == 3:
+        status = int(code)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class SupabaseTransport:
+    def __init__(self, client):
+        self.client = client
+
+    def send(self, table: str, records: List[Dict], on_conflict: str):
+        try:
+            self.client.table(table).upsert(records, on_conflict=on_conflict).execute()
+        except Exception as e:
+            if _permanent_api_error(e):
+                raise PermanentError(str(e)) from e
+            raise TransientError(str(e)) from e
+
+
+class RestTransport:
+    def __init__(self, base_url: str, api_key: str, timeout: float = 30.0, session=None):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.update({
+            "apikey": api_key,
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Prefer": "resolution=merge-duplicates,return=minimal",
+        })
+
+    def send(self, table: str, records: List[Dict], on_conflict: str):
+        import requests
+
+        try:
+            resp = self.session.post(f"{self.base_url}/rest/v1/{table}", params={"on_conflict": on_conflict},
+                                     data=json.dumps(records, ensure_ascii=False).encode("utf-8"),
+                                     timeout=self.timeout)
+        except requests.RequestException as e:
+            raise TransientError(str(e)) from e
+        if resp.status_code >= 500 or resp.status_code == 429:
+            raise TransientError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+        if resp.status_code >= 400:
+            raise PermanentError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+
+
+class BulkWriter:
+    def __init__(self, transport, table: str, on_conflict: str, columns: Optional[List[str]] = None,
+                 batch_size: int = 100, flush_interval: float = 5.0, max_retries: int = 5,
+                 backoff: float = 0.5, max_backoff: float = 30.0, spool_dir: str = SPOOL_DIR,
+                 sleep=time.sleep, metrics=None):
+        self.transport = transport
+        self.table = table
+        self.on_conflict = on_conflict
+        self.columns = columns
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.spool_path = os.path.join(spool_dir, f"{table}.jsonl")
+        self._sleep = sleep
+        # Optional metrics.Metrics – each delivered batch is timed as the "upload" stage
+        self.metrics = metrics
+        self.stats = {"written": 0, "sent": 0, "batches": 0, "retries": 0, "spooled": 0,
+                      "replayed": 0, "rejected": 0}
+        self._buffer: List[Dict] = []
+        self._buffer_lock = threading.Lock()
+        # Sends are serialized so batches (and spool replays) reach the server in order. Reentrant:
+        # a replay holds it around its own sends, always taken before the spool lock
+        self._send_lock = threading.RLock()
+        self._closed = threading.Event()
+        os.makedirs(spool_dir, exist_ok=True)
+        # The spool lock: exclusive across processes (and across writers in one process), reentrant
+        # within this writer, since a replay appends what it can't send back to the spool
+        self._spool_lock_file = open(self.spool_path + ".lock", "a+b")
+        self._spool_mutex = threading.RLock()
+        self._spool_depth = 0
+        self.replay_spool()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, name=f"bulk-writer-{table}",
+                                             daemon=True)
+            self._flusher.start()
+
+    @property
+    def count(self) -> int:
+        return self.stats["sent"]
+
+    def write(self, record: Dict):
+        row = to_row(record, self.columns)
+        with self._buffer_lock:
+            self._buffer.append(row)
+            self.stats["written"] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        for start in range(0, len(batch), self.batch_size):
+            self._deliver(batch[start:start + self.batch_size])
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._spool_lock_file.close()
+
+    @contextmanager
+    def _spool_locked(self):
+        with self._spool_mutex:
+            if self._spool_depth == 0:
+                _lock_file(self._spool_lock_file)
+            self._spool_depth += 1
+            try:
+                yield
+            finally:
+                self._spool_depth -= 1
+                if self._spool_depth == 0:
+                    _unlock_file(self._spool_lock_file)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def _dedupe(self, records: List[Dict]) -> List[Dict]:
+        # Postgres refuses an upsert that touches the same conflict key twice in one statement
+        latest = {}
+        for record in records:
+            latest[record.get(self.on_conflict)] = record
+        return list(latest.values())
+
+    def _send_with_retry(self, records: List[Dict]) -> bool:
+        """True when sent; False when retries ran out. PermanentError propagates."""
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.transport.send(self.table, records, self.on_conflict)
+                return True
+            except TransientError as e:
+                if attempt == self.max_retries:
+                    print(f"Upsert to '{self.table}' failed after {attempt + 1} attempts: {e}")
+                    return False
+                self.stats["retries"] += 1
+                self._sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(self.max_backoff, delay * 2)
+        return False
+
+    def _deliver(self, batch: List[Dict]):
+        if not batch:
+            return
+        records = self._dedupe(batch)
+        with self._send_lock:
+            start = time.perf_counter()
+            try:
+                sent = self._send_with_retry(records)
+            except PermanentError as e:
+                print(f"Upsert to '{self.table}' rejected: {e}")
+                self._append(self.spool_path + ".rejected", records)
+                self.stats["rejected"] += len(records)
+                return
+            if self.metrics is not None:
+                self.metrics.observe("upload", time.perf_counter() - start)
+            if sent:
+                self.stats["sent"] += len(records)
+                self.stats["batches"] += 1
+            else:
+                self._append(self.spool_path, records)
+                self.stats["spooled"] += len(records)
+
+    def _append(self, path: str, records: List[Dict]):
+        with self._spool_locked(), open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"table": self.table, "on_conflict": self.on_conflict, "records": records},
+                               ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay_spool(self) -> int:
+        """
+        Resends spooled batches. If one still can't be sent, it and everything after it go back
+        to the spool untouched, so a continuing outage costs one retry cycle, not one per batch.
+        Holds the spool lock throughout – a writer starting meanwhile waits, then finds nothing left.
+        """
+        with self._send_lock, self._spool_locked():
+            return self._replay_spool()
+
+    def _replay_spool(self) -> int:
+        replaying = self.spool_path + ".replaying"
+        if os.path.exists(replaying):
+            # A previous replay was interrupted – its leftovers go first
+            if os.path.exists(self.spool_path):
+                with open(self.spool_path, encoding="utf-8") as src, open(replaying, "a", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                os.remove(self.spool_path)
+        elif os.path.exists(self.spool_path):
+            os.replace(self.spool_path, replaying)
+        else:
+            return 0
+
+        replayed = 0
+        giving_up = False
+        with open(replaying, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records = json.loads(line)["records"]
+                except (ValueError, KeyError):
+                    # A torn last line from a crash mid-write – nothing recoverable in it
+                    continue
+                if giving_up:
+                    self._append(self.spool_path, records)
+                    continue
+                before = self.stats["spooled"]
+                sent_before = self.stats["sent"]
+                self._deliver(records)
+                replayed += self.stats["sent"] - sent_before
+                giving_up = self.stats["spooled"] > before
+        os.remove(replaying)
+        self.stats["replayed"] += replayed
+        if replayed:
+            print(f"Replayed {replayed} spooled records to '{self.table}'.")
+        return replayed
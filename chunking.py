@@ -0,0 +1,101 @@
+"""
+Token-aware windows over long texts, and merging the per-window model outputs.
+
+The models only see a few hundred tokens at a time. Instead of cutting every text at a fixed
+character count (mid-word, and dropping the rest of a long article), chunk_spans() packs whole
+words into windows of at most max_tokens, consecutive windows sharing `overlap` tokens' worth
+of words so an entity on a boundary is seen whole in one of them. Token counts come from the
+model's own (fast) tokenizer when there is one, otherwise from a length estimate.
+
+merge_entities() unions the windows' entities; merge_sentiments() takes a vote over the
+windows weighted by their token counts and model confidence.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_WORD = re.compile(r"\S+")
+
+
+def _estimate_tokens(word: str) -> int:
+    # Subword vocabularies split long or non-English words into several pieces
+    return 1 + len(word) // 6
+
+
+def word_tokens(text: str, tokenizer=None) -> List[Tuple[int, int, int]]:
+    """(start, end, tokens) for each whitespace-separated word."""
+    words = [(m.start(), m.end()) for m in _WORD.finditer(text)]
+    if tokenizer is not None and words:
+        try:
+            offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        except Exception:
+            offsets = None  # slow (Python) tokenizers have no offsets – estimate instead
+        if offsets is not None:
+            counts = [0] * len(words)
+            w = 0
+            for start, end in offsets:
+                if end <= start:
+                    continue
+                while w < len(words) - 1 and start >= words[w][1]:
+                    w += 1
+                counts[w] += 1
+            return [(s, e, max(1, c)) for (s, e), c in zip(words, counts)]
+    return [(s, e, _estimate_tokens(text[s:e])) for s, e in words]
+
+
+def chunk_spans(text: str, max_tokens: int, overlap: int = 0, tokenizer=None,
+                max_chunks: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Character spans covering the whole text (or its first max_chunks windows), each holding
+    at most max_tokens tokens unless a single word is longer than that.
+    """
+    words = word_tokens(text, tokenizer)
+    if not words:
+        return [(0, len(text))]
+    spans = []
+    first = 0
+    while first < len(words):
+        last, budget = first, 0
+        while last < len(words) and (last == first or budget + words[last][2] <= max_tokens):
+            budget += words[last][2]
+            last += 1
+        spans.append((words[first][0], words[last - 1][1]))
+        if last >= len(words) or (max_chunks and len(spans) >= max_chunks):
+            break
+        # Step back over `overlap` tokens of words for the next window, but always move forward
+        back, shared = last, 0
+        while back - 1 > first and shared + words[back - 1][2] <= overlap:
+            back -= 1
+            shared += words[back][2]
+        first = back
+    return spans
+
+
+def merge_entities(windows: Sequence[Optional[List[Dict]]]) -> Optional[List[Dict]]:
+    """All windows' raw entities in one list (formatting dedupes them); None if every window failed."""
+    ok = [w for w in windows if w is not None]
+    if not ok:
+        return None
+    return [e for w in ok for e in w]
+
+
+def merge_sentiments(windows: Sequence[Optional[Dict]], weights: Sequence[float]) -> Optional[Dict]:
+    """
+    One {"label", "score"} for the whole text: the label with the most weight x confidence wins
+    and its score is the weighted mean over the windows that voted for it. A single window is
+    returned unchanged.
+    """
+    votes: Dict[str, float] = {}
+    mass: Dict[str, float] = {}
+    for result, weight in zip(windows, weights):
+        if result is None:
+            continue
+        if isinstance(result, list):  # some pipelines wrap a single result in a list
+            result = result[0]
+        label = result.get("label", "N/A")
+        score = float(result.get("score", 0.0))
+        votes[label] = votes.get(label, 0.0) + weight * score
+        mass[label] = mass.get(label, 0.0) + weight
+    if not votes:
+        return None
+    label = max(votes, key=votes.get)
+    return {"label": label, "score": votes[label] / mass[label] if mass[label] else 0.0}
@@ -0,0 +1,193 @@
+"""
+Seen-URL store for the news crawler, so a steady-state run only downloads new articles.
+
+Every fetched article URL is recorded in SQLite with its fetch time, ETag/Last-Modified and
+a hash of the content. Before downloading, CrawlState.plan() splits a site's links into:
+
+  new          – never fetched, downloaded normally
+  revalidate   – fetched more than revalidate_after_hours ago, re-requested with a
+                 conditional GET (If-None-Match / If-Modified-Since)
+  skipped      – already fetched and processed, nothing is done
+
+A URL counts as processed once the caller says so with mark_processed() – after its record
+is in the sinks, or the filters dropped it. One that was downloaded but never processed (the
+run crashed, or extraction, NLP or a sink write failed) is planned again as `unfinished`.
+
+A Bloom filter built from the table at startup answers "never seen" without touching
+SQLite, which is the common case for the links that matter.
+
+    SAFEGUARD_CRAWL_STATE=crawl_state.sqlite
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+CRAWL_STATE_PATH = os.getenv("SAFEGUARD_CRAWL_STATE", "crawl_state.sqlite")
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+@dataclass
+class SeenUrl:
+    url: str
+    site: str
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    processed_at: Optional[float] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class SiteCounts:
+    new: int = 0
+    skipped: int = 0
+    revalidated: int = 0
+    unchanged: int = 0
+    unfinished: int = 0
+
+
+@dataclass
+class CrawlPlan:
+    to_fetch: List[str] = field(default_factory=list)
+    conditional_headers: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8", "replace")).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, path: str = CRAWL_STATE_PATH, revalidate_after_hours: Optional[float] = None,
+                 use_bloom: bool = True):
+        self.revalidate_after = revalidate_after_hours * 3600 if revalidate_after_hours else None
+        self.counts: Dict[str, SiteCounts] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS seen_urls (
+            url TEXT PRIMARY KEY, site TEXT, fetched_at REAL NOT NULL,
+            etag TEXT, last_modified TEXT, content_hash TEXT, processed_at REAL)""")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(seen_urls)")}
+        if "processed_at" not in columns:
+            # State from before processed_at: everything in it made it through the old runs
+            self._db.execute("ALTER TABLE seen_urls ADD COLUMN processed_at REAL")
+            self._db.execute("UPDATE seen_urls SET processed_at = fetched_at")
+            self._db.commit()
+        self._bloom = None
+        if use_bloom:
+            total = self._db.execute("SELECT COUNT(*) FROM seen_urls").fetchone()[0]
+            self._bloom = BloomFilter(capacity=max(100_000, total * 2))
+            for (url,) in self._db.execute("SELECT url FROM seen_urls"):
+                self._bloom.add(url)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def site_counts(self, site: str) -> SiteCounts:
+        return self.counts.setdefault(site, SiteCounts())
+
+    def lookup(self, url: str) -> Optional[SeenUrl]:
+        if self._bloom is not None and url not in self._bloom:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT url, site, fetched_at, etag, last_modified, content_hash, "
+                                   "processed_at FROM seen_urls WHERE url = ?", (url,)).fetchone()
+        return SeenUrl(*row) if row else None
+
+    def plan(self, site_links: Dict[str, str]) -> CrawlPlan:
+        """Decides, for url -> site links, what to download, revalidate or skip."""
+        plan = CrawlPlan()
+        now = time.time()
+        for url, site in site_links.items():
+            counts = self.site_counts(site)
+            seen = self.lookup(url)
+            if seen is None:
+                counts.new += 1
+                plan.to_fetch.append(url)
+            elif seen.processed_at is None:
+                # Downloaded on an earlier try that never got as far as the sinks
+                counts.unfinished += 1
+                plan.to_fetch.append(url)
+            elif self.revalidate_after is not None and now - seen.fetched_at > self.revalidate_after:
+                counts.revalidated += 1
+                plan.to_fetch.append(url)
+                plan.conditional_headers[url] = seen.conditional_headers()
+            else:
+                counts.skipped += 1
+                plan.skipped.append(url)
+        return plan
+
+    def record(self, url: str, site: str, html: str, headers: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Stores a successful fetch, not yet processed. Returns False when a revalidated URL came
+        back with exactly the content we already had and processed, so the caller can skip it.
+        """
+        headers = headers or {}
+        digest = content_hash(html)
+        previous = self.lookup(url)
+        unchanged = previous is not None and previous.processed_at is not None and previous.content_hash == digest
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO seen_urls VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (url, site, time.time(), headers.get("ETag"), headers.get("Last-Modified"), digest,
+                              previous.processed_at if unchanged else None))
+            self._db.commit()
+        if self._bloom is not None:
+            self._bloom.add(url)
+        if unchanged:
+            self.site_counts(site).unchanged += 1
+            return False
+        return True
+
+    def mark_unchanged(self, url: str, site: str):
+        """A conditional GET answered 304 – only the fetch time moves."""
+        with self._lock:
+            self._db.execute("UPDATE seen_urls SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        self.site_counts(site).unchanged += 1
+
+    def mark_processed(self, urls: List[str]):
+        """These URLs' records are persisted (or deliberately dropped) – later runs skip them."""
+        if not urls:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany("UPDATE seen_urls SET processed_at = ? WHERE url = ?", [(now, url) for url in urls])
+            self._db.commit()
+
+    def print_report(self):
+        print("\nCrawl state per site (new / skipped as seen / revalidated / unchanged / unfinished):")
+        for site, c in self.counts.items():
+            print(f"  {c.new:4d} {c.skipped:4d} {c.revalidated:4d} {c.unchanged:4d} {c.unfinished:4d}  {site}")
@@ -0,0 +1,322 @@
+"""
+Work-queue mode for the news crawler: several worker processes – on one box or on several –
+share a crawl through work_queue.WorkQueue instead of one process doing every site in turn.
+
+    python crawl_worker.py enqueue                        # this run's sites (the site scheduler's pick)
+    python crawl_worker.py work --processes 4 --drain     # claim, crawl, ack until the queue is empty
+    python crawl_worker.py serve --port 8765              # share the queue with other hosts...
+    python crawl_worker.py work --queue http://crawler-1:8765 --processes 8     # ...and work from them
+    python crawl_worker.py stats
+
+There are two kinds of item. A "site" item (payload: site, budget) has its homepage loaded, its
+links extracted and date-filtered, and every link not already in the crawl state queued as an
+"article" item, keyed by URL and grouped by host. An "article" batch is downloaded concurrently,
+parsed, filtered, categorized and analyzed as one NLP batch, written to the worker's sinks and
+flushed, marked processed in the crawl state, and only then acked – a worker that dies mid-batch
+loses nothing: its items are claimed again once the lease runs out, and the crawl state still
+has their URLs as unfinished, so they're downloaded again rather than skipped as seen. Claims
+spread a batch across hosts and keep other workers off a host while one holds it, so the
+per-host pace (POLITE_DELAY_SECONDS) holds across workers.
+
+Each worker process has its own fetcher, homepage loader, NLP engine (point them all at one
+inference_worker.py with SAFEGUARD_INFERENCE_SOCKET to share the weights) and sinks: the
+date-partitioned archive (part files are named per process, one per article batch) and, when
+configured, the batched Supabase writer (one spool per table, shared under a file lock).
+Workers on one box share crawl_state.sqlite; workers on other hosts keep their own, and the
+queue's URL keys stop the same article being queued twice while it's pending.
+Visits in queue mode aren't added to the site scheduler's history.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from work_queue import QUEUE_PATH, QueueServer, WorkItem, WorkQueue, open_queue
+
+BATCH_SIZE = 16
+POLL_SECONDS = 2.0
+
+# A handler gets a batch of items of its kind and the queue (to add follow-up items), and returns
+# an error message for each item that failed – every other item is acked
+Handler = Callable[[List[WorkItem], object], Dict[int, str]]
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Worker:
+    def __init__(self, queue, handlers: Dict[str, Handler], batch_size: int = BATCH_SIZE,
+                 lease_seconds: Optional[float] = None, poll_seconds: float = POLL_SECONDS,
+                 per_group: int = 2, group_gap: float = 0.0, name: Optional[str] = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds or getattr(queue, "lease_seconds", 120.0)
+        self.poll_seconds = poll_seconds
+        self.per_group = per_group
+        self.group_gap = group_gap
+        self.name = name or default_worker_name()
+        self.stats = Counter()
+        self._held: List[int] = []
+        self._held_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _keep_leases(self):
+        # Renews the current batch's leases while it's being worked on
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._held_lock:
+                held = list(self._held)
+            if held:
+                try:
+                    self.queue.extend(self.name, held, self.lease_seconds)
+                except Exception as e:
+                    print(f"[{self.name}] lease renewal failed: {e!r}")
+
+    def run_once(self) -> int:
+        """Claims and works one batch. Returns how many items it claimed."""
+        items = self.queue.claim(self.name, list(self.handlers), limit=self.batch_size,
+                                 lease_seconds=self.lease_seconds, per_group=self.per_group,
+                                 group_gap=self.group_gap)
+        if not items:
+            return 0
+        self.stats["batches"] += 1
+        self.stats["claimed"] += len(items)
+        self.stats["retried"] += sum(item.attempts > 1 for item in items)
+        with self._held_lock:
+            self._held = [item.id for item in items]
+        try:
+            by_kind: Dict[str, List[WorkItem]] = {}
+            for item in items:
+                by_kind.setdefault(item.kind, []).append(item)
+            for kind, batch in by_kind.items():
+                try:
+                    errors = self.handlers[kind](batch, self.queue)
+                except Exception as e:
+                    errors = {item.id: f"{type(e).__name__}: {e}" for item in batch}
+                done = [item.id for item in batch if item.id not in errors]
+                acked = self.queue.ack(self.name, done)
+                self.stats["done"] += acked
+                self.stats["lost"] += len(done) - acked  # lease ran out and someone else has it now
+                for id_, error in errors.items():
+                    state = self.queue.fail(self.name, id_, error)
+                    self.stats[{"failed": "failed", "ready": "requeued"}.get(state, "lost")] += 1
+        finally:
+            with self._held_lock:
+                self._held = []
+        return len(items)
+
+    def run(self, drain: bool = False, max_idle: Optional[float] = None):
+        """
+        Works batches until stop() – or, with drain, until nothing is left to claim and nothing
+        is leased (an item leased by a worker that died comes back when its lease runs out).
+        """
+        keeper = threading.Thread(target=self._keep_leases, daemon=True)
+        keeper.start()
+        idle_since = None
+        try:
+            while not self._stop.is_set():
+                if self.run_once():
+                    idle_since = None
+                    continue
+                if drain and self.queue.pending() == 0:
+                    break
+                idle_since = idle_since or time.monotonic()
+                if max_idle is not None and time.monotonic() - idle_since > max_idle:
+                    break
+                self._stop.wait(self.poll_seconds)
+        finally:
+            self._stop.set()
+            keeper.join(timeout=1)
+        return self.stats
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class NewsHandlers:
+    """The crawler's stages as queue handlers – one set per worker process."""
+
+    def __init__(self, sinks: list, max_workers: int = 16, per_host: int = 2, browser_pool_size: int = 1,
+                 session=None):
+        import WebCrawler_V1 as crawler
+        from browser_pool import HomepageLoader
+        from crawl_state import CrawlState
+        from fetcher import ArticleFetcher, build_session
+
+        self.crawler = crawler
+        self.sinks = sinks
+        self.session = session or build_session(pool_maxsize=max_workers)
+        self.loader = HomepageLoader(crawler.SITE_SETTINGS, pool_size=browser_pool_size, session=self.session)
+        self.fetcher = ArticleFetcher(max_workers=max_workers, per_host=per_host,
+                                      min_host_interval=crawler.POLITE_DELAY_SECONDS, session=self.session)
+        # No Bloom filter: it's built at startup, and other workers keep adding to the table
+        self.crawl_state = CrawlState(revalidate_after_hours=crawler.REVALIDATE_AFTER_HOURS, use_bloom=False)
+
+    def handlers(self) -> Dict[str, Handler]:
+        return {"site": self.sites, "article": self.articles}
+
+    def sites(self, items: List[WorkItem], queue) -> Dict[int, str]:
+        budgets = {item.payload["site"]: item.payload.get("budget", 10) for item in items}
+        homepages = self.loader.load_all(list(budgets))
+        site_links = self.crawler.find_article_links(homepages, budgets, self.fetcher)
+        plan = self.crawl_state.plan(site_links)
+        queue.put_many(("article", {"site": site_links[url], "url": url}, url, host_of(url)) for url in plan.to_fetch)
+        failed = {page.site: page.error or "empty homepage" for page in homepages if page.error or not page.html}
+        return {item.id: f"homepage failed: {failed[item.payload['site']]}"
+                for item in items if item.payload["site"] in failed}
+
+    def articles(self, items: List[WorkItem], queue) -> Dict[int, str]:
+        by_url = {item.payload["url"]: item for item in items}
+        errors: Dict[int, str] = {}
+
+        def on_skip(url, error):
+            if error:
+                errors[by_url[url].id] = error
+
+        site_links = {url: item.payload["site"] for url, item in by_url.items()}
+        records = []
+        for page in self.crawler.download_articles(site_links, self.fetcher, self.crawl_state, on_skip=on_skip):
+            try:
+                record = self.crawler.process_article(*page)
+            except Exception as e:
+                errors[by_url[page[1]].id] = f"{type(e).__name__}: {e}"
+                continue
+            if record is not None:
+                records.append(record)
+            else:
+                self.crawl_state.mark_processed([page[1]])
+        if records:
+            for record in self.crawler.add_analysis(records):
+                for sink in self.sinks:
+                    sink.write(record)
+            # The archive and the Supabase writer buffer – the batch is only safe to ack once it's
+            # out of memory (sent, spooled or in a part file)
+            for sink in self.sinks:
+                flush = getattr(sink, "flush", None)
+                if flush is not None:
+                    flush()
+            self.crawl_state.mark_processed([record["article_url"] for record in records])
+        return errors
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        self.fetcher.close()
+        self.loader.close()
+        self.crawl_state.close()
+
+
+# -------------------------- Command line --------------------------
+def enqueue_sites(queue, sites: List[str], max_articles: int, use_scheduler: bool = True) -> int:
+    """Queues this run's sites – the site scheduler's pick and budgets, or every site at max_articles."""
+    budgets = dict.fromkeys(sites, max_articles)
+    if use_scheduler:
+        from site_scheduler import get_site_scheduler
+
+        scheduler = get_site_scheduler()
+        if scheduler is not None:
+            schedule = scheduler.plan(sites, max_articles)
+            scheduler.print_plan(schedule)
+            budgets = schedule.budgets
+    return queue.put_many(("site", {"site": site, "budget": budget}, site, host_of(site))
+                          for site, budget in budgets.items())
+
+
+def run_worker(target: str, drain: bool, batch_size: int, lease_seconds: Optional[float], browser_pool_size: int):
+    """One worker process: the news handlers on the queue at `target` until stopped (or drained)."""
+    from bulk_writer import BulkWriter, SupabaseTransport
+    from metrics import new_run, print_stage_summary
+    from sinks import ARTICLE_COLUMNS, PartitionedSink
+
+    queue = open_queue(target)
+    import WebCrawler_V1 as crawler
+
+    metrics = new_run(crawler.METRICS_JOB)
+    sinks = [PartitionedSink()]
+    if crawler.supabase is not None:
+        sinks.append(BulkWriter(SupabaseTransport(crawler.supabase), "scraped_articles", on_conflict="article_url",
+                                columns=ARTICLE_COLUMNS, batch_size=50, metrics=metrics))
+    news = NewsHandlers(sinks, browser_pool_size=browser_pool_size)
+    worker = Worker(queue, news.handlers(), batch_size=batch_size, lease_seconds=lease_seconds,
+                    group_gap=crawler.POLITE_DELAY_SECONDS)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    print(f"[{worker.name}] working {target}")
+    try:
+        worker.run(drain=drain)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        news.close()
+        if metrics.enabled:
+            metrics.finish()
+            print_stage_summary(metrics.report())
+        print(f"[{worker.name}] {dict(worker.stats)}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=["enqueue", "work", "serve", "stats"])
+    ap.add_argument("--queue", default=QUEUE_PATH, help="queue file, or http://host:port of a queue server")
+    ap.add_argument("--max-articles", type=int, default=10, help="enqueue: links per site")
+    ap.add_argument("--no-scheduler", action="store_true", help="enqueue: every site, max-articles links each")
+    ap.add_argument("--processes", type=int, default=1, help="work: worker processes to start")
+    ap.add_argument("--drain", action="store_true", help="work: exit once the queue is empty")
+    ap.add_argument("--batch", type=int, default=BATCH_SIZE, help="work: items per claim")
+    ap.add_argument("--lease", type=float, default=None, help="work: lease seconds")
+    ap.add_argument("--browsers", type=int, default=1, help="work: headless Chrome drivers per process")
+    ap.add_argument("--host", default="0.0.0.0", help="serve: address to bind")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args(argv)
+
+    if args.command == "serve":
+        server = QueueServer(WorkQueue(args.queue), args.host, args.port)
+        print(f"Serving {args.queue} at {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.close()
+        return 0
+    if args.command == "stats":
+        queue = open_queue(args.queue)
+        print(queue.counts())
+        for failure in queue.failures():
+            print(f"  failed: {failure}")
+        return 0
+    if args.command == "enqueue":
+        from WebCrawler_V1 import SITE_URLS
+
+        added = enqueue_sites(open_queue(args.queue), SITE_URLS, args.max_articles, not args.no_scheduler)
+        print(f"Queued {added} sites.")
+        return 0
+
+    worker_args = (args.queue, args.drain, args.batch, args.lease, args.browsers)
+    if args.processes <= 1:
+        run_worker(*worker_args)
+        return 0
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, args=worker_args) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,219 @@
+"""
+Drops clearly stale article links before they are downloaded.
+
+filter_article throws away anything older than MAX_AGE_DAYS – but only after the page has been
+fetched and parsed, and most links on a homepage point at old evergreen pages. DatePrefilter
+dates each candidate link from the cheapest source that has an answer:
+
+    url    a /2025/11/04/ or /2025/11/ date in the link itself (link_extractor.url_date)
+    time   a <time datetime> in or right after the anchor on the homepage
+    feed   <pubDate>/<updated>/<lastmod> from the site's RSS/Atom feeds and sitemaps – the
+           ones its homepage declares with <link rel="alternate">, plus SITE_SETTINGS "feeds"
+    head   Last-Modified from a HEAD request (only with SITE_SETTINGS "head_check": True,
+           since it spends a request per link)
+
+Feeds and HEADs are only requested for sites that still have undated links, all sites at
+once through the shared fetcher. Links older than the cut-off (with a day of slack for time
+zones) are dropped; undated links are kept. Per site, the report counts how many of the
+links that would have been downloaded were avoided and how many extra requests that took.
+"""
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+from link_extractor import Link
+
+MAX_AGE_DAYS = 30
+SLACK_DAYS = 1
+MAX_FEEDS_PER_SITE = 2
+
+_LINK_TAG = re.compile(r"<link\b[^>]*>", re.I)
+_ATTR = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_FEED_TYPES = ("application/rss+xml", "application/atom+xml")
+_DATE_TAGS = {"pubdate", "published", "updated", "lastmod", "publication_date", "date"}
+
+
+def discover_feeds(homepage_html: str, site: str) -> List[str]:
+    """RSS/Atom feeds a homepage declares with <link rel="alternate" type="application/rss+xml">."""
+    feeds = []
+    for tag in _LINK_TAG.findall(homepage_html):
+        attrs = {k.lower(): (a if a is not None else b) for k, a, b in _ATTR.findall(tag)}
+        if "alternate" in attrs.get("rel", "").lower() and attrs.get("type", "").lower() in _FEED_TYPES \
+                and attrs.get("href"):
+            feeds.append(urljoin(site, attrs["href"].strip()))
+    return list(dict.fromkeys(feeds))
+
+
+def parse_any_date(value: Optional[str]) -> Optional[date]:
+    """ISO 8601 (feeds, sitemaps) or RFC 2822 (RSS pubDate, HTTP Last-Modified)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).date()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def parse_feed(xml_text: str) -> Dict[str, date]:
+    """URL -> newest date listed for it, from an RSS, Atom or sitemap document."""
+    try:
+        root = ET.fromstring(xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text)
+    except ET.ParseError:
+        return {}
+    dates: Dict[str, date] = {}
+    for entry in root.iter():
+        if _local(entry.tag) not in ("item", "entry", "url"):
+            continue
+        url, when = None, None
+        for child in entry.iter():
+            name = _local(child.tag)
+            if name in ("link", "loc") and url is None:
+                url = (child.text or "").strip() or child.get("href")
+            elif name in _DATE_TAGS:
+                d = parse_any_date(child.text)
+                if d is not None and (when is None or d > when):
+                    when = d
+        if url and when:
+            dates[url] = max(when, dates.get(url, when))
+    return dates
+
+
+@dataclass
+class SiteReport:
+    candidates: int = 0
+    kept: int = 0
+    undated: int = 0
+    avoided: int = 0  # stale links among the ones that would have been downloaded
+    stale: Counter = field(default_factory=Counter)  # by date source
+    requests: int = 0  # feed + HEAD requests spent finding dates
+
+
+class DatePrefilter:
+    def __init__(self, fetcher=None, max_age_days: int = MAX_AGE_DAYS, head_check: bool = False,
+                 today: Callable[[], date] = date.today):
+        self.fetcher = fetcher
+        self.max_age_days = max_age_days
+        self.head_check = head_check
+        self._today = today
+        self.reports: Dict[str, SiteReport] = {}
+
+    def cutoff(self) -> date:
+        return self._today() - timedelta(days=self.max_age_days + SLACK_DAYS)
+
+    def _feed_dates(self, wanted: Dict[str, List[str]]) -> Dict[str, date]:
+        urls = {feed: site for site, feeds in wanted.items() for feed in feeds[:MAX_FEEDS_PER_SITE]}
+        dates: Dict[str, date] = {}
+        for result in self.fetcher.fetch_many(list(urls)):
+            self.reports[urls[result.url]].requests += 1
+            if result.ok:
+                dates.update(parse_feed(result.html))
+        return dates
+
+    def _head_dates(self, wanted: Dict[str, str]) -> Dict[str, date]:
+        dates: Dict[str, date] = {}
+        for result in self.fetcher.fetch_many(list(wanted), method="HEAD"):
+            self.reports[wanted[result.url]].requests += 1
+            d = parse_any_date(result.headers.get("Last-Modified")) if result.error is None else None
+            if d is not None:
+                dates[result.url] = d
+        return dates
+
+    def filter_sites(self, candidates: Dict[str, Tuple[List[Link], str]], budget: Union[int, Dict[str, int]],
+                     site_settings: Optional[Dict[str, Dict]] = None) -> Dict[str, List[Link]]:
+        """
+        candidates maps site -> (ranked links, homepage HTML). Returns, per site, the links that
+        aren't known to be stale, still ranked. `budget` is how many links per site would be
+        downloaded (one number, or one per site), for the HEAD rounds and the avoided-fetch count.
+        """
+        site_settings = site_settings or {}
+        budgets = budget if isinstance(budget, dict) else dict.fromkeys(candidates, budget)
+        cutoff = self.cutoff()
+        for site, (links, _) in candidates.items():
+            self.reports[site] = SiteReport(candidates=len(links))
+
+        # Feeds only for sites that still have links without a date
+        if self.fetcher is not None:
+            feeds = {}
+            for site, (links, homepage) in candidates.items():
+                settings = site_settings.get(site, {})
+                if any(l.published is None for l in links):
+                    found = list(settings.get("feeds", [])) + discover_feeds(homepage or "", site)
+                    if found:
+                        feeds[site] = list(dict.fromkeys(found))
+            if feeds:
+                feed_dates = self._feed_dates(feeds)
+                for links, _ in candidates.values():
+                    for link in links:
+                        if link.published is None and link.url in feed_dates:
+                            link.published, link.date_source = feed_dates[link.url], "feed"
+
+            # HEADs in rounds: each round checks just enough undated links to fill what the
+            # stale ones found so far freed up, so fresh sites cost one request per download
+            checked = set()
+            while True:
+                heads = {}
+                for site, (links, _) in candidates.items():
+                    if not site_settings.get(site, {}).get("head_check", self.head_check):
+                        continue
+                    # settled: dated fresh, or HEAD-checked without an answer (kept undated)
+                    room = budgets[site] - sum(l.published >= cutoff if l.published is not None else l.url in checked
+                                        for l in links)
+                    for link in links:
+                        if room <= 0:
+                            break
+                        if link.published is None and link.url not in checked:
+                            heads[link.url] = site
+                            room -= 1
+                if not heads:
+                    break
+                checked.update(heads)
+                head_dates = self._head_dates(heads)
+                for links, _ in candidates.values():
+                    for link in links:
+                        if link.published is None and link.url in head_dates:
+                            link.published, link.date_source = head_dates[link.url], "head"
+
+        kept: Dict[str, List[Link]] = {}
+        for site, (links, _) in candidates.items():
+            report = self.reports[site]
+            kept[site] = []
+            for rank, link in enumerate(links):
+                if link.published is not None and link.published < cutoff:
+                    report.stale[link.date_source] += 1
+                    report.avoided += rank < budgets[site]
+                    continue
+                report.undated += link.published is None
+                kept[site].append(link)
+            report.kept = len(kept[site])
+        return kept
+
+    def totals(self) -> Dict[str, int]:
+        return {"candidates": sum(r.candidates for r in self.reports.values()),
+                "stale": sum(sum(r.stale.values()) for r in self.reports.values()),
+                "avoided": sum(r.avoided for r in self.reports.values()),
+                "requests": sum(r.requests for r in self.reports.values())}
+
+    def print_report(self):
+        if not self.reports:
+            return
+        print(f"\nDate pre-filter (older than {self.max_age_days} days):")
+        for site, r in sorted(self.reports.items()):
+            sources = ", ".join(f"{k}={v}" for k, v in sorted(r.stale.items())) or "-"
+            print(f"  {site}: {r.candidates} links, {sum(r.stale.values())} stale ({sources}), "
+                  f"{r.avoided} downloads avoided for {r.requests} extra requests, {r.undated} undated kept")
+        t = self.totals()
+        print(f"  total: {t['avoided']} downloads avoided, {t['requests']} feed/HEAD requests")
@@ -0,0 +1,242 @@
+"""
+Pooled, concurrent HTTP fetching for the news crawler.
+
+A bounded thread pool shares one keep-alive requests.Session. Concurrency is capped
+globally (pool size) and per host (semaphore), and politeness is a per-host minimum
+gap between requests, so different sites download in parallel while each host is
+still paced.
+
+Bodies are downloaded compressed (gzip/deflate, plus brotli when the brotli package is
+installed) and capped at SAFEGUARD_MAX_PAGE_BYTES; responses that aren't HTML/XML are
+dropped without reading them. The charset comes from the Content-Type header or the page's
+own <meta charset>, and only when both are missing from sniffing the bytes.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet  # whichever detector requests itself uses for apparent_encoding
+from urllib3.util.request import ACCEPT_ENCODING  # "gzip,deflate" (+ ",br" with brotli installed)
+
+import replay
+
+MAX_PAGE_BYTES = int(os.getenv("SAFEGUARD_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.I)
+
+DEFAULT_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en,sw;q=0.8",
+    "Accept-Encoding": ACCEPT_ENCODING,
+}
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int = 0
+    html: Optional[str] = None
+    elapsed: float = 0.0
+    headers: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    size: int = 0  # decompressed body bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 300 and self.html is not None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.error is None and self.status == 304
+
+
+def build_session(pool_maxsize: int = 16, headers: Optional[Dict] = None) -> requests.Session:
+    """A keep-alive session whose connection pool is big enough for every worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers or DEFAULT_HEADERS)
+    # Responses are saved to / served from a fixture directory when SAFEGUARD_RECORD_DIR or
+    # SAFEGUARD_REPLAY_DIR is set (replay.py)
+    return replay.install(session)
+
+
+def decode_html(body: bytes, header_encoding: Optional[str] = None) -> str:
+    """Header charset, else <meta charset> from the first 4 KB, else a sniffed encoding."""
+    encoding = header_encoding
+    if not encoding:
+        m = _META_CHARSET.search(body[:4096])
+        encoding = m.group(1).decode("ascii") if m else None
+    if not encoding:
+        encoding = chardet.detect(body)["encoding"] if body else "utf-8"
+    try:
+        return body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:  # a charset name Python doesn't know
+        return body.decode("utf-8", errors="replace")
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+class DomainPacer:
+    """
+    Enforces a minimum gap between request starts to the same host.
+    Callers reserve the next free slot under a lock and sleep outside it, so one slow
+    host never stalls another.
+    """
+
+    def __init__(self, min_interval: float = 2.0, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> float:
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.min_interval
+        delay = start - now
+        if delay > 0:
+            self._sleep(delay)
+        return delay
+
+
+def interleave_by_host(urls: Iterable[str]) -> List[str]:
+    """Round-robin URLs across hosts so the pool isn't stuck behind one host's limit."""
+    buckets: "OrderedDict[str, List[str]]" = OrderedDict()
+    for url in urls:
+        buckets.setdefault(host_of(url), []).append(url)
+    ordered = []
+    while buckets:
+        for host in list(buckets):
+            ordered.append(buckets[host].pop(0))
+            if not buckets[host]:
+                del buckets[host]
+    return ordered
+
+
+class ArticleFetcher:
+    def __init__(self, max_workers: int = 16, per_host: int = 2, min_host_interval: float = 2.0,
+                 timeout: float = 20.0, session: Optional[requests.Session] = None,
+                 max_bytes: int = MAX_PAGE_BYTES):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        # A session passed in belongs to the caller (and may outlive this fetcher), so only ours is closed
+        self._owns_session = session is None
+        self.session = session or build_session(pool_maxsize=max_workers)
+        self.pacer = DomainPacer(min_host_interval)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+    @contextmanager
+    def _host_slot(self, host: str):
+        with self._slots_lock:
+            slot = self._host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with slot:
+            yield
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        host = host_of(url)
+        with self._host_slot(host):
+            self.pacer.wait(host)
+            start = time.perf_counter()
+            try:
+                with self.session.get(url, timeout=self.timeout, headers=headers, stream=True) as resp:
+                    result = FetchResult(url=url, status=resp.status_code, headers=dict(resp.headers))
+                    error = self._check(resp)
+                    if error:
+                        result.error = error
+                    elif resp.status_code != 304:
+                        body = self._read(resp)
+                        if body is None:
+                            result.error = f"body larger than {self.max_bytes} bytes"
+                        else:
+                            result.size = len(body)
+                            # Only trust requests' encoding when the header actually named one
+                            named = "charset" in resp.headers.get("Content-Type", "").lower()
+                            result.html = decode_html(body, resp.encoding if named else None)
+                result.elapsed = time.perf_counter() - start
+                return result
+            except requests.RequestException as e:
+                return FetchResult(url=url, elapsed=time.perf_counter() - start, error=str(e))
+
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """A HEAD request under the same per-host limit and pacing – status and headers only."""
+        host = host_of(url)
+        with self._host_slot(host):
+            self.pacer.wait(host)
+            start = time.perf_counter()
+            try:
+                resp = self.session.head(url, timeout=self.timeout, headers=headers, allow_redirects=True)
+                return FetchResult(url=url, status=resp.status_code, elapsed=time.perf_counter() - start,
+                                   headers=dict(resp.headers))
+            except requests.RequestException as e:
+                return FetchResult(url=url, elapsed=time.perf_counter() - start, error=str(e))
+
+    def _check(self, resp) -> Optional[str]:
+        content_type = resp.headers.get("Content-Type", "").lower()
+        if content_type and not any(t in content_type for t in ("html", "xml", "text/plain")):
+            return f"not a web page ({content_type.split(';')[0]})"
+        length = resp.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            return f"body larger than {self.max_bytes} bytes"
+        return None
+
+    def _read(self, resp) -> Optional[bytes]:
+        """The decompressed body, or None once it grows past max_bytes (the connection is dropped)."""
+        chunks, size = [], 0
+        for chunk in resp.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > self.max_bytes:
+                return None
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def fetch_many(self, urls: Iterable[str], headers: Optional[Dict[str, Dict[str, str]]] = None,
+                   method: str = "GET") -> Iterator[FetchResult]:
+        """
+        Fetches all URLs concurrently (GET, or HEAD with method="HEAD"), yielding results as they
+        complete. `headers` maps a URL to extra request headers, e.g. conditional GET validators.
+        """
+        request = self.head if method == "HEAD" else self.fetch
+        headers = headers or {}
+        ordered = interleave_by_host(dict.fromkeys(urls))
+        if not ordered:
+            return
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch")
+        futures = [pool.submit(request, url, headers.get(url)) for url in ordered]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # A consumer that stops early (break, close) shouldn't wait for every queued fetch –
+            # the ones not started are dropped, the few in flight finish in the background
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
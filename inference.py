@@ -0,0 +1,492 @@
+"""
+Shared, batched NER + sentiment inference for both crawlers.
+
+InferenceEngine wraps the two transformers pipelines and runs them over lists of texts:
+inputs are sorted by length so each batch pads to similar sizes, then results are put
+back in input order. MicroBatcher sits in front of an engine for callers that produce
+texts one at a time – it flushes when a batch fills up or when the oldest queued text
+has waited max_wait seconds.
+
+Long texts are no longer cut at a character count: each one is split into token windows
+(chunking.py) that cover the whole text, all windows of a batch of texts go through the
+model together, and the windows' results are merged back into one per text. Output fields
+match what analyze_article / ThreatAnalyzer always returned: entities as "GROUP: word | ..."
+(score > 0.8), sentiment as a capitalized label and sentiment_score rounded to 3 places.
+
+Models can differ per language. LanguageRouter runs language.detect_language() over the
+texts and hands each language's share to its own engine; languages without an override
+use the default multilingual models, and engines with the same models share one copy:
+
+    SAFEGUARD_NER_MODEL / SAFEGUARD_SENTIMENT_MODEL             default models
+    SAFEGUARD_NER_MODEL_EN, SAFEGUARD_SENTIMENT_MODEL_SW, ...   per-language overrides
+    SAFEGUARD_FAST_ENGLISH=1                                    English -> distilled models
+
+Every model can run on one of three CPU backends, all returning the same labels and scores
+through the same transformers pipeline wrapper:
+
+    SAFEGUARD_NLP_BACKEND=pipeline   the PyTorch checkpoint as published (default)
+    SAFEGUARD_NLP_BACKEND=int8       torch dynamic int8 quantization of the Linear layers
+    SAFEGUARD_NLP_BACKEND=onnx       ONNX Runtime via optimum; exported once into SAFEGUARD_ONNX_DIR
+
+Nothing is loaded at import time. get_engine() returns the process-wide engine, whose
+pipelines load on first use – or, when SAFEGUARD_INFERENCE_SOCKET points at a running
+inference_worker.py, a client for that worker so every process shares one copy of the weights.
+Set SAFEGUARD_INFERENCE_AUTHKEY to a secret of your own for the worker and its clients alike:
+the connection unpickles whatever comes back, and the default key is no secret.
+Either way it sits behind the persistent analysis cache (see analysis_cache.py), so only
+texts that haven't been analyzed before reach the models.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from chunking import chunk_spans, merge_entities, merge_sentiments
+from language import LANGUAGES, detect_language
+
+NER_MODEL = os.getenv("SAFEGUARD_NER_MODEL", "Davlan/bert-base-multilingual-cased-ner-hrl")
+SENTIMENT_MODEL = os.getenv("SAFEGUARD_SENTIMENT_MODEL", "cardiffnlp/twitter-xlm-roberta-base-sentiment")
+# Distilled, several times cheaper per token; same label sets as the defaults (PER/ORG/LOC...,
+# positive/neutral/negative)
+DISTILLED_NER_MODEL = "dslim/distilbert-NER"
+DISTILLED_SENTIMENT_MODEL = "lxyuan/distilbert-base-multilingual-cased-sentiments-student"
+FAST_ENGLISH = os.getenv("SAFEGUARD_FAST_ENGLISH", "0").lower() in ("1", "true", "yes")
+
+# Window sizes in model tokens. NER windows overlap so an entity on a boundary is seen whole;
+# the sentiment model was trained on tweets, so it gets short windows
+NER_CHUNK_TOKENS = 256
+NER_CHUNK_OVERLAP = 32
+SENTIMENT_CHUNK_TOKENS = 128
+MAX_CHUNKS = int(os.getenv("SAFEGUARD_NLP_MAX_CHUNKS", "16")) or None
+BACKENDS = ("pipeline", "int8", "onnx")
+NLP_BACKEND = os.getenv("SAFEGUARD_NLP_BACKEND", "pipeline").lower()
+ONNX_DIR = os.getenv("SAFEGUARD_ONNX_DIR", "onnx_models")
+ENTITY_MIN_SCORE = 0.8
+DEFAULT_BATCH_SIZE = int(os.getenv("SAFEGUARD_NLP_BATCH_SIZE", "16"))
+NUM_THREADS = int(os.getenv("SAFEGUARD_NLP_THREADS", "0")) or None
+INFERENCE_SOCKET = os.getenv("SAFEGUARD_INFERENCE_SOCKET")
+INFERENCE_AUTHKEY = os.getenv("SAFEGUARD_INFERENCE_AUTHKEY", "safeguard").encode()
+
+
+def pick_device():
+    """First CUDA device when torch sees one, otherwise CPU (-1, in pipeline terms)."""
+    try:
+        import torch
+        return 0 if torch.cuda.is_available() else -1
+    except ImportError:
+        return -1
+
+
+def set_num_threads(num_threads: Optional[int]):
+    if not num_threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+
+def _int8_model(task: str, model: str):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoModelForTokenClassification
+
+    cls = AutoModelForTokenClassification if task == "ner" else AutoModelForSequenceClassification
+    weights = cls.from_pretrained(model).eval()
+    return torch.quantization.quantize_dynamic(weights, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _onnx_model(task: str, model: str, num_threads: Optional[int] = None):
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForTokenClassification
+
+    cls = ORTModelForTokenClassification if task == "ner" else ORTModelForSequenceClassification
+    options = onnxruntime.SessionOptions()
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    path = os.path.join(ONNX_DIR, model.replace("/", "__"))
+    if os.path.isdir(path):
+        return cls.from_pretrained(path, session_options=options)
+    # First use: export from the PyTorch checkpoint (slow) and keep the export for next time
+    exported = cls.from_pretrained(model, export=True, session_options=options)
+    exported.save_pretrained(path)
+    return exported
+
+
+def load_pipeline(task: str, model: str, device=None, backend: str = NLP_BACKEND,
+                  num_threads: Optional[int] = None):
+    """
+    One NER ("ner") or sentiment pipeline on the given backend. The int8 and ONNX backends are
+    CPU-only and fall back to the plain pipeline when torch/optimum can't provide them.
+    """
+    from transformers import AutoTokenizer, pipeline
+
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown NLP backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+    name, extra = ("ner", {"aggregation_strategy": "simple"}) if task == "ner" else ("sentiment-analysis", {})
+    if backend != "pipeline":
+        try:
+            weights = _int8_model(task, model) if backend == "int8" else _onnx_model(task, model, num_threads)
+            # Same tokenizer and id2label as the original checkpoint, so the outputs keep their labels
+            return pipeline(name, model=weights, tokenizer=AutoTokenizer.from_pretrained(model), device=-1, **extra)
+        except ImportError as e:
+            print(f"NLP backend {backend} unavailable for {model} ({e}) – using the plain pipeline.")
+    device = pick_device() if device is None else device
+    return pipeline(name, model=model, device=device, **extra)
+
+
+def load_pipelines(ner_model: str = NER_MODEL, sentiment_model: str = SENTIMENT_MODEL,
+                   device=None, num_threads: Optional[int] = None, backend: str = NLP_BACKEND):
+    """Builds the NER and sentiment pipelines on the best available device."""
+    set_num_threads(num_threads)
+    return (load_pipeline("ner", ner_model, device, backend, num_threads),
+            load_pipeline("sentiment", sentiment_model, device, backend, num_threads))
+
+
+def model_routes() -> Dict[str, Tuple[str, str]]:
+    """(ner_model, sentiment_model) for "default" and every language that differs from it."""
+    default = (NER_MODEL, SENTIMENT_MODEL)
+    routes = {"default": default}
+    for lang in LANGUAGES:
+        ner, sentiment = default
+        if lang == "en" and FAST_ENGLISH:
+            ner, sentiment = DISTILLED_NER_MODEL, DISTILLED_SENTIMENT_MODEL
+        ner = os.getenv(f"SAFEGUARD_NER_MODEL_{lang.upper()}", ner)
+        sentiment = os.getenv(f"SAFEGUARD_SENTIMENT_MODEL_{lang.upper()}", sentiment)
+        if (ner, sentiment) != default:
+            routes[lang] = (ner, sentiment)
+    return routes
+
+
+def route_signature(routes: Dict[str, Tuple[str, str]], task: str) -> str:
+    """Cache namespace for one task: its models per language, the backend and the chunking settings."""
+    i = 0 if task == "ner" else 1
+    parts = [routes["default"][i]] + [f"{lang}={models[i]}" for lang, models in sorted(routes.items())
+                                      if lang != "default" and models[i] != routes["default"][i]]
+    window = (f"{NER_CHUNK_TOKENS}/{NER_CHUNK_OVERLAP}" if task == "ner" else str(SENTIMENT_CHUNK_TOKENS))
+    if NLP_BACKEND != "pipeline":
+        parts.append(f"backend={NLP_BACKEND}")
+    return ";".join(parts) + f";chunks={window}x{MAX_CHUNKS or 'all'}"
+
+
+def format_entities(ents: List[Dict]) -> str:
+    return " | ".join(set([f"{e['entity_group']}: {e['word']}" for e in ents if e['score'] > ENTITY_MIN_SCORE]))
+
+
+def format_sentiment(result: Dict) -> Dict:
+    return {"sentiment": result.get("label", "N/A").capitalize(),
+            "sentiment_score": round(float(result.get("score", 0.0)), 3)}
+
+
+class InferenceEngine:
+    """
+    Runs the pipelines over batches of texts. Pass the pipelines directly, or a `loader`
+    returning (ner, sentiment) to defer loading until the engine is first used.
+    """
+
+    def __init__(self, ner_pipeline=None, sentiment_pipeline=None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 loader=None):
+        self.ner_pipeline = ner_pipeline
+        self.sentiment_pipeline = sentiment_pipeline
+        self.batch_size = batch_size
+        self.load_error: Optional[Exception] = None
+        self._loader = loader
+        self._load_lock = threading.Lock()
+        # Pipelines aren't safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self):
+        if self._loader is None:
+            return
+        with self._load_lock:
+            if self._loader is None:
+                return
+            loader, self._loader = self._loader, None
+            try:
+                self.ner_pipeline, self.sentiment_pipeline = loader()
+            except Exception as e:
+                self.load_error = e
+
+    @property
+    def ner_available(self) -> bool:
+        self.ensure_loaded()
+        return self.ner_pipeline is not None
+
+    @property
+    def sentiment_available(self) -> bool:
+        self.ensure_loaded()
+        return self.sentiment_pipeline is not None
+
+    def _run(self, pipe, texts: List[str], **kwargs) -> List:
+        """
+        Runs pipe over texts longest-first in batches, returning outputs in input order.
+        If a batch fails, its items are retried one by one; items that still fail come back as None.
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        outputs: List = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            batch = [texts[i] for i in idx]
+            try:
+                with self._lock:
+                    results = pipe(batch, batch_size=len(batch), **kwargs)
+            except Exception:
+                results = []
+                for text in batch:
+                    try:
+                        with self._lock:
+                            results.append(pipe([text], **kwargs)[0])
+                    except Exception:
+                        results.append(None)
+            for i, res in zip(idx, results):
+                outputs[i] = res
+        return outputs
+
+    def _windows(self, pipe, texts: List[str], max_tokens: int, overlap: int = 0,
+                 **kwargs) -> List[Tuple[List, List[int]]]:
+        """
+        Runs pipe over every token window of every text in one batched pass. Returns, per text,
+        its windows' outputs and their lengths in words (the sentiment vote's weights).
+        """
+        tokenizer = getattr(pipe, "tokenizer", None)
+        windows: List[str] = []
+        owners: List[int] = []
+        with self._lock:  # fast tokenizers aren't safe to share between threads either
+            for i, text in enumerate(texts):
+                for start, end in chunk_spans(text, max_tokens, overlap, tokenizer, MAX_CHUNKS):
+                    windows.append(text[start:end])
+                    owners.append(i)
+        outputs = self._run(pipe, windows, **kwargs)
+        grouped: List[Tuple[List, List[int]]] = [([], []) for _ in texts]
+        for owner, window, out in zip(owners, windows, outputs):
+            grouped[owner][0].append(out)
+            grouped[owner][1].append(len(window.split()))
+        return grouped
+
+    def entities(self, texts: List[str]) -> List[Optional[str]]:
+        """Entity strings per text ("" when nothing passes the score cut, None on error)."""
+        self.ensure_loaded()
+        grouped = self._windows(self.ner_pipeline, texts, NER_CHUNK_TOKENS, NER_CHUNK_OVERLAP)
+        merged = [merge_entities(outs) for outs, _ in grouped]
+        return [None if ents is None else format_entities(ents) for ents in merged]
+
+    def sentiments(self, texts: List[str]) -> List[Optional[Dict]]:
+        """{"sentiment", "sentiment_score"} per text (None on error)."""
+        self.ensure_loaded()
+        grouped = self._windows(self.sentiment_pipeline, texts, SENTIMENT_CHUNK_TOKENS, truncation=True)
+        merged = [merge_sentiments(outs, weights) for outs, weights in grouped]
+        return [None if res is None else format_sentiment(res) for res in merged]
+
+    def analyze(self, texts: List[str]) -> List[Optional[Dict]]:
+        """{"entities", "sentiment", "sentiment_score"} per text (None on error)."""
+        entities = self.entities(texts)
+        sentiments = self.sentiments(texts)
+        return [None if ents is None or sent is None else {"entities": ents, **sent}
+                for ents, sent in zip(entities, sentiments)]
+
+
+class LanguageRouter:
+    """
+    Same interface as InferenceEngine, but each text goes to the engine for its language.
+    Texts are grouped per language, so every engine still gets one batched call. `stats`
+    keeps texts, words and seconds per language.
+    """
+
+    def __init__(self, engines: Dict[str, InferenceEngine], default: InferenceEngine,
+                 detect: Callable[[str], str] = detect_language):
+        self.engines = engines
+        self.default = default
+        self.detect = detect
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def batch_size(self) -> int:
+        return self.default.batch_size
+
+    @property
+    def load_error(self) -> Optional[Exception]:
+        return next((e.load_error for e in self._all() if e.load_error), None)
+
+    def _all(self) -> List[InferenceEngine]:
+        return list({id(e): e for e in [self.default, *self.engines.values()]}.values())
+
+    @property
+    def ner_available(self) -> bool:
+        return all(e.ner_available for e in self._all())
+
+    @property
+    def sentiment_available(self) -> bool:
+        return all(e.sentiment_available for e in self._all())
+
+    def _route(self, method: str, texts: List[str]) -> List:
+        by_lang: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            by_lang.setdefault(self.detect(text), []).append(i)
+        outputs: List = [None] * len(texts)
+        for lang, idx in by_lang.items():
+            started = time.perf_counter()
+            results = getattr(self.engines.get(lang, self.default), method)([texts[i] for i in idx])
+            elapsed = time.perf_counter() - started
+            for i, res in zip(idx, results):
+                outputs[i] = res
+            with self._stats_lock:
+                row = self.stats.setdefault(lang, {"texts": 0, "words": 0, "seconds": 0.0})
+                row["texts"] += len(idx)
+                row["words"] += sum(len(texts[i].split()) for i in idx)
+                row["seconds"] += elapsed
+        return outputs
+
+    def entities(self, texts: List[str]) -> List[Optional[str]]:
+        return self._route("entities", texts)
+
+    def sentiments(self, texts: List[str]) -> List[Optional[Dict]]:
+        return self._route("sentiments", texts)
+
+    def analyze(self, texts: List[str]) -> List[Optional[Dict]]:
+        return self._route("analyze", texts)
+
+
+def build_engine(routes: Optional[Dict[str, Tuple[str, str]]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 num_threads: Optional[int] = NUM_THREADS, backend: str = NLP_BACKEND, loader=load_pipeline):
+    """
+    A local engine for the configured model routes – a plain InferenceEngine when every
+    language uses the default models, a LanguageRouter otherwise. Pipelines load on first use
+    and each model is loaded once however many languages use it.
+    """
+    routes = routes or model_routes()
+    pipelines: Dict[Tuple[str, str], object] = {}
+    pipelines_lock = threading.Lock()
+
+    def pipeline_for(task: str, model: str):
+        with pipelines_lock:
+            if (task, model) not in pipelines:
+                set_num_threads(num_threads)
+                pipelines[(task, model)] = loader(task, model, backend=backend, num_threads=num_threads)
+            return pipelines[(task, model)]
+
+    def engine_for(models: Tuple[str, str]) -> InferenceEngine:
+        ner, sentiment = models
+        return InferenceEngine(batch_size=batch_size,
+                               loader=lambda: (pipeline_for("ner", ner), pipeline_for("sentiment", sentiment)))
+
+    default = engine_for(routes["default"])
+    if len(routes) == 1:
+        return default
+    engines: Dict[Tuple[str, str], InferenceEngine] = {routes["default"]: default}
+    for models in routes.values():
+        if models not in engines:
+            engines[models] = engine_for(models)
+    return LanguageRouter({lang: engines[models] for lang, models in routes.items() if lang != "default"},
+                          default)
+
+
+class MicroBatcher:
+    """
+    Collects single texts from any thread and analyzes them in batches.
+    submit() returns a Future resolving to engine.analyze()'s result for that text.
+    """
+
+    def __init__(self, engine: InferenceEngine, batch_size: Optional[int] = None, max_wait: float = 0.05):
+        self.engine = engine
+        self.batch_size = batch_size or engine.batch_size
+        self.max_wait = max_wait
+        self._pending: List = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((time.monotonic(), text, future))
+            self._cond.notify()
+        return future
+
+    def _take_batch(self) -> List:
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._pending[0][0] + self.max_wait
+                    if len(self._pending) >= self.batch_size or self._closed or time.monotonic() >= due:
+                        batch = self._pending[:self.batch_size]
+                        del self._pending[:self.batch_size]
+                        return batch
+                    self._cond.wait(due - time.monotonic())
+                elif self._closed:
+                    return []
+                else:
+                    self._cond.wait()
+
+    def _loop(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                results = self.engine.analyze([text for _, text, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def close(self):
+        """Flushes whatever is queued, then stops the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    The process-wide engine. Uses the inference worker at SAFEGUARD_INFERENCE_SOCKET when it
+    answers (and accepts our SAFEGUARD_INFERENCE_AUTHKEY), otherwise a local engine whose
+    pipelines load on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if INFERENCE_SOCKET:
+                from inference_worker import RemoteInferenceEngine
+                try:
+                    _engine = RemoteInferenceEngine(INFERENCE_SOCKET, INFERENCE_AUTHKEY)
+                except (OSError, multiprocessing.AuthenticationError) as e:
+                    print(f"Inference worker at {INFERENCE_SOCKET} unavailable ({e}) – loading models locally.")
+            if _engine is None:
+                _engine = build_engine()
+            from analysis_cache import CachedEngine, get_cache
+            cache = get_cache()
+            if cache is not None:
+                # The worker is started with the same environment, so the same routes apply there
+                routes = model_routes()
+                _engine = CachedEngine(_engine, cache, route_signature(routes, "ner"),
+                                       route_signature(routes, "sentiment"))
+        return _engine
+
+
+def use_engine(engine):
+    """
+    Makes `engine` the process-wide engine, as it is – no analysis cache in front. Offline
+    benchmarks use it to run the crawlers on a stub or a tiny model.
+    """
+    global _engine
+    with _engine_lock:
+        _engine = engine
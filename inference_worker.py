@@ -0,0 +1,134 @@
+"""
+Long-lived local inference worker.
+
+Loads the NER and sentiment pipelines once (every per-language route, see inference.py) and
+serves them over a Unix socket, so scheduled scans and one-off scripts skip model loading
+entirely:
+
+    python inference_worker.py --socket /tmp/safeguard-inference.sock
+    SAFEGUARD_INFERENCE_SOCKET=/tmp/safeguard-inference.sock python WebCrawler_V1.py
+
+Worker and clients authenticate with SAFEGUARD_INFERENCE_AUTHKEY – set it to a real secret,
+the replies are unpickled by the client and the built-in default is public.
+
+Requests are (method, texts) tuples over multiprocessing.connection; replies are
+("ok", result) or ("error", message). Each client connection gets its own thread,
+model calls are serialized by the engine.
+"""
+import argparse
+import os
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional
+
+from inference import DEFAULT_BATCH_SIZE, INFERENCE_AUTHKEY, INFERENCE_SOCKET, InferenceEngine, build_engine
+
+DEFAULT_SOCKET = "/tmp/safeguard-inference.sock"
+METHODS = ("entities", "sentiments", "analyze", "available")
+
+
+class RemoteInferenceEngine:
+    """Client side – same interface as InferenceEngine, one connection per calling thread."""
+
+    def __init__(self, address: str, authkey: bytes = INFERENCE_AUTHKEY):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+        self._available = self._call("available", [])
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+        return conn
+
+    def _call(self, method: str, texts: List[str]):
+        conn = self._conn()
+        try:
+            conn.send((method, texts))
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if status != "ok":
+            raise RuntimeError(f"inference worker error: {payload}")
+        return payload
+
+    @property
+    def ner_available(self) -> bool:
+        return self._available["ner"]
+
+    @property
+    def sentiment_available(self) -> bool:
+        return self._available["sentiment"]
+
+    def entities(self, texts: List[str]) -> List[Optional[str]]:
+        return self._call("entities", texts)
+
+    def sentiments(self, texts: List[str]) -> List[Optional[Dict]]:
+        return self._call("sentiments", texts)
+
+    def analyze(self, texts: List[str]) -> List[Optional[Dict]]:
+        return self._call("analyze", texts)
+
+
+def handle_client(conn, engine: InferenceEngine):
+    with conn:
+        while True:
+            try:
+                method, texts = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if method not in METHODS:
+                    raise ValueError(f"unknown method {method!r}")
+                if method == "available":
+                    result = {"ner": engine.ner_available, "sentiment": engine.sentiment_available}
+                else:
+                    result = getattr(engine, method)(texts)
+                conn.send(("ok", result))
+            except Exception as e:
+                conn.send(("error", str(e)))
+
+
+def serve(address: str, engine: InferenceEngine, authkey: bytes = INFERENCE_AUTHKEY,
+          ready: Optional[threading.Event] = None):
+    if os.path.exists(address):
+        os.unlink(address)
+    with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+        os.chmod(address, 0o600)
+        if ready is not None:
+            ready.set()
+        print(f"Inference worker listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Bad authkey or a client that hung up mid-handshake – keep serving the others
+                print(f"Rejected inference client: {e}")
+                continue
+            threading.Thread(target=handle_client, args=(conn, engine), daemon=True).start()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the NER/sentiment pipelines over a Unix socket.")
+    ap.add_argument("--socket", default=INFERENCE_SOCKET or DEFAULT_SOCKET)
+    ap.add_argument("--threads", type=int, default=None, help="torch CPU threads")
+    ap.add_argument("--batch-size", type=int, default=None)
+    args = ap.parse_args()
+
+    engine = build_engine(batch_size=args.batch_size or DEFAULT_BATCH_SIZE, num_threads=args.threads)
+    if not (engine.ner_available and engine.sentiment_available):
+        raise SystemExit(f"Could not load the pipelines: {engine.load_error}")
+    print("Transformers pipelines loaded – NER and sentiment are ready to serve.")
+    try:
+        serve(args.socket, engine)
+    except KeyboardInterrupt:
+        print("\nInference worker stopped")
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
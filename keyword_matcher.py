@@ -0,0 +1,176 @@
+"""
+Precompiled multilingual keyword matching for categorize_article and ThreatAnalyzer.
+
+All terms of a lexicon section are compiled once into an Aho–Corasick automaton
+(pyahocorasick, when installed) or else a single prefix-trie regex, so a text is scanned
+in one pass instead of one substring search per keyword and per sentence. Overlapping
+terms ('domestic violence' and 'violence', 'unyanyasaji' inside 'unyanyasaji wa kijinsia')
+are all reported, as the old `k in s` checks did.
+
+Terms from BOUNDARY_LANGS must start at a word boundary, so 'kill' doesn't fire inside
+'skill'. Swahili/Kikuyu terms keep substring semantics, since their verbs take prefixes.
+"""
+import json
+import os
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+# Optional C automaton – the regex fallback gives the same matches, just slower
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicon.json")
+BOUNDARY_LANGS = ("en",)
+
+# category -> terms, or category -> {lang: terms}
+Categories = Dict[str, Union[Iterable[str], Dict[str, Iterable[str]]]]
+
+
+@dataclass
+class KeywordHits:
+    counts: Dict[str, int] = field(default_factory=dict)
+    terms: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def categories(self) -> Set[str]:
+        return set(self.counts)
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Optional (greedy) when a term also ends here, so the longest term wins
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, categories: Categories, default_lang: str = "en", whole_word: bool = False):
+        self.whole_word = whole_word
+        self.term_categories: Dict[str, List[str]] = {}
+        substring_terms: Set[str] = set()
+        for category, terms in categories.items():
+            by_lang = terms if isinstance(terms, dict) else {default_lang: terms}
+            for lang, lang_terms in by_lang.items():
+                for term in lang_terms:
+                    term = term.lower().strip()
+                    cats = self.term_categories.setdefault(term, [])
+                    if category not in cats:
+                        cats.append(category)
+                    if lang not in BOUNDARY_LANGS:
+                        substring_terms.add(term)
+        self.needs_boundary = {t: t not in substring_terms for t in self.term_categories}
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for term in self.term_categories:
+                self._automaton.add_word(term, term)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            # For each term, every lexicon term that is a prefix of it (itself included)
+            self._prefix_terms = {t: [p for p in self.term_categories if t.startswith(p)]
+                                  for t in self.term_categories}
+            self._pattern = re.compile(_trie_pattern(self.term_categories))
+
+    @classmethod
+    def from_lexicon(cls, section: str, path: str = LEXICON_PATH, **kwargs) -> "KeywordMatcher":
+        return cls(load_lexicon(path)[section], **kwargs)
+
+    def _candidates(self, text: str) -> Iterator[Tuple[int, str]]:
+        if self._automaton is not None:
+            for end, term in self._automaton.iter(text):
+                yield end - len(term) + 1, term
+            return
+        search = self._pattern.search
+        m = search(text)
+        while m:
+            # The regex reports the longest term at each start; shorter terms there are its prefixes.
+            # Resuming one character past the start (not the end) finds overlapping terms.
+            for term in self._prefix_terms[m.group()]:
+                yield m.start(), term
+            m = search(text, m.start() + 1)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(start, term) for every term occurrence in an already-lowercased text."""
+        needs_boundary, whole_word = self.needs_boundary, self.whole_word
+        for start, term in self._candidates(text):
+            if start > 0 and needs_boundary[term]:
+                prev = text[start - 1]
+                if prev.isalnum() or prev == "_":
+                    continue
+            if whole_word:
+                end = start + len(term)
+                if end < len(text) and (text[end].isalnum() or text[end] == "_"):
+                    continue
+            yield start, term
+
+    def scan(self, text: str, lowered: bool = False) -> KeywordHits:
+        """Per-category hit counts and matched terms, in one pass over the text."""
+        counts: Dict[str, int] = {}
+        terms: Dict[str, List[str]] = {}
+        term_categories = self.term_categories
+        for _, term in self.iter_matches(text if lowered else text.lower()):
+            for category in term_categories[term]:
+                counts[category] = counts.get(category, 0) + 1
+                matched = terms.setdefault(category, [])
+                if term not in matched:
+                    matched.append(term)
+        return KeywordHits(counts, terms)
+
+    def categories_in(self, text: str, lowered: bool = False) -> Set[str]:
+        return self.scan(text, lowered).categories()
+
+    def segment_counts(self, text: str, segments: List[str], lowered: bool = False) -> Dict[str, int]:
+        """
+        How many segments (e.g. the sentences of text, in order) contain each category,
+        from a single scan of the whole text.
+        """
+        return self.scan_segments(text, segments, lowered)[0]
+
+    def scan_segments(self, text: str, segments: List[str],
+                      lowered: bool = False) -> Tuple[Dict[str, int], KeywordHits]:
+        """segment_counts and scan from the same single pass over the text."""
+        text = text if lowered else text.lower()
+        starts, cursor = [], 0
+        for segment in segments:
+            pos = text.find(segment, cursor)
+            pos = cursor if pos < 0 else pos
+            starts.append(pos)
+            cursor = pos + len(segment) if pos >= cursor else cursor
+        seen: Dict[str, Set[int]] = {}
+        counts: Dict[str, int] = {}
+        terms: Dict[str, List[str]] = {}
+        for start, term in self.iter_matches(text):
+            segment = bisect_right(starts, start) - 1
+            for category in self.term_categories[term]:
+                seen.setdefault(category, set()).add(segment)
+                counts[category] = counts.get(category, 0) + 1
+                matched = terms.setdefault(category, [])
+                if term not in matched:
+                    matched.append(term)
+        return {category: len(idx) for category, idx in seen.items()}, KeywordHits(counts, terms)
+
+
+@lru_cache(maxsize=4)
+def load_lexicon(path: str = LEXICON_PATH) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith("_")}
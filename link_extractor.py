@@ -0,0 +1,225 @@
+"""
+Single-pass article link extraction for the news homepages.
+
+A homepage is scanned once with one precompiled tag regex instead of being parsed into a
+BeautifulSoup tree: script/style bodies and comments are skipped whole, and only the tags
+that matter (anchors, headings, <time>, and the regions main/article vs nav/header/footer/
+aside) are looked at. Scanning stops once enough candidate links have been collected.
+
+Each site's URL rules – allowed hosts, path patterns that mark an article, exclusions –
+compile into one LinkRules matcher (once per site), so checking an anchor is a host set
+lookup plus at most two regex searches. Rules come from SITE_SETTINGS:
+
+    SITE_SETTINGS = {"https://www.standardmedia.co.ke/": {
+        "hosts": ["www.standardmedia.co.ke", "standardmedia.co.ke"],
+        "include": [r"/article/\\d+/"],           # regexes on path + query; default: DEFAULT_PATH_INDICATORS
+        "exclude": [r"/(tag|author|video)s?/"],
+        "max_candidates": 60,                     # stop scanning after this many matching links
+    }}
+
+Candidates are ranked newest first – a date in the URL or a <time> in or right after the
+anchor – then by prominence (headline text, inside a heading or <main>/<article>, not in
+navigation chrome), then by page order.
+"""
+import html as html_lib
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_PATH_INDICATORS = ("/news/", "/article/", "/story/", "/kenya/", "/swahili/", "/kikuyu/")
+# Candidates collected per wanted link before the scan stops
+CANDIDATE_FACTOR = 4
+
+_TOKEN = re.compile(
+    r"<!--.*?-->"
+    r"|<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>"
+    r"|<(/?)(a|h[1-4]|main|article|nav|header|footer|aside|time)\b([^>]*)>",
+    re.S | re.I)
+_HREF = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I)
+_DATETIME = re.compile(r"""\bdatetime\s*=\s*["']?(\d{4}-\d{2}-\d{2})""", re.I)
+_TAGS = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+_URL_DATE = re.compile(r"/(20\d{2})[/-](\d{1,2})[/-](\d{1,2})(?=[/-]|$)")
+_URL_MONTH = re.compile(r"/(20\d{2})/(\d{1,2})/")
+
+_HEADINGS = {"h1", "h2", "h3", "h4"}
+_CONTENT = {"main", "article"}
+_CHROME = {"nav", "header", "footer", "aside"}
+
+
+@dataclass
+class Link:
+    url: str
+    text: str
+    position: int
+    published: Optional[date] = None
+    prominence: int = 0
+    date_source: Optional[str] = None  # "url" or "time"
+
+
+def url_date(url: str) -> Optional[date]:
+    """
+    The /2024/05/12/ or /2024-05-12 style date many news URLs carry. A year and month alone
+    (/2024/05/) give the month's last day – the newest the article can be.
+    """
+    m = _URL_DATE.search(url)
+    try:
+        if m:
+            return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        m = _URL_MONTH.search(url)
+        if m:
+            year, month = int(m.group(1)), int(m.group(2))
+            if 1 <= month <= 12:
+                return date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    except ValueError:
+        pass
+    return None
+
+
+class LinkRules:
+    def __init__(self, site: str, hosts: Optional[Sequence[str]] = None, include: Optional[Sequence[str]] = None,
+                 exclude: Optional[Sequence[str]] = None, max_candidates: Optional[int] = None):
+        parts = urlsplit(site)
+        self.site = site
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.hosts = frozenset(h.lower() for h in (hosts or [parts.netloc]))
+        include = include or [re.escape(p) for p in DEFAULT_PATH_INDICATORS]
+        self._include = re.compile("|".join(f"(?:{p})" for p in include), re.I)
+        self._exclude = re.compile("|".join(f"(?:{p})" for p in exclude), re.I) if exclude else None
+        self.max_candidates = max_candidates
+
+    @classmethod
+    def from_settings(cls, site: str, settings: Optional[Dict] = None) -> "LinkRules":
+        settings = settings or {}
+        return cls(site, settings.get("hosts"), settings.get("include"), settings.get("exclude"),
+                   settings.get("max_candidates"))
+
+    def resolve(self, href: str) -> Optional[str]:
+        """Absolute URL without its #fragment when it's an article link for this site, else None."""
+        href = href.strip()
+        if not href or href[0] == "#" or href.startswith(("javascript:", "mailto:", "tel:")):
+            return None
+        if href[0] == "/" and not href.startswith("//"):
+            url = self.origin + href  # the common case, without a full urljoin
+        elif href.startswith(("http://", "https://")):
+            url = href
+        else:
+            url = urljoin(self.site, href)
+        url = url.split("#", 1)[0]
+        parts = urlsplit(url)
+        if parts.netloc.lower() not in self.hosts:
+            return None
+        rest = url[len(parts.scheme) + 3 + len(parts.netloc):]
+        if not self._include.search(rest):
+            return None
+        if self._exclude is not None and self._exclude.search(rest):
+            return None
+        return url
+
+
+def _href(attrs: str) -> Optional[str]:
+    m = _HREF.search(attrs)
+    if not m:
+        return None
+    return html_lib.unescape(next(g for g in m.groups() if g is not None))
+
+
+def _prominence(text: str, heading: int, content: int, chrome: int) -> int:
+    score = 0
+    if len(text.split()) >= 4:  # a headline rather than "More" or a section name
+        score += 2
+    if heading:
+        score += 2
+    if content:
+        score += 1
+    if chrome:
+        score -= 3
+    return score
+
+
+def scan_links(page: str, rules: LinkRules, limit: Optional[int] = None) -> List[Link]:
+    """Matching links in page order, one per URL, stopping after `limit` of them."""
+    links: Dict[str, Link] = {}
+    heading = content = chrome = 0
+    anchor_href: Optional[str] = None
+    anchor_end = 0
+    anchor_time: Optional[date] = None
+    last: Optional[Link] = None  # the previous link, for a <time> that follows its anchor
+    for m in _TOKEN.finditer(page):
+        tag = m.group(3)
+        if tag is None:
+            continue  # comment or script/style body
+        tag = tag.lower()
+        closing = bool(m.group(2))
+        if tag == "a":
+            if not closing:
+                anchor_href, anchor_end, anchor_time = _href(m.group(4)), m.end(), None
+                continue
+            if anchor_href is None:
+                continue
+            url = rules.resolve(anchor_href)
+            anchor_href = None
+            if url is None:
+                continue
+            text = _SPACE.sub(" ", html_lib.unescape(_TAGS.sub(" ", page[anchor_end:m.start()]))).strip()
+            prominence = _prominence(text, heading, content, chrome)
+            existing = links.get(url)
+            if existing is not None:
+                # The same story linked from an image and a headline – keep the better one
+                existing.prominence = max(existing.prominence, prominence)
+                existing.text = existing.text or text
+                last = existing
+                continue
+            published, source = url_date(url), "url"
+            if published is None and anchor_time is not None:
+                published, source = anchor_time, "time"
+            last = links[url] = Link(url, text, len(links), published, prominence, source if published else None)
+            if limit and len(links) >= limit:
+                break
+        elif tag == "time":
+            if closing:
+                continue
+            d = _DATETIME.search(m.group(4))
+            if not d:
+                continue
+            try:
+                when = date.fromisoformat(d.group(1))
+            except ValueError:
+                continue
+            if anchor_href is not None:
+                anchor_time = when
+            elif last is not None and last.published is None:
+                last.published, last.date_source = when, "time"
+        else:
+            step = -1 if closing else 1
+            if tag in _HEADINGS:
+                heading = max(0, heading + step)
+            elif tag in _CONTENT:
+                content = max(0, content + step)
+            elif tag in _CHROME:
+                chrome = max(0, chrome + step)
+    return list(links.values())
+
+
+def rank_links(links: List[Link]) -> List[Link]:
+    """Newest first (undated after dated), then most prominent, then page order."""
+    return sorted(links, key=lambda l: (l.published is None, -(l.published or date.min).toordinal(),
+                                        -l.prominence, l.position))
+
+
+def extract_links(page: str, rules: LinkRules, max_links: int = 10) -> List[Link]:
+    limit = rules.max_candidates or max_links * CANDIDATE_FACTOR
+    return rank_links(scan_links(page, rules, limit))[:max_links]
+
+
+_rules: Dict[str, LinkRules] = {}
+
+
+def rules_for(site: str, site_settings: Optional[Dict[str, Dict]] = None) -> LinkRules:
+    """The compiled rules for a site, built once from its SITE_SETTINGS entry."""
+    rules = _rules.get(site)
+    if rules is None:
+        rules = _rules[site] = LinkRules.from_settings(site, (site_settings or {}).get(site))
+    return rules
@@ -0,0 +1,270 @@
+"""
+Lightweight run instrumentation: stage timers, counters, skip reasons and keyword hits.
+
+    metrics = get_metrics("news")
+    with metrics.timer("parse", site):
+        ...
+    metrics.count("articles_saved", key=site)
+    metrics.skip("old", key=site)
+    metrics.keyword_hits(hits.terms)
+
+Timings are kept per stage and per (stage, key) – the key is the site for the news crawl, the
+search query for the Twitter scan – and reported as count / total / p50 / p95 / max.
+
+At the end of a run finish() writes a JSON run report to SAFEGUARD_RUN_REPORT_DIR and, when
+SAFEGUARD_PROMETHEUS_FILE is set, the same numbers in Prometheus text format (for the
+node_exporter textfile collector or any scheduler that scrapes a file).
+
+SAFEGUARD_METRICS=off turns every call into a no-op: timer() hands back one shared null context
+manager and the other methods return straight away.
+
+    SAFEGUARD_METRICS=on
+    SAFEGUARD_RUN_REPORT_DIR=run_reports
+    SAFEGUARD_PROMETHEUS_FILE=
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+METRICS_ENABLED = os.getenv("SAFEGUARD_METRICS", "on").lower() not in ("off", "0", "false", "no")
+RUN_REPORT_DIR = os.getenv("SAFEGUARD_RUN_REPORT_DIR", "run_reports")
+PROMETHEUS_FILE = os.getenv("SAFEGUARD_PROMETHEUS_FILE", "")
+
+# Latency samples kept per series; beyond this a reservoir sample keeps the percentiles honest
+MAX_SAMPLES = 5000
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "key", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str, key: Optional[str]):
+        self.metrics, self.stage, self.key = metrics, stage, key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, self.key)
+        return False
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Series:
+    """Durations of one stage (optionally for one site or query)."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+        self.max_samples = max_samples
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < self.max_samples:
+            self.samples.append(seconds)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.max_samples:
+                self.samples[slot] = seconds
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+        return {"count": self.count, "total_s": round(self.total, 6),
+                "p50_s": round(percentile(ordered, 0.50), 6), "p95_s": round(percentile(ordered, 0.95), 6),
+                "max_s": round(self.max, 6)}
+
+
+class Metrics:
+    """
+    Collector for one run. `breakdown` names what the optional per-call key means – the site for
+    the news crawl, the search query for the Twitter scan – and labels that part of the report.
+    """
+
+    def __init__(self, job: str, breakdown: str = "site", enabled: bool = True):
+        self.job = job
+        self.breakdown = breakdown
+        self.enabled = enabled
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.timings: Dict[tuple, Series] = defaultdict(Series)
+        self.counters: Dict[tuple, int] = defaultdict(int)
+        self.skips: Dict[tuple, int] = defaultdict(int)
+        self.keywords: Dict[str, int] = defaultdict(int)
+
+    def observe(self, stage: str, seconds: float, key: Optional[str] = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.timings[(stage, None)].add(seconds)
+            if key is not None:
+                self.timings[(stage, key)].add(seconds)
+
+    def timer(self, stage: str, key: Optional[str] = None):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, key)
+
+    def count(self, name: str, n: int = 1, key: Optional[str] = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[(name, None)] += n
+            if key is not None:
+                self.counters[(name, key)] += n
+
+    def skip(self, reason: str, key: Optional[str] = None, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.skips[(reason, None)] += n
+            if key is not None:
+                self.skips[(reason, key)] += n
+
+    def keyword_hits(self, terms: Dict[str, List[str]]):
+        """Counts one hit per matched term, from KeywordHits.terms (category -> terms)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for category, matched in terms.items():
+                for term in matched:
+                    self.keywords[f"{category}:{term}"] += 1
+
+    # -------------------------- Reporting --------------------------
+    def report(self) -> Dict:
+        with self._lock:
+            groups: Dict[str, Dict] = defaultdict(lambda: {"stages": {}, "counters": {}, "skipped": {}})
+            stages = {}
+            for (stage, key), series in sorted(self.timings.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+                if key is None:
+                    stages[stage] = series.summary()
+                else:
+                    groups[key]["stages"][stage] = series.summary()
+            counters, skipped = {}, {}
+            for (name, key), n in self.counters.items():
+                (counters if key is None else groups[key]["counters"])[name] = n
+            for (reason, key), n in self.skips.items():
+                (skipped if key is None else groups[key]["skipped"])[reason] = n
+            keywords = dict(sorted(self.keywords.items(), key=lambda kv: -kv[1]))
+        return {
+            "job": self.job,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - self._start, 3),
+            "stages": stages,
+            "counters": counters,
+            "skipped": skipped,
+            "keywords": keywords,
+            "breakdown": self.breakdown,
+            f"by_{self.breakdown}": dict(groups),
+        }
+
+    def prometheus_text(self, report: Optional[Dict] = None) -> str:
+        report = report or self.report()
+        job = _label(report["job"])
+        lines = [
+            "# HELP safeguard_run_wall_seconds Wall-clock duration of the last run.",
+            "# TYPE safeguard_run_wall_seconds gauge",
+            f'safeguard_run_wall_seconds{{job="{job}"}} {report["wall_s"]}',
+            "# HELP safeguard_stage_seconds Stage latency quantiles and totals for the last run.",
+            "# TYPE safeguard_stage_seconds summary",
+        ]
+        for stage, s in report["stages"].items():
+            labels = f'job="{job}",stage="{_label(stage)}"'
+            lines.append(f'safeguard_stage_seconds{{{labels},quantile="0.5"}} {s["p50_s"]}')
+            lines.append(f'safeguard_stage_seconds{{{labels},quantile="0.95"}} {s["p95_s"]}')
+            lines.append(f"safeguard_stage_seconds_sum{{{labels}}} {s['total_s']}")
+            lines.append(f"safeguard_stage_seconds_count{{{labels}}} {s['count']}")
+        lines += ["# HELP safeguard_events_total Items counted during the last run.",
+                  "# TYPE safeguard_events_total gauge"]
+        for name, n in report["counters"].items():
+            lines.append(f'safeguard_events_total{{job="{job}",event="{_label(name)}"}} {n}')
+        breakdown = report["breakdown"]
+        for key, data in report[f"by_{breakdown}"].items():
+            for name, n in data["counters"].items():
+                lines.append(f'safeguard_events_total{{job="{job}",event="{_label(name)}",'
+                             f'{breakdown}="{_label(key)}"}} {n}')
+        lines += ["# HELP safeguard_skipped_total Items dropped during the last run, by reason.",
+                  "# TYPE safeguard_skipped_total gauge"]
+        for reason, n in report["skipped"].items():
+            lines.append(f'safeguard_skipped_total{{job="{job}",reason="{_label(reason)}"}} {n}')
+        lines += ["# HELP safeguard_keyword_hits_total Texts matching each keyword during the last run.",
+                  "# TYPE safeguard_keyword_hits_total gauge"]
+        for term, n in report["keywords"].items():
+            lines.append(f'safeguard_keyword_hits_total{{job="{job}",keyword="{_label(term)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def finish(self, report_dir: str = RUN_REPORT_DIR, prometheus_file: str = PROMETHEUS_FILE) -> Optional[str]:
+        """Writes the JSON run report (and the Prometheus file if configured). Returns the report path."""
+        if not self.enabled:
+            return None
+        report = self.report()
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"{self.job}-{self.started_at:%Y%m%d-%H%M%S}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        if prometheus_file:
+            # Written next to the target and renamed, so a scraper never reads half a file
+            tmp = prometheus_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text(report))
+            os.replace(tmp, prometheus_file)
+        print(f"Run report written to {path}")
+        return path
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def print_stage_summary(report: Dict):
+    print("\nStage timings (count / total / p50 / p95 / max, seconds):")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:14s} {s['count']:6d} {s['total_s']:9.2f} {s['p50_s']:8.3f} {s['p95_s']:8.3f} {s['max_s']:8.3f}")
+    if report["skipped"]:
+        print("Skipped: " + ", ".join(f"{reason}={n}" for reason, n in report["skipped"].items()))
+
+
+_metrics: Dict[str, Metrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def get_metrics(job: str, breakdown: str = "site") -> Metrics:
+    """The current run's collector for a job ("news", "twitter"). Disabled when SAFEGUARD_METRICS=off."""
+    with _metrics_lock:
+        if job not in _metrics:
+            _metrics[job] = Metrics(job, breakdown, enabled=METRICS_ENABLED)
+        return _metrics[job]
+
+
+def new_run(job: str, breakdown: str = "site") -> Metrics:
+    """Starts a fresh collector for a job – long-running processes call this once per scan."""
+    with _metrics_lock:
+        _metrics[job] = Metrics(job, breakdown, enabled=METRICS_ENABLED)
+        return _metrics[job]
@@ -0,0 +1,280 @@
+"""
+Near-duplicate clusters across runs: one wire story syndicated by several outlets, one threat
+text copy-pasted by many accounts.
+
+A text becomes a set of word shingles (runs of `shingle_words` words after triage.dedupe_text,
+so case, URLs, @mentions and punctuation don't count) and a SLOTS-slot MinHash signature.
+One-permutation hashing fills every slot from a single hash per shingle – each hash lands in
+one slot and only the smallest stays – with empty slots borrowed from their neighbours, so a
+signature costs one pass over the shingles. LSH splits the signature into BANDS bands of ROWS
+slots: texts sharing any band are candidates, and a candidate's cluster is joined when the
+share of equal slots (the estimated Jaccard similarity) reaches `threshold`. Otherwise the
+text starts a new cluster; its cluster_id is a hash of its key.
+
+Signatures, cluster ids and one analysis result per cluster (results()/put_results(), so NER
+and sentiment run once per cluster) live in SQLite and are loaded into memory at startup, like
+the crawl state's Bloom filter. Entries older than retention_days are dropped then –
+syndication happens within days.
+
+    SAFEGUARD_NEAR_DUP_INDEX=near_duplicates.sqlite   (default; "off" disables clustering)
+    SAFEGUARD_NEAR_DUP_THRESHOLD=0.5
+    SAFEGUARD_NEAR_DUP_RETENTION_DAYS=14
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from itertools import accumulate
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from triage import dedupe_text
+
+NEAR_DUP_PATH = os.getenv("SAFEGUARD_NEAR_DUP_INDEX", "near_duplicates.sqlite")
+NEAR_DUP_THRESHOLD = float(os.getenv("SAFEGUARD_NEAR_DUP_THRESHOLD", "0.5"))
+NEAR_DUP_RETENTION_DAYS = float(os.getenv("SAFEGUARD_NEAR_DUP_RETENTION_DAYS", "14"))
+
+SLOTS = 128
+# 32 bands of 4 slots: a pair at similarity 0.5 shares a band 87% of the time, at 0.7 almost
+# always, at 0.2 only 5% of the time (and is then rejected by the slot comparison)
+BANDS = 32
+ROWS = SLOTS // BANDS
+# Index space -> shingle size. Articles: five-word shingles survive a rewritten intro or
+# footer; tweets are too short for that
+SPACES = {"articles": 5, "tweets": 3}
+ARTICLE_SHINGLE_WORDS = SPACES["articles"]
+
+_SLOT_BITS = 7  # log2(SLOTS)
+_VALUE_BITS = 32 - _SLOT_BITS
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_MIX = 0x9E3779B1  # spreads crc32's bits before they pick the slot
+
+
+def _shingle_hashes(text: str, words: int) -> set:
+    """
+    Hashes of the text's shingles. dedupe_text leaves single spaces between words, so each
+    shingle is a slice of the encoded text and is hashed without being built as a string.
+    """
+    data = dedupe_text(text).encode("utf-8")
+    if not data:
+        return set()
+    lengths = [len(w) + 1 for w in data.split(b" ")]
+    if len(lengths) <= words:
+        return {(zlib.crc32(data) * _MIX) & 0xFFFFFFFF}
+    starts = [0, *accumulate(lengths)]
+    view = memoryview(data)
+    return {(zlib.crc32(view[a:b - 1]) * _MIX) & 0xFFFFFFFF for a, b in zip(starts, starts[words:])}
+
+
+def signature(text: str, words: int = ARTICLE_SHINGLE_WORDS) -> Optional[array]:
+    """The MinHash signature, or None for a text without words."""
+    hashes = _shingle_hashes(text, words)
+    if not hashes:
+        return None
+    # Top bits pick the slot; going from the largest hash down, the smallest one per slot stays
+    smallest = {h >> _VALUE_BITS: h & _VALUE_MASK for h in sorted(hashes, reverse=True)}
+    if len(smallest) == SLOTS:
+        return array("I", (smallest[i] for i in range(SLOTS)))
+    # Densify: an empty slot takes the next filled one's value, tagged with the distance so
+    # that two texts only agree on it when they agree on the slot it came from
+    slots = [0] * SLOTS
+    following = min(smallest) + SLOTS  # past the last filled slot, wrap around to the first
+    for i in range(SLOTS - 1, -1, -1):
+        if i in smallest:
+            following = i
+        slots[i] = smallest[following % SLOTS] | ((following - i) << _VALUE_BITS)
+    return array("I", slots)
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the two texts' shingle sets."""
+    return sum(x == y for x, y in zip(a, b)) / SLOTS
+
+
+_BAND_BYTES = ROWS * 4
+
+
+def _bands(sig: array) -> List[int]:
+    data = sig.tobytes()
+    return [hash((band, data[band * _BAND_BYTES:(band + 1) * _BAND_BYTES])) for band in range(BANDS)]
+
+
+def cluster_id_for(key: str) -> str:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass
+class Assignment:
+    cluster_id: str
+    similarity: float  # to the matched text; 0.0 for a new cluster
+    new: bool
+
+
+class NearDuplicateIndex:
+    def __init__(self, path: str = NEAR_DUP_PATH, space: str = "articles", threshold: float = NEAR_DUP_THRESHOLD,
+                 shingle_words: Optional[int] = None, retention_days: float = NEAR_DUP_RETENTION_DAYS):
+        self.path = path
+        self.space = space
+        shingle_words = shingle_words or SPACES.get(space, ARTICLE_SHINGLE_WORDS)
+        self.threshold = threshold
+        self.shingle_words = shingle_words
+        self.retention = retention_days * 86400
+        self.stats = {"assigned": 0, "joined": 0, "new_clusters": 0, "candidates": 0}
+        self._lock = threading.Lock()
+        self._signatures: List[Optional[array]] = []
+        self._cluster_of: List[str] = []
+        self._keys: Dict[str, int] = {}
+        # band hash -> doc number, or a list of them once a second text lands in the bucket
+        self._buckets: Dict[int, object] = {}
+        self._pending: List[Tuple] = []
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS near_dup_docs (
+            space TEXT NOT NULL, doc_key TEXT NOT NULL, cluster_id TEXT NOT NULL, signature BLOB,
+            added_at REAL NOT NULL, PRIMARY KEY (space, doc_key))""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS near_dup_results (
+            cluster_id TEXT NOT NULL, kind TEXT NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL,
+            PRIMARY KEY (cluster_id, kind))""")
+        cutoff = time.time() - self.retention
+        self._db.execute("DELETE FROM near_dup_docs WHERE space = ? AND added_at < ?", (space, cutoff))
+        self._db.execute("DELETE FROM near_dup_results WHERE created_at < ?", (cutoff,))
+        self._db.commit()
+        for key, cluster_id, blob in self._db.execute(
+                "SELECT doc_key, cluster_id, signature FROM near_dup_docs WHERE space = ? ORDER BY added_at", (space,)):
+            self._remember(key, cluster_id, array("I", blob) if blob else None)
+
+    def __len__(self) -> int:
+        return len(self._cluster_of)
+
+    def _remember(self, key: str, cluster_id: str, sig: Optional[array]) -> int:
+        doc = len(self._cluster_of)
+        self._keys[key] = doc
+        self._cluster_of.append(cluster_id)
+        self._signatures.append(sig)
+        if sig is not None:
+            for band in _bands(sig):
+                bucket = self._buckets.get(band)
+                if bucket is None:
+                    self._buckets[band] = doc
+                elif isinstance(bucket, list):
+                    bucket.append(doc)
+                else:
+                    self._buckets[band] = [bucket, doc]
+        return doc
+
+    def _best_match(self, sig: array) -> Tuple[Optional[int], float]:
+        candidates = set()
+        for band in _bands(sig):
+            bucket = self._buckets.get(band)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                candidates.update(bucket)
+            else:
+                candidates.add(bucket)
+        self.stats["candidates"] += len(candidates)
+        best, best_sim = None, 0.0
+        for doc in candidates:
+            sim = similarity(sig, self._signatures[doc])
+            if sim > best_sim:
+                best, best_sim = doc, sim
+        return best, best_sim
+
+    def query(self, text: str) -> Optional[Assignment]:
+        """The cluster a text would join, without adding it; None when it would start a new one."""
+        sig = signature(text, self.shingle_words)
+        if sig is None:
+            return None
+        with self._lock:
+            doc, sim = self._best_match(sig)
+            if doc is None or sim < self.threshold:
+                return None
+            return Assignment(self._cluster_of[doc], sim, False)
+
+    def assign(self, key: str, text: str, commit: bool = True) -> Assignment:
+        """Adds a text under `key` (an article URL, a tweet's near_duplicate_key) and returns its cluster."""
+        sig = signature(text, self.shingle_words)
+        with self._lock:
+            self.stats["assigned"] += 1
+            known = self._keys.get(key)
+            if known is not None:
+                return Assignment(self._cluster_of[known], 1.0, False)
+            doc, sim = self._best_match(sig) if sig is not None else (None, 0.0)
+            if doc is not None and sim >= self.threshold:
+                result = Assignment(self._cluster_of[doc], sim, False)
+                self.stats["joined"] += 1
+            else:
+                result = Assignment(cluster_id_for(key), 0.0, True)
+                self.stats["new_clusters"] += 1
+            self._remember(key, result.cluster_id, sig)
+            self._pending.append((self.space, key, result.cluster_id, sig.tobytes() if sig is not None else None,
+                                  time.time()))
+        if commit:
+            self.commit()
+        return result
+
+    def assign_many(self, items: Sequence[Tuple[str, str]]) -> List[Assignment]:
+        """(key, text) pairs in order – a later copy in the same batch joins an earlier one."""
+        results = [self.assign(key, text, commit=False) for key, text in items]
+        self.commit()
+        return results
+
+    def commit(self):
+        with self._lock:
+            if not self._pending:
+                return
+            self._db.executemany("INSERT OR REPLACE INTO near_dup_docs VALUES (?, ?, ?, ?, ?)", self._pending)
+            self._db.commit()
+            self._pending = []
+
+    def results(self, cluster_ids: Sequence[str], kind: str) -> Dict[str, object]:
+        """Stored analysis results for the clusters that have one."""
+        found: Dict[str, object] = {}
+        unique = list(dict.fromkeys(cluster_ids))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT cluster_id, result FROM near_dup_results WHERE kind = ? "
+                    f"AND cluster_id IN ({','.join('?' * len(chunk))})", [kind, *chunk]).fetchall()
+                found.update((c, json.loads(r)) for c, r in rows)
+        return found
+
+    def put_results(self, kind: str, results: Dict[str, object]):
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO near_dup_results VALUES (?, ?, ?, ?)",
+                                 [(c, kind, json.dumps(r, ensure_ascii=False), now) for c, r in results.items()])
+            self._db.commit()
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['assigned']} texts, {s['joined']} joined an existing cluster, "
+                f"{s['new_clusters']} new clusters ({len(self)} texts indexed)")
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            self._db.close()
+
+
+_indexes: Dict[str, NearDuplicateIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_near_dup_index(space: str = "articles") -> Optional[NearDuplicateIndex]:
+    """
+    The process-wide index for a space ("articles" or "tweets" – separate clusters in the same
+    SQLite file), or None when SAFEGUARD_NEAR_DUP_INDEX=off.
+    """
+    if NEAR_DUP_PATH.lower() in ("off", "none", ""):
+        return None
+    with _indexes_lock:
+        index = _indexes.get(space)
+        if index is None:
+            index = _indexes[space] = NearDuplicateIndex(NEAR_DUP_PATH, space)
+        return index
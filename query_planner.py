@@ -0,0 +1,134 @@
+"""
+Packs the Twitter scan's keywords and locations into as few search queries as possible.
+
+The old scan sent one query per keyword, each repeating the same location clause and asking
+for 10 tweets. plan_queries() instead builds queries of the form
+
+    ("kill you" OR femicide OR ...) (nairobi OR mombasa OR ...) -is:retweet (lang:en OR lang:sw)
+
+filling each one up to the endpoint's maximum query length, and search_all() pages through
+every query with next_token. Which keywords a tweet actually contains is decided locally by
+KeywordMatcher, so a tweet can trigger several keywords and is fetched only once.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from keyword_matcher import KeywordMatcher
+
+# Recent search on the Basic/Free tiers accepts 512 characters (Pro: 4096)
+MAX_QUERY_LENGTH = 512
+
+
+@dataclass
+class QueryPlan:
+    query: str
+    keywords: List[str]
+    locations: List[str] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        return f"{self.keywords[0]} +{len(self.keywords) - 1}" if len(self.keywords) > 1 else self.keywords[0]
+
+
+def _term(term: str) -> str:
+    return f'"{term}"' if " " in term or "-" in term else term
+
+
+def _group(terms: Sequence[str]) -> str:
+    return terms[0] if len(terms) == 1 else "(" + " OR ".join(terms) + ")"
+
+
+def _pack(terms: Sequence[str], budget: int) -> List[List[str]]:
+    """Greedily splits terms into chunks whose OR-group fits in budget characters."""
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    for term in terms:
+        if current and len(_group(current + [term])) > budget:
+            chunks.append(current)
+            current = []
+        if len(_group([term])) > budget:
+            raise ValueError(f"search term too long for a {budget}-character query: {term}")
+        current.append(term)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def plan_queries(keywords: Sequence[str], locations: Sequence[str] = (), langs: Sequence[str] = ("en", "sw"),
+                 max_length: int = MAX_QUERY_LENGTH, exclude_retweets: bool = True) -> List[QueryPlan]:
+    """
+    Queries covering every keyword x location combination, each at most max_length characters.
+    Locations get at most half of what's left after the fixed operators, keywords the rest.
+    """
+    suffix_parts = []
+    if exclude_retweets:
+        suffix_parts.append("-is:retweet")
+    if langs:
+        suffix_parts.append(_group([f"lang:{lang}" for lang in langs]))
+    suffix = " ".join(suffix_parts)
+    budget = max_length - len(suffix) - 2  # spaces around the location group
+
+    location_chunks: List[List[str]] = [[]]
+    if locations:
+        location_chunks = _pack([_term(loc) for loc in locations], budget // 2)
+
+    plans = []
+    for location_terms in location_chunks:
+        location_clause = _group(location_terms) if location_terms else ""
+        keyword_budget = budget - len(location_clause)
+        quoted = {_term(k): k for k in keywords}
+        for chunk in _pack(list(quoted), keyword_budget):
+            query = " ".join(p for p in (_group(chunk), location_clause, suffix) if p)
+            plans.append(QueryPlan(query, [quoted[t] for t in chunk],
+                                   [t.strip('"') for t in location_terms]))
+    return plans
+
+
+class KeywordAttributor:
+    """Maps a tweet's text back to the search keywords it contains."""
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self.matcher = KeywordMatcher({k: [k] for k in keywords})
+
+    def match(self, text: str) -> List[str]:
+        found = self.matcher.scan(text).categories()
+        return [k for k in self.keywords if k in found]
+
+    def trigger(self, text: str, plan: Optional[QueryPlan] = None) -> str:
+        """The keyword_trigger value: matched keywords joined with " | "."""
+        matched = self.match(text)
+        if not matched and plan is not None:
+            # Twitter matched a form the local matcher doesn't see (e.g. inside a URL) –
+            # attribute the tweet to the keywords of the query that returned it
+            matched = plan.keywords
+        return " | ".join(matched)
+
+
+class SearchTruncated(Exception):
+    """search_all stopped at max_pages with more pages left – older matching tweets weren't fetched."""
+
+    def __init__(self, plan: QueryPlan, next_token: str):
+        super().__init__(f"{plan.label}: more than the allowed pages of results")
+        self.next_token = next_token
+
+
+def search_all(search: Callable, plan: QueryPlan, max_results: int = 100, max_pages: int = 3,
+               **search_args) -> Iterator:
+    """
+    Yields every tweet for one query, following next_token for up to max_pages pages.
+    `search` is tweepy.Client.search_recent_tweets or anything with the same signature.
+    Raises SearchTruncated after the last page when the API still had a next_token, so the
+    caller knows the tweets it got aren't all there are.
+    """
+    next_token = None
+    for _ in range(max_pages):
+        args: Dict = dict(search_args, query=plan.query, max_results=max_results)
+        if next_token:
+            args["next_token"] = next_token
+        response = search(**args)
+        yield from response.data or []
+        next_token = (response.meta or {}).get("next_token")
+        if not next_token:
+            return
+    raise SearchTruncated(plan, next_token)
@@ -0,0 +1,101 @@
+"""
+Request budgeting for the Twitter API.
+
+RateLimiter is a token bucket that each request draws from before it is sent. Until the API
+has told us anything it refills continuously at limit / window. Once a response carries the
+x-rate-limit-* headers the server's numbers win: the bucket never holds more than the server
+says is remaining and refills in one step at x-rate-limit-reset, which is how the v2
+endpoints' 15-minute windows actually behave. Every call is O(1).
+
+SearchScheduler runs searches on a small, long-lived thread pool. The limiter inside each
+request is the only thing that ever waits, so searches go out back to back while budget is
+left and sleep only when it is actually exhausted.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, Mapping, Optional, Tuple
+
+
+class RateLimiter:
+    def __init__(self, limit: int = 150, window_seconds: float = 900.0, safety_margin: int = 5,
+                 clock=time.time, sleep=time.sleep):
+        self.limit = limit
+        self.window = window_seconds
+        self.safety_margin = safety_margin
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+        # Set from the response headers: the server's window resets the bucket at this time
+        self.reset_at: Optional[float] = None
+        self.waited = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return max(1, self.limit - self.safety_margin)
+
+    def _refill(self, now: float):
+        if self.reset_at is not None:
+            if now >= self.reset_at:
+                self.tokens = float(self.capacity)
+                self.reset_at = None
+                self.updated = now
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.limit / self.window)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Takes a token and returns 0, or returns how long to wait before trying again."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            if self.reset_at is not None:
+                return max(0.0, self.reset_at - now) + 1.0
+            return (1 - self.tokens) * self.window / self.limit
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            self.waited += wait
+            self._sleep(wait)
+
+    def release(self, headers: Optional[Mapping[str, str]] = None):
+        """Called once per acquired request, with the response headers when there was a response."""
+        if not headers:
+            return
+        with self._lock:
+            headers = {k.lower(): v for k, v in headers.items()}
+            try:
+                remaining = int(headers["x-rate-limit-remaining"])
+                reset_at = float(headers["x-rate-limit-reset"])
+                limit = int(headers.get("x-rate-limit-limit", self.limit))
+            except (KeyError, ValueError):
+                return
+            self.limit = limit
+            # Our own count already covers requests in flight; the server's can only be lower if
+            # something else (another process, the same token elsewhere) spends the budget too
+            self.tokens = float(max(0, min(self.tokens, remaining - self.safety_margin)))
+            self.reset_at = reset_at
+            self.updated = self._clock()
+
+
+class SearchScheduler:
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+
+    def run(self, search: Callable, queries: Iterable) -> Iterator[Tuple[object, object]]:
+        """Yields (query, search(query)) pairs as the searches complete."""
+        futures = {self._pool.submit(search, query): query for query in queries}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,235 @@
+"""
+Record and replay for offline runs: every HTTP response the crawlers get – homepages, feeds,
+HEADs, articles, Twitter search pages – saved to a fixture directory, then served from there
+instead of the network.
+
+    SAFEGUARD_RECORD_DIR=fixtures/oct18 python WebCrawler_V1.py         # a normal crawl, responses kept
+    SAFEGUARD_REPLAY_DIR=fixtures/oct18 python benchmarks/bench_replay.py run
+
+Recording happens at the transport, so the crawlers run unchanged: fetcher.build_session() and
+the Twitter client's session get a RecordingAdapter in front of the real one. Homepages that
+headless Chrome renders never pass through requests – HomepageLoader saves their page source
+with record_page() and takes it back from replayed_page(). In replay the same sessions get a
+ReplayAdapter; a request without a fixture fails like a refused connection, so a replay
+exercises the same error paths a crawl with a dead site does.
+
+Fixtures are keyed by method and URL – query parameters sorted, since_id dropped (the Twitter
+checkpoint of a replay isn't the recording's). Each is a JSON file with the status, response
+headers and recorded latency, next to the body as received after decompression. Request
+headers, the Twitter bearer token among them, are never written. SAFEGUARD_REPLAY_LATENCY
+scales the recorded latencies on replay: 0 (default) answers at once, 1 replays the network
+time as recorded.
+
+    SAFEGUARD_RECORD_DIR=
+    SAFEGUARD_REPLAY_DIR=
+    SAFEGUARD_REPLAY_LATENCY=0
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+RECORD_DIR = os.getenv("SAFEGUARD_RECORD_DIR", "")
+REPLAY_DIR = os.getenv("SAFEGUARD_REPLAY_DIR", "")
+REPLAY_LATENCY = float(os.getenv("SAFEGUARD_REPLAY_LATENCY", "0"))
+
+# Left out of fixture keys: they differ between the recording and a replay of it
+VOLATILE_PARAMS = {"since_id"}
+# Not kept with the fixture – the body is stored decoded, and cookies don't belong in a fixture
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "set-cookie", "connection"}
+
+
+def fixture_key(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS)
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+    return hashlib.sha1(f"{method.upper()} {normalized}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Fixture:
+    method: str
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    elapsed: float = 0.0
+
+
+class FixtureStore:
+    """A fixture directory: http/<key>.json + http/<key>.body per response, pages/<key>.html per rendered page."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "http"), exist_ok=True)
+        os.makedirs(os.path.join(root, "pages"), exist_ok=True)
+
+    def _path(self, kind: str, key: str, ext: str) -> str:
+        return os.path.join(self.root, kind, key + ext)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        # Written next to the target and renamed, so a crash never leaves half a fixture
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def save(self, fixture: Fixture):
+        key = fixture_key(fixture.method, fixture.url)
+        headers = {k: v for k, v in fixture.headers.items() if k.lower() not in DROPPED_HEADERS}
+        meta = {"method": fixture.method.upper(), "url": fixture.url, "status": fixture.status, "headers": headers,
+                "elapsed": round(fixture.elapsed, 4), "recorded_at": time.time()}
+        self._write(self._path("http", key, ".body"), fixture.body)
+        self._write(self._path("http", key, ".json"), json.dumps(meta, ensure_ascii=False, indent=1).encode("utf-8"))
+        self._count("recorded")
+
+    def load(self, method: str, url: str) -> Optional[Fixture]:
+        key = fixture_key(method, url)
+        try:
+            with open(self._path("http", key, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._path("http", key, ".body"), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return Fixture(meta["method"], url, meta["status"], meta["headers"], body, meta.get("elapsed", 0.0))
+
+    def save_page(self, url: str, html: str):
+        self._write(self._path("pages", fixture_key("RENDER", url), ".html"), html.encode("utf-8"))
+        self._count("pages_recorded")
+
+    def load_page(self, url: str) -> Optional[str]:
+        try:
+            with open(self._path("pages", fixture_key("RENDER", url), ".html"), encoding="utf-8") as f:
+                html = f.read()
+        except FileNotFoundError:
+            self._count("page_misses")
+            return None
+        self._count("page_hits")
+        return html
+
+    def __len__(self) -> int:
+        return sum(name.endswith(".json") for name in os.listdir(os.path.join(self.root, "http")))
+
+
+class RecordingAdapter(HTTPAdapter):
+    """The usual transport, saving every response it gets to the store."""
+
+    def __init__(self, store: FixtureStore, **adapter_args):
+        super().__init__(**adapter_args)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        resp = super().send(request, **kwargs)
+        # Reads the whole body (requests keeps it for the caller, streamed or not)
+        body = resp.content if request.method != "HEAD" else b""
+        self.store.save(Fixture(request.method, request.url, resp.status_code, dict(resp.headers), body,
+                                time.perf_counter() - start))
+        return resp
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers every request from the store, after latency x the recorded time."""
+
+    def __init__(self, store: FixtureStore, latency: float = REPLAY_LATENCY):
+        super().__init__()
+        self.store = store
+        self.latency = latency
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        fixture = self.store.load(request.method, request.url)
+        if fixture is None:
+            raise requests.ConnectionError(f"no recorded response for {request.method} {request.url}",
+                                           request=request)
+        if self.latency and fixture.elapsed:
+            time.sleep(fixture.elapsed * self.latency)
+        resp = requests.Response()
+        resp.status_code = fixture.status
+        resp.headers = CaseInsensitiveDict(fixture.headers)
+        resp.headers["Content-Length"] = str(len(fixture.body))
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.raw = io.BytesIO(fixture.body)
+        resp._content = fixture.body
+        resp._content_consumed = True
+        resp.url = request.url
+        resp.request = request
+        resp.reason = "Replayed"
+        resp.elapsed = timedelta(seconds=fixture.elapsed)
+        return resp
+
+    def close(self):
+        pass
+
+
+_store: Optional[FixtureStore] = None
+_store_lock = threading.Lock()
+
+
+def mode() -> Optional[str]:
+    """"replay", "record", or None when neither SAFEGUARD_REPLAY_DIR nor SAFEGUARD_RECORD_DIR is set."""
+    return "replay" if REPLAY_DIR else "record" if RECORD_DIR else None
+
+
+def get_store() -> Optional[FixtureStore]:
+    """The process-wide fixture store, or None outside record and replay."""
+    global _store
+    if mode() is None:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = FixtureStore(REPLAY_DIR or RECORD_DIR)
+        return _store
+
+
+def install(session: requests.Session) -> requests.Session:
+    """Puts the recording or replaying transport on a session (a no-op outside record and replay)."""
+    store = get_store()
+    if store is None:
+        return session
+    if mode() == "replay":
+        adapter = ReplayAdapter(store)
+    else:
+        # Same pool sizes and retries as the transport it replaces
+        current = session.get_adapter("https://")
+        adapter = RecordingAdapter(store, pool_connections=getattr(current, "_pool_connections", 10),
+                                   pool_maxsize=getattr(current, "_pool_maxsize", 10),
+                                   max_retries=getattr(current, "max_retries", 0))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def replayed_page(url: str) -> str:
+    """A recorded browser-rendered page; raises LookupError when there is none."""
+    html = get_store().load_page(url)
+    if html is None:
+        raise LookupError(f"no recorded page for {url}")
+    return html
+
+
+def record_page(url: str, html: str):
+    """Saves a browser-rendered page while recording; does nothing otherwise."""
+    if mode() == "record":
+        get_store().save_page(url, html)
@@ -0,0 +1,207 @@
+"""
+Long-running SafeGuard service: news crawls and Twitter scans on their own schedules, in one
+process, on one asyncio event loop.
+
+    python safeguard_service.py                          # both jobs
+    python safeguard_service.py --jobs twitter --twitter-every 15
+    python safeguard_service.py --news-every 120 --max-articles 20
+
+Everything expensive is built once and kept for the life of the service: the Twitter scanner
+(its tweepy client, rate-limit state, checkpoint and Supabase writer), the news crawler's
+keep-alive HTTP session, site schedule and Supabase writer, and the NLP engine and analysis
+cache. Each job runs in a worker thread, so a long news crawl and a Twitter scan overlap instead
+of waiting for each other; a job that is still running when its next slot comes round skips
+that slot.
+
+SIGINT/SIGTERM stop scheduling, give running jobs --shutdown-timeout seconds to finish, then
+flush and close every writer so buffered rows reach Supabase (or the spool). A job still running
+after the timeout is only flushed – its writer, scheduler and session are still in use.
+"""
+import argparse
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Optional
+
+
+class Job:
+    def __init__(self, name: str, every_minutes: float, run: Callable[[], None],
+                 close: Optional[Callable[[], None]] = None, flush: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.interval = every_minutes * 60
+        self.run = run
+        self.close = close
+        # Safe to call while run() is going – what shutdown does instead of close() for a job that won't stop
+        self.flush = flush
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.running = False
+
+
+class SafeguardService:
+    def __init__(self, jobs: List[Job], shutdown_timeout: float = 300.0):
+        self.jobs = jobs
+        self.shutdown_timeout = shutdown_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(jobs)), thread_name_prefix="job")
+        self._stop: Optional[asyncio.Event] = None
+        self._in_flight: List[asyncio.Future] = []
+
+    def stop(self):
+        if self._stop is not None and not self._stop.is_set():
+            print("\nStopping – waiting for running jobs to finish...")
+            self._stop.set()
+
+    async def _run_once(self, job: Job):
+        loop = asyncio.get_running_loop()
+        job.running = True
+        started = time.monotonic()
+        print(f"[{job.name}] starting at {datetime.now():%Y-%m-%d %H:%M:%S}")
+        try:
+            await loop.run_in_executor(self._pool, job.run)
+            job.runs += 1
+            print(f"[{job.name}] finished in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            job.failures += 1
+            print(f"[{job.name}] failed after {time.monotonic() - started:.1f}s: {e!r}")
+        finally:
+            job.running = False
+
+    async def _schedule(self, job: Job):
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            if job.running:
+                job.skipped += 1
+                print(f"[{job.name}] previous run still going – skipping this slot")
+            else:
+                task = asyncio.ensure_future(self._run_once(job))
+                self._in_flight.append(task)
+                task.add_done_callback(self._in_flight.remove)
+            next_run += job.interval
+            # Slots missed while a run overran are dropped, not made up in a burst
+            while next_run <= time.monotonic():
+                next_run += job.interval
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=next_run - time.monotonic())
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+        try:
+            await asyncio.gather(*(self._schedule(job) for job in self.jobs))
+        finally:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        if self._in_flight:
+            _, pending = await asyncio.wait(list(self._in_flight), timeout=self.shutdown_timeout)
+            if pending:
+                print(f"{len(pending)} job(s) still running after {self.shutdown_timeout:.0f}s – flushing anyway.")
+        loop = asyncio.get_running_loop()
+        for job in self.jobs:
+            # `running` stays set until the job's thread returns – the jobs still in `pending` above
+            finish = job.flush if job.running else job.close
+            if job.running:
+                print(f"[{job.name}] still running – flushing its writer, not closing anything")
+            if finish is not None:
+                try:
+                    await loop.run_in_executor(None, finish)
+                except Exception as e:
+                    print(f"[{job.name}] {'flush' if job.running else 'close'} failed: {e!r}")
+            print(f"[{job.name}] runs={job.runs} failures={job.failures} skipped={job.skipped}")
+        self._pool.shutdown(wait=False)
+
+
+# -------------------------- Jobs --------------------------
+def news_job(every_minutes: float, max_articles: int = 10) -> Job:
+    import WebCrawler_V1 as crawler
+    from bulk_writer import BulkWriter, SupabaseTransport
+    from fetcher import build_session
+    from metrics import new_run
+    from sinks import ARTICLE_COLUMNS, CsvSink, PartitionedSink
+    from site_scheduler import get_site_scheduler
+
+    session = build_session(pool_maxsize=16)
+    scheduler = get_site_scheduler()
+    writer = None
+    if crawler.supabase is not None:
+        writer = BulkWriter(SupabaseTransport(crawler.supabase), "scraped_articles", on_conflict="article_url",
+                            columns=ARTICLE_COLUMNS, batch_size=50)
+
+    class KeepOpen:
+        """run_crawl closes its sinks at the end of a crawl – the shared writer only flushes."""
+
+        def write(self, record):
+            writer.write(record)
+
+        def close(self):
+            writer.flush()
+
+    def run():
+        metrics = new_run(crawler.METRICS_JOB)
+        # The same local copies as a one-off crawl: the CSV and the date-partitioned archive
+        sinks = [CsvSink("scraped_articles.csv"), PartitionedSink()]
+        if writer is not None:
+            writer.metrics = metrics
+            sinks.append(KeepOpen())
+        crawler.run_crawl(sinks, scheduler=scheduler, max_articles=max_articles, session=session)
+
+    def close():
+        if writer is not None:
+            writer.close()
+        if scheduler is not None:
+            scheduler.close()
+        session.close()
+
+    return Job("news", every_minutes, run, close, flush=writer.flush if writer is not None else None)
+
+
+def twitter_job(every_minutes: float) -> Job:
+    import twitter_crawler
+
+    scanner = twitter_crawler.SafeGuardScanner()
+
+    def flush():
+        if scanner.db.writer is not None:
+            scanner.db.writer.flush()
+
+    return Job("twitter", every_minutes, lambda: twitter_crawler.run_scan(scanner), scanner.close, flush)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--jobs", default="news,twitter", help="comma-separated: news, twitter")
+    ap.add_argument("--news-every", type=float, default=60, help="minutes between news crawls")
+    ap.add_argument("--twitter-every", type=float, default=15, help="minutes between Twitter scans")
+    ap.add_argument("--max-articles", type=int, default=10,
+                    help="article links per site (the site scheduler's starting point and average)")
+    ap.add_argument("--shutdown-timeout", type=float, default=300, help="seconds to wait for running jobs")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.jobs.split(",") if n.strip()]
+    jobs = []
+    if "news" in names:
+        jobs.append(news_job(args.news_every, args.max_articles))
+    if "twitter" in names:
+        jobs.append(twitter_job(args.twitter_every))
+    if not jobs:
+        ap.error("no jobs selected")
+
+    service = SafeguardService(jobs, shutdown_timeout=args.shutdown_timeout)
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
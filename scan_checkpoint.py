@@ -0,0 +1,165 @@
+"""
+Incremental Twitter scans: a per-query since_id checkpoint plus a small in-process memory of
+tweets already handled.
+
+QueryCheckpoint keeps, for every search query, the newest tweet id and time seen so far, in a
+JSON file that is replaced atomically on each save. The next scan passes that id as since_id,
+so the API only returns tweets posted after it. A query whose checkpoint is missing (first run,
+keywords edited, file deleted or unreadable) just searches the full recent window again; a
+checkpoint older than the 7-day recent-search window is dropped, since the API rejects such
+since_ids.
+
+A search that comes back incomplete (more pages than a scan may fetch, or a page that failed)
+still moves the checkpoint to its newest tweet, and records the range it didn't reach – older
+than the oldest tweet it got, newer than the old since_id – as a gap. Every later scan also
+searches each gap with since_id/until_id, newest first, so the gap shrinks page by page until a
+search of it completes. Gaps that slide out of the recent-search window are dropped.
+
+RecentHashes is an LRU of tweet_hash values, catching the same tweet coming back from two
+queries or from a scan whose checkpoint wasn't saved.
+
+    SAFEGUARD_TWITTER_CHECKPOINT=twitter_checkpoint.json
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CHECKPOINT_PATH = os.getenv("SAFEGUARD_TWITTER_CHECKPOINT", "twitter_checkpoint.json")
+
+# Recent search only reaches back 7 days; stay a little inside that
+MAX_CHECKPOINT_AGE = timedelta(days=6, hours=12)
+
+
+# (since_id, until_id) for one search of a query; until_id is None for the search of new tweets
+Window = Tuple[Optional[str], Optional[str]]
+
+
+def _as_utc(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class QueryCheckpoint:
+    def __init__(self, path: str = CHECKPOINT_PATH, clock=lambda: datetime.now(timezone.utc)):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("not a JSON object")
+            return data
+        except (OSError, ValueError) as e:
+            # Keep the damaged file for a look, and fall back to full-window searches
+            print(f"Twitter checkpoint {self.path} unreadable ({e}); starting from scratch.")
+            try:
+                os.replace(self.path, self.path + ".corrupt")
+            except OSError:
+                pass
+            return {}
+
+    def _expired(self, at) -> bool:
+        at = _as_utc(at)
+        return at is not None and self._clock() - at > MAX_CHECKPOINT_AGE
+
+    def since_id(self, query: str) -> Optional[str]:
+        with self._lock:
+            entry = self.entries.get(query)
+        if not entry or self._expired(entry.get("newest_at")):
+            return None
+        return entry.get("newest_id")
+
+    def windows(self, query: str) -> List[Window]:
+        """The searches a scan of this query should run: new tweets first, then each open gap."""
+        with self._lock:
+            gaps = list(self.entries.get(query, {}).get("gaps", []))
+        windows = [(self.since_id(query), None)]
+        for gap in gaps:
+            if self._expired(gap["until_at"]):
+                continue
+            since_id = None if self._expired(gap.get("since_at")) else gap.get("since_id")
+            windows.append((since_id, gap["until_id"]))
+        return windows
+
+    def advance(self, query: str, tweets: Iterable, complete: bool = True, window: Window = (None, None)):
+        """
+        Records a search of one window of the query. The checkpoint moves to the newest of these
+        tweets (never backwards); an incomplete search leaves a gap below the oldest of them, or
+        narrows the gap it was searching. A complete search of a gap closes it.
+        """
+        tweets = list(tweets)
+        since_id, until_id = window
+        oldest = min(tweets, key=lambda t: int(t.id), default=None)
+        with self._lock:
+            entry = self.entries.get(query, {})
+            gaps = [g for g in entry.get("gaps", []) if not self._expired(g["until_at"])]
+            if until_id is None:
+                newest = max(tweets, key=lambda t: int(t.id), default=None)
+                if newest is not None and int(newest.id) > int(entry.get("newest_id") or 0):
+                    entry = {"newest_id": str(newest.id), "newest_at": self._created_at(newest)}
+                if not complete and oldest is not None:
+                    old = self.entries.get(query, {})
+                    gaps.append({"since_id": since_id, "since_at": old.get("newest_at") if since_id else None,
+                                 "until_id": str(oldest.id), "until_at": self._created_at(oldest)})
+            else:
+                for gap in gaps:
+                    if gap["until_id"] == until_id:
+                        if complete:
+                            gaps.remove(gap)
+                        elif oldest is not None:
+                            gap.update(until_id=str(oldest.id), until_at=self._created_at(oldest))
+                        break
+            if gaps:
+                entry["gaps"] = gaps
+            else:
+                entry.pop("gaps", None)
+            entry["scanned_at"] = self._clock().isoformat()
+            self.entries[query] = entry
+
+    def _created_at(self, tweet) -> str:
+        return (_as_utc(getattr(tweet, "created_at", None)) or self._clock()).isoformat()
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.entries, indent=2, ensure_ascii=False)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+class RecentHashes:
+    """Bounded set of recently processed tweet hashes, oldest evicted first."""
+
+    def __init__(self, maxsize: int = 50_000):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key: str) -> bool:
+        """Records key; returns False if it was already there."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return False
+            self._items[key] = None
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            return True
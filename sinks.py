@@ -0,0 +1,250 @@
+"""
+Record sinks for the streaming crawl: each record is written as soon as it's ready.
+
+CsvSink and JsonlSink append to local files (a header is written only when the CSV is new; an
+existing CSV keeps its own columns, so a column added later doesn't shift old rows).
+Database writes go through bulk_writer.BulkWriter, which has the same write/close interface.
+
+PartitionedSink keeps a columnar local archive, one directory per publish day (or month):
+
+    archive/day=2025-11-04/part-20251104T0600-4242-00000.parquet
+    archive/month=2025-11/...                      (partition="month")
+    archive/day=unknown/...                        (no publish date)
+
+Each flush adds new part files – nothing already written is rewritten – and at most
+rows_per_file records are held in memory. Formats: parquet (default) and arrow (Arrow IPC /
+Feather v2) need pyarrow; without it the sink falls back to jsonl part files. iter_archive
+reads an archive back, skipping partitions outside since/until. A daily crawl touches a day or
+two; month partitions suit bulk exports of old rows, which would otherwise scatter into a
+small file per day on every flush.
+
+    SAFEGUARD_ARCHIVE_DIR=archive
+    SAFEGUARD_ARCHIVE_FORMAT=parquet        # parquet | arrow | jsonl
+    SAFEGUARD_ARCHIVE_PARTITION=day         # day | month
+"""
+import csv
+import importlib.util
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+ARTICLE_COLUMNS = ["site_url", "article_url", "title", "publish_date", "keyword_category",
+                   "summary_snippet", "full_text", "entities", "sentiment", "sentiment_score", "cluster_id"]
+
+ARCHIVE_DIR = os.getenv("SAFEGUARD_ARCHIVE_DIR", "archive")
+ARCHIVE_FORMATS = ("parquet", "arrow", "jsonl")
+ARCHIVE_FORMAT = os.getenv("SAFEGUARD_ARCHIVE_FORMAT", "parquet").lower()
+ARCHIVE_PARTITIONS = ("day", "month")
+ARCHIVE_PARTITION = os.getenv("SAFEGUARD_ARCHIVE_PARTITION", "day").lower()
+# Checked without importing – pyarrow is only loaded when a columnar file is written or read
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+_SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow", "jsonl": ".jsonl"}
+# Columns that aren't strings in the archive
+_ARROW_TYPES = {"publish_date": "date32", "sentiment_score": "float64", "id": "int64"}
+UNKNOWN_DAY = "unknown"
+
+
+def to_row(record: Dict, columns: Optional[List[str]] = None) -> Dict:
+    """JSON-safe copy of a record: dates become ISO strings, columns are restricted if given."""
+    keys = columns or list(record)
+    row = {}
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, date):
+            value = value.strftime("%Y-%m-%d")
+        row[key] = value
+    return row
+
+
+class CsvSink:
+    def __init__(self, path: str, columns: List[str] = ARTICLE_COLUMNS):
+        self.path = path
+        self.columns = columns
+        self.count = 0
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            with open(path, newline="", encoding="utf-8") as f:
+                self.columns = next(csv.reader(f), None) or columns
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction="ignore")
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, record: Dict):
+        self._writer.writerow(to_row(record, self.columns))
+        # Flushing per record – a crash mid-crawl keeps everything written so far
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink:
+    def __init__(self, path: str, columns: Optional[List[str]] = None):
+        self.path = path
+        self.columns = columns
+        self.count = 0
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(to_row(record, self.columns), ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _day(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def _arrow_table(rows: List[Dict], columns: List[str]):
+    import pyarrow as pa
+
+    arrays, fields = [], []
+    for column in columns:
+        kind = _ARROW_TYPES.get(column, "string")
+        values = [row.get(column) for row in rows]
+        if kind == "date32":
+            values = [_day(v) for v in values]
+        elif kind == "float64":
+            values = [float(v) if isinstance(v, (int, float)) else None for v in values]
+        elif kind == "int64":
+            values = [int(v) if isinstance(v, (int, float)) else None for v in values]
+        else:
+            values = [v if v is None or isinstance(v, str) else json.dumps(v, ensure_ascii=False)
+                      for v in values]
+        fields.append(pa.field(column, getattr(pa, kind)()))
+        arrays.append(pa.array(values, type=fields[-1].type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+class PartitionedSink:
+    def __init__(self, root: str = ARCHIVE_DIR, fmt: str = ARCHIVE_FORMAT, columns: List[str] = ARTICLE_COLUMNS,
+                 rows_per_file: int = 5000, date_column: str = "publish_date", partition: str = ARCHIVE_PARTITION):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"unknown archive format {fmt!r} (expected one of {', '.join(ARCHIVE_FORMATS)})")
+        if partition not in ARCHIVE_PARTITIONS:
+            raise ValueError(f"unknown archive partition {partition!r} (expected day or month)")
+        if fmt != "jsonl" and not PYARROW_AVAILABLE:
+            print(f"pyarrow not installed – archiving to {root} as jsonl instead of {fmt}.")
+            fmt = "jsonl"
+        self.root = root
+        self.fmt = fmt
+        self.columns = columns
+        self.rows_per_file = rows_per_file
+        self.date_column = date_column
+        self.partition = partition
+        self.count = 0
+        self.files: List[str] = []
+        self._run = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self._buffers: Dict[str, List[Dict]] = {}
+        self._buffered = 0
+
+    def write(self, record: Dict):
+        row = to_row(record, self.columns)
+        day = _day(record.get(self.date_column))
+        if day is None:
+            key = UNKNOWN_DAY
+        else:
+            key = day.isoformat() if self.partition == "day" else day.strftime("%Y-%m")
+        self._buffers.setdefault(key, []).append(row)
+        self._buffered += 1
+        self.count += 1
+        if self._buffered >= self.rows_per_file:
+            self.flush()
+
+    def flush(self):
+        for key, rows in self._buffers.items():
+            self._write_part(key, rows)
+        self._buffers.clear()
+        self._buffered = 0
+
+    def _write_part(self, key: str, rows: List[Dict]):
+        folder = os.path.join(self.root, f"{self.partition}={key}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"part-{self._run}-{len(self.files):05d}{_SUFFIXES[self.fmt]}")
+        tmp = path + ".tmp"
+        if self.fmt == "jsonl":
+            with open(tmp, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        elif self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(_arrow_table(rows, self.columns), tmp, compression="zstd")
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(_arrow_table(rows, self.columns), tmp, compression="zstd")
+        # Readers only ever see whole part files
+        os.replace(tmp, path)
+        self.files.append(path)
+
+    def close(self):
+        self.flush()
+
+
+def _read_part(path: str, columns: Optional[List[str]], batch_size: int) -> Iterator[Dict]:
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                yield {c: row.get(c) for c in columns} if columns else row
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield from batch.to_pylist()
+    elif path.endswith(".arrow"):
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield from (batch.select(columns) if columns else batch).to_pylist()
+
+
+def iter_archive(root: str = ARCHIVE_DIR, columns: Optional[List[str]] = None, since: Optional[date] = None,
+                 until: Optional[date] = None, batch_size: int = 5000) -> Iterator[Dict]:
+    """
+    Rows of a PartitionedSink archive, partition by partition, reading batch_size rows at a time.
+    since/until prune whole partitions; in a month partition they're checked per row too (which
+    needs publish_date among the columns read).
+    """
+    if not os.path.isdir(root):
+        return
+    for name in sorted(os.listdir(root)):
+        partition, _, key = name.partition("=")
+        if partition not in ARCHIVE_PARTITIONS:
+            continue
+        per_row = False
+        if since or until:
+            first = _day(key if partition == "day" else key + "-01")
+            if first is None:
+                continue
+            last = first if partition == "day" else \
+                date(first.year + first.month // 12, first.month % 12 + 1, 1) - timedelta(days=1)
+            if (since and last < since) or (until and first > until):
+                continue
+            per_row = partition == "month"
+        folder = os.path.join(root, name)
+        for part in sorted(os.listdir(folder)):
+            for row in _read_part(os.path.join(folder, part), columns, batch_size):
+                if per_row and "publish_date" in row:
+                    day = _day(row["publish_date"])
+                    if day is None or (since and day < since) or (until and day > until):
+                        continue
+                yield row
@@ -0,0 +1,388 @@
+"""
+Per-site crawl scheduling from what earlier visits to each site produced.
+
+Every crawl records, per site, a visit: the link budget it was given, how many articles it
+downloaded, how many of them were saved and how many were relevant (passed the age, length and
+category checks – keyword_category other than "Other"), and the seconds spent loading its
+homepage and downloading. plan() turns the last HISTORY_VISITS visits into the next run's
+schedule:
+
+    backoff   a site whose last visits were all empty waits backoff_hours after the first,
+              then twice as long after each further one (up to max_backoff_hours); one
+              relevant article resets it. Visits whose homepage failed don't say anything
+              about yield and are passed over – but a run of failures backs off the same way
+    budgets   enough links for what the site has published since the last visit (its new
+              links per hour × hours since, with a margin – and more after a visit that used
+              its whole budget), scaled down for sites whose relevant-per-download rate is
+              under half the average of the sites due; the rate is smoothed towards the rate across
+              all sites so a few visits don't swing it. Between MIN_LINKS and twice max_articles;
+              sites with fewer than two visits get max_articles
+    time      with run_budget_seconds, sites are picked by expected relevant articles per
+              second (homepage + budget × seconds per download, at most) until the sum
+              reaches the budget; the rest wait for the next run. Sites never visited, or not
+              visited for max_backoff_hours, go first
+
+Visits are only recorded for runs that finish. The history lives in SQLite, like the crawl state.
+
+    SAFEGUARD_SITE_SCHEDULE=site_schedule.sqlite   ("off" crawls every site every run)
+    SAFEGUARD_RUN_BUDGET_SECONDS=0                 (0 = no time budget)
+    SAFEGUARD_BACKOFF_HOURS=1
+    SAFEGUARD_MAX_BACKOFF_HOURS=48
+
+    python site_scheduler.py                        # per-site history and the next run's plan
+    python site_scheduler.py --dry-run --runs 48 --every 60 --budget 600
+"""
+import argparse
+import copy
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass, field, fields
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+SCHEDULE_PATH = os.getenv("SAFEGUARD_SITE_SCHEDULE", "site_schedule.sqlite")
+RUN_BUDGET_SECONDS = float(os.getenv("SAFEGUARD_RUN_BUDGET_SECONDS", "0"))
+BACKOFF_HOURS = float(os.getenv("SAFEGUARD_BACKOFF_HOURS", "1"))
+MAX_BACKOFF_HOURS = float(os.getenv("SAFEGUARD_MAX_BACKOFF_HOURS", "48"))
+
+HISTORY_VISITS = 20
+MIN_LINKS = 2
+# How many downloads' worth of weight the all-sites rate gets in a site's own rate
+PRIOR_LINKS = 10
+# Budget headroom over the expected new links
+LINK_MARGIN = 1.25
+# Runs start on a fixed interval, so a site due "in an hour" is due at the run an hour later
+DUE_SLACK = 0.1
+# Costs assumed for a site without history
+DEFAULT_HOMEPAGE_SECONDS = 5.0
+DEFAULT_LINK_SECONDS = 2.0
+
+
+@dataclass
+class Visit:
+    site: str
+    started_at: float
+    budget: int
+    links: int = 0
+    downloaded: int = 0
+    saved: int = 0
+    relevant: int = 0
+    homepage_s: float = 0.0
+    download_s: float = 0.0
+    errors: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return self.homepage_s + self.download_s
+
+
+_VISIT_FIELDS = [f.name for f in fields(Visit)]
+_COUNTABLE = set(_VISIT_FIELDS) - {"site", "started_at", "budget"}
+
+
+@dataclass
+class SiteStats:
+    visits: int = 0
+    downloaded: int = 0
+    relevant: int = 0
+    empty_streak: int = 0
+    failure_streak: int = 0
+    last_visit: Optional[float] = None
+    links_per_hour: Optional[float] = None  # new links published, from the downloads between visits
+    saturated: bool = False  # the last visit downloaded its whole budget – there may have been more
+    last_budget: int = 0
+    homepage_s: float = DEFAULT_HOMEPAGE_SECONDS
+    link_s: float = DEFAULT_LINK_SECONDS
+
+
+@dataclass
+class SchedulePlan:
+    sites: List[str] = field(default_factory=list)
+    budgets: Dict[str, int] = field(default_factory=dict)
+    deferred: Dict[str, str] = field(default_factory=dict)  # site -> "backoff" / "budget"
+    next_due: Dict[str, float] = field(default_factory=dict)
+    expected_relevant: Dict[str, float] = field(default_factory=dict)
+    expected_seconds: Dict[str, float] = field(default_factory=dict)
+
+
+class SiteScheduler:
+    def __init__(self, path: Optional[str] = SCHEDULE_PATH, run_budget_seconds: float = RUN_BUDGET_SECONDS,
+                 backoff_hours: float = BACKOFF_HOURS, max_backoff_hours: float = MAX_BACKOFF_HOURS,
+                 history_visits: int = HISTORY_VISITS, clock=time.time):
+        self.run_budget_seconds = run_budget_seconds
+        self.backoff = backoff_hours * 3600
+        self.max_backoff = max_backoff_hours * 3600
+        self.history_visits = history_visits
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.history: Dict[str, List[Visit]] = {}
+        self._visits: Dict[str, Visit] = {}
+        self._db = None
+        if path is None:
+            return  # in memory only (dry runs, benchmarks)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS site_visits (
+            site TEXT NOT NULL, started_at REAL NOT NULL, budget INTEGER, links INTEGER, downloaded INTEGER,
+            saved INTEGER, relevant INTEGER, homepage_s REAL, download_s REAL, errors INTEGER)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS site_visits_site ON site_visits (site, started_at)")
+        for row in self._db.execute(f"SELECT {', '.join(_VISIT_FIELDS)} FROM site_visits ORDER BY started_at"):
+            self._remember(Visit(*row))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, visit: Visit):
+        visits = self.history.setdefault(visit.site, [])
+        visits.append(visit)
+        del visits[:-self.history_visits]
+
+    # -------------------------- Planning --------------------------
+    def stats(self, site: str) -> SiteStats:
+        visits = self.history.get(site, [])
+        s = SiteStats(visits=len(visits))
+        if not visits:
+            return s
+        s.downloaded = sum(v.downloaded for v in visits)
+        s.relevant = sum(v.relevant for v in visits)
+        s.last_visit = visits[-1].started_at
+        s.last_budget = visits[-1].budget
+        s.saturated = visits[-1].downloaded >= visits[-1].budget > 0
+        # Visits that used up their budget only give a lower bound – left out while there are others
+        pairs = list(zip(visits, visits[1:]))
+        pairs = [(a, b) for a, b in pairs if b.downloaded < b.budget] or pairs
+        hours = sum(b.started_at - a.started_at for a, b in pairs) / 3600
+        if hours > 0:
+            s.links_per_hour = sum(b.downloaded for _, b in pairs) / hours
+        for v in reversed(visits):
+            if v.relevant:
+                break
+            if v.errors and not v.links:
+                if not s.empty_streak:  # failures since the last visit that loaded
+                    s.failure_streak += 1
+                continue
+            s.empty_streak += 1
+        loaded = [v.homepage_s for v in visits if v.homepage_s]
+        if loaded:
+            s.homepage_s = sum(loaded) / len(loaded)
+        if s.downloaded:
+            s.link_s = sum(v.download_s for v in visits) / s.downloaded
+        return s
+
+    def next_due(self, stats: SiteStats) -> float:
+        streak = max(stats.empty_streak, stats.failure_streak)
+        if stats.last_visit is None or not streak:
+            return 0.0
+        return stats.last_visit + min(self.max_backoff, self.backoff * 2 ** (streak - 1))
+
+    def prior_rate(self) -> float:
+        downloaded = sum(v.downloaded for visits in self.history.values() for v in visits)
+        relevant = sum(v.relevant for visits in self.history.values() for v in visits)
+        return (relevant + 1) / (downloaded + 2)
+
+    def plan(self, sites: Sequence[str], max_articles: int, min_link_seconds: float = 0.0) -> SchedulePlan:
+        """
+        Which of `sites` to crawl this run and how many links each gets. `min_link_seconds` is
+        the polite gap between two requests to one host – a download never costs less.
+        """
+        now = self._clock()
+        plan = SchedulePlan()
+        prior = self.prior_rate()
+        stats, rates, due = {}, {}, []
+        for site in dict.fromkeys(sites):
+            s = stats[site] = self.stats(site)
+            rates[site] = (s.relevant + PRIOR_LINKS * prior) / (s.downloaded + PRIOR_LINKS)
+            due_at = plan.next_due[site] = self.next_due(s)
+            if due_at and due_at - DUE_SLACK * (due_at - s.last_visit) > now:
+                plan.deferred[site] = "backoff"
+            else:
+                due.append(site)
+        if not due:
+            self._visits = {}
+            return plan
+
+        mean_rate = sum(rates[site] for site in due) / len(due)
+        for site in due:
+            s = stats[site]
+            if s.links_per_hour is None:
+                need = expected = max_articles
+            else:
+                expected = s.links_per_hour * (now - s.last_visit) / 3600
+                need = expected * LINK_MARGIN + 1
+                if s.saturated:
+                    need = max(need, 1.5 * s.last_budget)
+            need *= min(1.0, 2 * rates[site] / mean_rate)
+            budget = plan.budgets[site] = max(min(MIN_LINKS, max_articles), min(2 * max_articles, round(need)))
+            plan.expected_relevant[site] = min(budget, expected) * rates[site]
+            # What the whole budget would cost, so a backlog can't push the run over
+            plan.expected_seconds[site] = s.homepage_s + budget * max(s.link_s, min_link_seconds)
+
+        def priority(site):
+            s = stats[site]
+            first = s.last_visit is None or now - s.last_visit >= self.max_backoff
+            return (not first, -plan.expected_relevant[site] / max(plan.expected_seconds[site], 1e-6))
+
+        spent = 0.0
+        for site in sorted(due, key=priority):
+            cost = plan.expected_seconds[site]
+            if self.run_budget_seconds and plan.sites and spent + cost > self.run_budget_seconds:
+                plan.deferred[site] = "budget"
+                del plan.budgets[site]
+                continue
+            plan.sites.append(site)
+            spent += cost
+        # Keep the caller's site order
+        order = {site: i for i, site in enumerate(sites)}
+        plan.sites.sort(key=order.get)
+        self._visits = {site: Visit(site, now, plan.budgets[site]) for site in plan.sites}
+        return plan
+
+    # -------------------------- Recording --------------------------
+    def add(self, site: str, **amounts):
+        """Adds to the current visit of a site, e.g. add(site, downloaded=1, download_s=0.8)."""
+        with self._lock:
+            visit = self._visits.get(site)
+            if visit is None:
+                return
+            for name, amount in amounts.items():
+                if name not in _COUNTABLE:
+                    raise ValueError(f"unknown visit field {name!r}")
+                setattr(visit, name, getattr(visit, name) + amount)
+
+    def finish(self) -> List[Visit]:
+        """Records the planned visits (call once the crawl has completed) and returns them."""
+        with self._lock:
+            visits, self._visits = list(self._visits.values()), {}
+            for visit in visits:
+                self._remember(visit)
+            if self._db is not None and visits:
+                self._db.executemany(f"INSERT INTO site_visits VALUES ({', '.join('?' * len(_VISIT_FIELDS))})",
+                                     [astuple(v) for v in visits])
+                self._db.commit()
+        return visits
+
+    def print_plan(self, plan: SchedulePlan):
+        print(f"\nSite schedule: crawling {len(plan.sites)} of {len(plan.sites) + len(plan.deferred)} sites, "
+              f"{sum(plan.budgets.values())} links, ~{sum(plan.expected_seconds[s] for s in plan.sites):.0f}s")
+        for site in plan.sites:
+            s = self.stats(site)
+            print(f"  {site}: {plan.budgets[site]} links, ~{plan.expected_relevant[site]:.1f} relevant "
+                  f"({s.relevant}/{s.downloaded} over {s.visits} visits)")
+        for site, reason in plan.deferred.items():
+            due = plan.next_due.get(site)
+            when = f" until {datetime.fromtimestamp(due):%Y-%m-%d %H:%M}" if reason == "backoff" and due else ""
+            s = self.stats(site)
+            print(f"  {site}: skipped ({reason}{when}, {s.empty_streak} empty / {s.failure_streak} failed visits)")
+
+
+def simulate(scheduler: SiteScheduler, sites: Sequence[str], runs: int, every_hours: float, max_articles: int,
+             min_link_seconds: float = 0.0, seed: int = 0) -> List[Dict]:
+    """
+    Dry run: plans `runs` crawls `every_hours` apart on a copy of the recorded history. Each
+    visit's outcome is drawn from one of the site's recorded visits – its relevant-per-download
+    rate applied to the new budget, and just as many downloads if that visit ran out of new
+    links. Sites without history are left out. Returns a summary per run, next to the same run
+    with every site at max_articles.
+    """
+    rng = random.Random(seed)
+    sim = SiteScheduler(None, scheduler.run_budget_seconds, scheduler.backoff / 3600,
+                        scheduler.max_backoff / 3600, scheduler.history_visits)
+    sim.history = copy.deepcopy(scheduler.history)
+    sites = [site for site in sites if sim.history.get(site)]
+    start = max((v[-1].started_at for v in sim.history.values() if v), default=time.time())
+    clock = [start]
+    sim._clock = lambda: clock[0]
+
+    def outcome(site, budget):
+        past = rng.choice(scheduler.history[site])
+        if not past.downloaded:
+            return Visit(site, clock[0], budget, homepage_s=past.homepage_s, errors=past.errors)
+        downloaded = budget if past.downloaded >= past.budget else min(budget, past.downloaded)
+        rate = past.relevant / past.downloaded
+        relevant = sum(rng.random() < rate for _ in range(downloaded))
+        return Visit(site, clock[0], budget, downloaded, downloaded, downloaded, relevant, past.homepage_s,
+                     downloaded * past.download_s / past.downloaded, past.errors)
+
+    summary = []
+    for run in range(runs):
+        clock[0] = start + (run + 1) * every_hours * 3600
+        plan = sim.plan(sites, max_articles, min_link_seconds)
+        visits = [outcome(site, plan.budgets[site]) for site in plan.sites]
+        sim._visits = {v.site: v for v in visits}
+        sim.finish()
+        fixed = [outcome(site, max_articles) for site in sites]
+        summary.append({"run": run + 1, "sites": len(plan.sites), "backoff": sum(r == "backoff" for r in plan.deferred.values()),
+                        "budget": sum(r == "budget" for r in plan.deferred.values()),
+                        "downloads": sum(v.downloaded for v in visits), "relevant": sum(v.relevant for v in visits),
+                        "seconds": sum(max(v.seconds, v.homepage_s + v.downloaded * min_link_seconds) for v in visits),
+                        "fixed_downloads": sum(v.downloaded for v in fixed), "fixed_relevant": sum(v.relevant for v in fixed),
+                        "fixed_seconds": sum(max(v.seconds, v.homepage_s + v.downloaded * min_link_seconds) for v in fixed)})
+    return summary
+
+
+_scheduler: Optional[SiteScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_site_scheduler() -> Optional[SiteScheduler]:
+    """The process-wide scheduler, or None when SAFEGUARD_SITE_SCHEDULE=off."""
+    global _scheduler
+    if SCHEDULE_PATH.lower() in ("off", "none", ""):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SiteScheduler(SCHEDULE_PATH)
+        return _scheduler
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--path", default=SCHEDULE_PATH)
+    ap.add_argument("--max-articles", type=int, default=10, help="article links per site, as passed to the crawl")
+    ap.add_argument("--budget", type=float, default=RUN_BUDGET_SECONDS, help="run time budget in seconds (0 = none)")
+    ap.add_argument("--link-seconds", type=float, default=2.0, help="polite gap between requests to one host")
+    ap.add_argument("--dry-run", action="store_true", help="simulate the coming runs from the recorded history")
+    ap.add_argument("--runs", type=int, default=24)
+    ap.add_argument("--every", type=float, default=60, help="minutes between runs")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"No visit history at {args.path} – every site will be crawled with {args.max_articles} links.")
+        return 0
+    scheduler = SiteScheduler(args.path, run_budget_seconds=args.budget)
+    sites = sorted(scheduler.history)
+    print(f"{'site':45s} {'visits':>6} {'relevant/downloaded':>20} {'empty streak':>12} {'last visit':>17}")
+    for site in sites:
+        s = scheduler.stats(site)
+        print(f"{site:45s} {s.visits:>6} {f'{s.relevant}/{s.downloaded}':>20} {s.empty_streak:>12} "
+              f"{datetime.fromtimestamp(s.last_visit):%Y-%m-%d %H:%M}")
+    plan = scheduler.plan(sites, args.max_articles, args.link_seconds)
+    scheduler.print_plan(plan)
+
+    if args.dry_run:
+        rows = simulate(scheduler, sites, args.runs, args.every / 60, args.max_articles, args.link_seconds, args.seed)
+        print(f"\nDry run, {args.runs} runs every {args.every:.0f} minutes (fixed = every site, "
+              f"{args.max_articles} links, every run):")
+        print(f"{'run':>4} {'sites':>5} {'backoff':>7} {'budget':>6} {'downloads':>9} {'relevant':>8} {'seconds':>8}"
+              f" | {'fixed downloads':>15} {'relevant':>8} {'seconds':>8}")
+        for r in rows:
+            print(f"{r['run']:>4} {r['sites']:>5} {r['backoff']:>7} {r['budget']:>6} {r['downloads']:>9} "
+                  f"{r['relevant']:>8} {r['seconds']:>8.0f} | {r['fixed_downloads']:>15} {r['fixed_relevant']:>8} "
+                  f"{r['fixed_seconds']:>8.0f}")
+        total = {k: sum(r[k] for r in rows) for k in rows[0] if k != "run"} if rows else {}
+        if total:
+            print(f"total: {total['downloads']} downloads / {total['relevant']} relevant / {total['seconds']:.0f}s "
+                  f"vs fixed {total['fixed_downloads']} / {total['fixed_relevant']} / {total['fixed_seconds']:.0f}s")
+    scheduler.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -143,6 +143,7 @@ export type Database = {
       scraped_articles: {
         Row: {
           article_url: string
+          cluster_id: string | null
           created_at: string | null
           entities: string | null
           full_text: string | null
@@ -157,6 +158,7 @@ export type Database = {
         }
         Insert: {
           article_url: string
+          cluster_id?: string | null
           created_at?: string | null
           entities?: string | null
           full_text?: string | null
@@ -171,6 +173,7 @@ export type Database = {
         }
         Update: {
           article_url?: string
+          cluster_id?: string | null
           created_at?: string | null
           entities?: string | null
           full_text?: string | null
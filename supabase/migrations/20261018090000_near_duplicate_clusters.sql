@@ -0,0 +1,7 @@
+-- Near-duplicate cluster of each article / tweet (near_duplicates.py): syndicated copies of a
+-- story and copy-pasted threat texts share one cluster_id
+ALTER TABLE IF EXISTS public.scraped_articles ADD COLUMN IF NOT EXISTS cluster_id TEXT;
+ALTER TABLE IF EXISTS public.twitter_threats ADD COLUMN IF NOT EXISTS cluster_id TEXT;
+
+-- Grouping the copies of a story together
+CREATE INDEX IF NOT EXISTS idx_scraped_articles_cluster_id ON public.scraped_articles(cluster_id);
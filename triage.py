@@ -0,0 +1,98 @@
+"""
+Two-tier triage in front of the NLP models.
+
+Tier 1 is a cheap gate – for tweets, one KeywordMatcher pass that scores threat terms and
+locations. Tier 2 folds near-identical texts (retweets, copy-pasted alerts that differ only in
+links, mentions or punctuation) onto one representative, also across pages when the caller
+passes the keys it has already analyzed. Passing a near_duplicates.NearDuplicateIndex-backed
+`key` folds looser copies too (a changed word, an added hashtag), across runs. Only the
+distinct survivors go to the models, in one batched call, and every survivor reuses its
+representative's result.
+
+TriageStats keeps the per-tier pass rates, so the report shows how much inference the gate
+and the dedupe save.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Callable, Container, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+G = TypeVar("G")
+
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_MENTION = re.compile(r"(?:^|\s)(?:rt\s+)?@\w+:?")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def dedupe_text(text: str) -> str:
+    """The text without case, URLs, @mentions, an RT prefix or punctuation – what copies share."""
+    text = text.lower()
+    # Most article text has neither – skip the scans
+    if "http" in text or "www." in text:
+        text = _URL.sub(" ", text)
+    if "@" in text:
+        text = _MENTION.sub(" ", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def near_duplicate_key(text: str) -> str:
+    """Same key for texts that differ only in case, URLs, @mentions, an RT prefix or punctuation."""
+    return hashlib.blake2b(dedupe_text(text).encode("utf-8"), digest_size=12).hexdigest()
+
+
+@dataclass
+class TriageStats:
+    received: int = 0
+    passed_gate: int = 0
+    distinct: int = 0
+
+    def add(self, other: "TriageStats"):
+        self.received += other.received
+        self.passed_gate += other.passed_gate
+        self.distinct += other.distinct
+
+    def pass_rates(self) -> Dict[str, float]:
+        return {
+            "gate": self.passed_gate / self.received if self.received else 0.0,
+            "dedupe": self.distinct / self.passed_gate if self.passed_gate else 0.0,
+            "overall": self.distinct / self.received if self.received else 0.0,
+        }
+
+    def summary(self) -> str:
+        rates = self.pass_rates()
+        return (f"{self.received} in, {self.passed_gate} past the keyword gate ({rates['gate']:.0%}), "
+                f"{self.distinct} distinct sent to NLP ({rates['overall']:.0%} of input)")
+
+
+@dataclass
+class Survivor(Generic[T, G]):
+    item: T
+    gate: G
+    key: str  # near-duplicate key – the NLP result for it is shared by every copy
+
+
+def triage(items: Sequence[T], gate: Callable[[str], Optional[G]], text_of: Callable[[T], str] = str,
+           known: Container[str] = (), key: Callable[[str], str] = near_duplicate_key
+           ) -> Tuple[List[Survivor], Dict[str, str], TriageStats]:
+    """
+    Runs items through both tiers. gate(text) returns None to drop an item, or anything else
+    (e.g. its threat score) to keep it. `known` holds keys already analyzed earlier (e.g. in
+    this scan's previous pages). Returns the survivors, key -> text for the distinct texts that
+    still need NLP, and this batch's stats.
+    """
+    stats = TriageStats(received=len(items))
+    survivors: List[Survivor] = []
+    to_analyze: Dict[str, str] = {}
+    for item in items:
+        text = text_of(item)
+        verdict = gate(text)
+        if verdict is None:
+            continue
+        stats.passed_gate += 1
+        k = key(text)
+        if k not in known and k not in to_analyze:
+            to_analyze[k] = text
+        survivors.append(Survivor(item, verdict, k))
+    stats.distinct = len(to_analyze)
+    return survivors, to_analyze, stats
@@ -4,27 +4,23 @@ import time
 import hashlib
 import json
 import schedule
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import deque
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from dotenv import load_dotenv
 
-# AI/ML Dependencies
-try:
-    from transformers import pipeline
-    SENTIMENT_MODEL = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
-    sentiment_pipeline = pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
-    SENTIMENT_AVAILABLE = True
-
-    NER_MODEL = "Davlan/bert-base-multilingual-cased-ner-hrl"
-    ner_pipeline = pipeline("ner", model=NER_MODEL, aggregation_strategy="simple")
-    NER_AVAILABLE = True
-except Exception:
-    sentiment_pipeline = None
-    SENTIMENT_AVAILABLE = False
-    ner_pipeline = None
-    NER_AVAILABLE = False
+# AI/ML Dependencies – pipelines load lazily on first use, see inference.get_engine
+from inference import get_engine
+from analysis_cache import get_cache
+from keyword_matcher import KeywordMatcher, load_lexicon
+from bulk_writer import BulkWriter, SupabaseTransport
+from metrics import get_metrics, new_run, print_stage_summary
+from rate_limiter import RateLimiter, SearchScheduler
+from query_planner import KeywordAttributor, QueryPlan, SearchTruncated, plan_queries, search_all
+from scan_checkpoint import QueryCheckpoint, RecentHashes
+from triage import TriageStats, near_duplicate_key, triage
+from near_duplicates import get_near_dup_index
+import replay
 
 # Supabase
 try:
@@ -42,10 +38,19 @@ class Config:
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-    MAX_RESULTS = 10
-    DELAY_BETWEEN_SEARCHES = (8, 15)
+    # Keywords and locations are packed into as few queries as MAX_QUERY_LENGTH allows;
+    # each query is paged through (MAX_RESULTS tweets per page, up to MAX_PAGES pages)
+    MAX_RESULTS = 100
+    MAX_PAGES = 3
+    MAX_QUERY_LENGTH = 512
+    SEARCH_LANGS = ["en", "sw"]
     FREE_TIER_LIMIT = 150
     RATE_WINDOW_MINUTES = 15
+    SEARCH_WORKERS = 4
+    RECENT_HASHES = 50_000
+
+    DB_BATCH_SIZE = 50
+    DB_FLUSH_SECONDS = 10
 
     KENYAN_LOCATIONS = [
         'nairobi', 'mombasa', 'kisumu', 'nakuru', 'eldoret', 'thika', 
@@ -62,8 +67,10 @@ class Config:
 # ============================================================================
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, metrics=None):
         self.supabase = None
+        self.writer = None
+        self.metrics = metrics
         self.local_backup = deque(maxlen=1000)
         self._connect()
 
@@ -73,18 +80,24 @@ class DatabaseManager:
                 self.supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
             except Exception:
                 self.supabase = None
+        if self.supabase:
+            # Batched, retried upserts; unsent batches are spooled to disk and replayed on the next start
+            self.writer = BulkWriter(SupabaseTransport(self.supabase), "twitter_threats", on_conflict="tweet_hash",
+                                     batch_size=Config.DB_BATCH_SIZE, flush_interval=Config.DB_FLUSH_SECONDS,
+                                     metrics=self.metrics)
 
     def save_threat(self, record: Dict):
-        if self.supabase:
-            try:
-                # Convert created_at to string if it's datetime for JSON safety
-                if isinstance(record.get("created_at"), datetime):
-                    record["created_at"] = record["created_at"].isoformat()
-                self.supabase.table("twitter_threats").upsert(record, on_conflict="tweet_hash").execute()
-            except Exception:
-                pass
+        if self.writer:
+            # Convert created_at to string if it's datetime for JSON safety
+            if isinstance(record.get("created_at"), datetime):
+                record["created_at"] = record["created_at"].isoformat()
+            self.writer.write(record)
         self.local_backup.append({**record, "saved_at": datetime.now().isoformat()})
 
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
     def export_backup(self, filename="safeguard_backup.json"):
         if self.local_backup:
             with open(filename, 'w', encoding='utf-8') as f:
@@ -92,129 +105,270 @@ class DatabaseManager:
 
 # ============================================================================
 
+# Threat terms (lexicon.json) and Kenyan locations, compiled once and scanned in one pass per tweet
+THREAT_MATCHER = KeywordMatcher({**load_lexicon()["threat_levels"], "location": Config.KENYAN_LOCATIONS})
+
+
 class ThreatAnalyzer:
+    THRESHOLD = 50
+
     @staticmethod
     def analyze_threat(text: str) -> Dict:
-        lower = text.lower()
-        critical = ['kill', 'kukuua', 'nitakuua', 'murder', 'mauaji', 'kuuawa', 'attack', 'shambulio', 'stab', 'choma', 'shoot', 'piga risasi']
-        high = ['rape', 'assault', 'battery', 'kubaka', 'kutesa', 'femicide', 'death threat', 'tisho la kifo', 'violence', 'vurugu']
-        medium = ['beat', 'hurt', 'napiga', 'nitakupiga', 'threaten', 'harass', 'molest', 'stalk', 'blackmail', 'trafficking']
+        return ThreatAnalyzer.score_hits(THREAT_MATCHER.scan(text))
 
+    @staticmethod
+    def score_hits(hits) -> Dict:
         score, category = 0, "neutral"
-        if any(w in lower for w in critical):
+        if hits.counts.get("critical"):
             score, category = 85, "critical_threat"
-        elif any(w in lower for w in high):
+        elif hits.counts.get("high"):
             score, category = 75, "high_threat"
-        elif any(w in lower for w in medium):
+        elif hits.counts.get("medium"):
             score, category = 60, "medium_threat"
 
-        if any(loc in lower for loc in Config.KENYAN_LOCATIONS):
+        if hits.counts.get("location"):
             score = min(95, score + 10)
         return {"threat_score": score, "threat_category": category}
 
     @staticmethod
     def analyze_sentiment(text: str) -> Dict:
-        if not SENTIMENT_AVAILABLE:
-            return {"sentiment": "N/A", "sentiment_score": 0.0}
+        return ThreatAnalyzer.analyze_sentiments([text])[0]
+
+    @staticmethod
+    def analyze_entities(text: str) -> str:
+        return ThreatAnalyzer.analyze_entities_batch([text])[0]
+
+    @staticmethod
+    def analyze_sentiments(texts: List[str]) -> List[Dict]:
+        nlp_engine = get_engine()
+        if not nlp_engine.sentiment_available:
+            return [{"sentiment": "N/A", "sentiment_score": 0.0} for _ in texts]
         try:
-            result = sentiment_pipeline(text[:512])[0]
-            label = result.get("label", "N/A").capitalize()
-            score = round(float(result.get("score", 0.0)), 3)
-            return {"sentiment": label, "sentiment_score": score}
+            results = nlp_engine.sentiments(texts)
         except Exception:
-            return {"sentiment": "Error", "sentiment_score": 0.0}
+            results = [None] * len(texts)
+        return [r or {"sentiment": "Error", "sentiment_score": 0.0} for r in results]
 
     @staticmethod
-    def analyze_entities(text: str) -> str:
-        if not NER_AVAILABLE:
-            return ""
+    def analyze_entities_batch(texts: List[str]) -> List[str]:
+        nlp_engine = get_engine()
+        if not nlp_engine.ner_available:
+            return [""] * len(texts)
+        try:
+            results = nlp_engine.entities(texts)
+        except Exception:
+            results = [None] * len(texts)
+        return [r or "" for r in results]
+
+    @staticmethod
+    def analyze_batch(texts: List[str]) -> List[Tuple[Dict, str]]:
+        """(sentiment, entities) per text – both models in one engine call when both are loaded."""
+        nlp_engine = get_engine()
+        if not (nlp_engine.sentiment_available and nlp_engine.ner_available):
+            return list(zip(ThreatAnalyzer.analyze_sentiments(texts), ThreatAnalyzer.analyze_entities_batch(texts)))
         try:
-            ents = ner_pipeline(text[:1400])
-            return " | ".join(set([f"{e['entity_group']}: {e['word']}" for e in ents if e['score'] > 0.8]))
+            results = nlp_engine.analyze(texts)
         except Exception:
-            return ""
+            results = [None] * len(texts)
+        return [({"sentiment": r["sentiment"], "sentiment_score": r["sentiment_score"]}, r["entities"] or "")
+                if r else ({"sentiment": "Error", "sentiment_score": 0.0}, "") for r in results]
 
 # ============================================================================
 
-class RateLimitTracker:
-    def __init__(self):
-        self.requests = deque(maxlen=Config.FREE_TIER_LIMIT)
+class LimitedClient(tweepy.Client):
+    """tweepy.Client whose every request (pagination included) draws from a RateLimiter."""
 
-    def add_request(self):
-        self.requests.append(datetime.now())
+    def __init__(self, limiter: RateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
 
-    def should_wait(self) -> float:
-        cutoff = datetime.now() - timedelta(minutes=Config.RATE_WINDOW_MINUTES)
-        recent = [r for r in self.requests if r > cutoff]
-        if len(recent) >= Config.FREE_TIER_LIMIT - 5:
-            oldest = min(self.requests)
-            wait_until = oldest + timedelta(minutes=Config.RATE_WINDOW_MINUTES)
-            return max(0, (wait_until - datetime.now()).total_seconds()) + 10
-        return 0
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        self.limiter.acquire()
+        headers = None
+        try:
+            response = super().request(method, route, params=params, json=json, user_auth=user_auth)
+            headers = response.headers
+            return response
+        except tweepy.HTTPException as e:
+            headers = e.response.headers
+            raise
+        finally:
+            self.limiter.release(headers)
 
 # ============================================================================
 
 class TwitterClient:
-    def __init__(self):
+    def __init__(self, limiter: RateLimiter = None):
         if not Config.TWITTER_BEARER_TOKEN:
             raise RuntimeError("Missing TWITTER_BEARER_TOKEN")
-        self.client = tweepy.Client(bearer_token=Config.TWITTER_BEARER_TOKEN, wait_on_rate_limit=True)
-        self.rate_tracker = RateLimitTracker()
-
-    def search_keyword(self, keyword: str) -> List:
-        wait_time = self.rate_tracker.should_wait()
-        if wait_time > 0:
-            time.sleep(wait_time)
-
-        location_string = " OR ".join(Config.KENYAN_LOCATIONS[:5])
-        query = f'"{keyword}" ({location_string}) -is:retweet lang:en OR lang:sw'
+        self.limiter = limiter or RateLimiter(Config.FREE_TIER_LIMIT, Config.RATE_WINDOW_MINUTES * 60)
+        # The limiter does the waiting, so tweepy must not sleep on a 429 itself
+        self.client = LimitedClient(self.limiter, bearer_token=Config.TWITTER_BEARER_TOKEN, wait_on_rate_limit=False)
+        # Search pages are saved / served from fixtures under SAFEGUARD_RECORD_DIR / SAFEGUARD_REPLAY_DIR
+        replay.install(self.client.session)
+
+    def _search_page(self, **search_args):
+        # A 429 has already told the limiter when the window resets – the retry waits for it
         try:
-            response = self.client.search_recent_tweets(
-                query=query,
-                max_results=Config.MAX_RESULTS,
-                tweet_fields=["id", "text", "created_at", "lang"]
-            )
-            self.rate_tracker.add_request()
-            return response.data or []
+            return self.client.search_recent_tweets(**search_args)
+        except tweepy.TooManyRequests:
+            return self.client.search_recent_tweets(**search_args)
+
+    def search(self, plan: QueryPlan, since_id: str = None, until_id: str = None) -> Tuple[List, bool]:
+        """
+        The query's tweets (newer than since_id and older than until_id, if given), and whether
+        that's all of them: False when a page failed, or when there were more than MAX_PAGES pages.
+        """
+        tweets = []
+        search_args = {"tweet_fields": ["id", "text", "created_at", "lang"]}
+        if since_id:
+            search_args["since_id"] = since_id
+        if until_id:
+            search_args["until_id"] = until_id
+        try:
+            for tweet in search_all(self._search_page, plan, Config.MAX_RESULTS, Config.MAX_PAGES, **search_args):
+                tweets.append(tweet)
+        except SearchTruncated:
+            return tweets, False  # the tweets between since_id and the last page are still missing
         except Exception:
-            return []
+            return tweets, False  # keep the pages we already have
+        return tweets, True
+
+# ============================================================================
+
+def tweet_hash(tweet) -> str:
+    return hashlib.sha256(str(tweet.id).encode()).hexdigest()[:16]
+
+
+# Tweets handled by this process recently – survives across scheduled scans
+RECENT_TWEETS = RecentHashes(Config.RECENT_HASHES)
+
+# Copies of a threat text that differ by a word, a hashtag or a link share a near-duplicate cluster
+# (near_duplicates.py), analyzed once across scans. Bump when the models change
+CLUSTER_RESULT_KIND = "tweet-nlp-v1"
 
 # ============================================================================
 
 class SafeGuardScanner:
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, metrics=None):
+        self.metrics = metrics or get_metrics("twitter", breakdown="query")
+        self.db = DatabaseManager(self.metrics)
         self.analyzer = ThreatAnalyzer()
         self.twitter = TwitterClient() if Config.TWITTER_BEARER_TOKEN else None
+        self.scheduler = SearchScheduler(Config.SEARCH_WORKERS)
+        self.plans = plan_queries(Config.KEYWORDS, Config.KENYAN_LOCATIONS, Config.SEARCH_LANGS,
+                                  max_length=Config.MAX_QUERY_LENGTH)
+        self.attributor = KeywordAttributor(Config.KEYWORDS)
+        self.triage_stats = TriageStats()
+        # Near-duplicate key -> (sentiment, entities), so copies on later pages reuse the result
+        self._nlp_results: Dict[str, Tuple[Dict, str]] = {}
+        # Newest tweet id per query, so each scan only asks for tweets posted since the last one,
+        # plus the ranges a truncated search didn't reach, searched again until they're filled
+        self.checkpoint = QueryCheckpoint()
+
+    def use_metrics(self, metrics):
+        """Points a long-lived scanner at a fresh per-scan metrics collector."""
+        self.metrics = metrics
+        self.db.metrics = metrics
+        if self.db.writer:
+            self.db.writer.metrics = metrics
 
     def run(self):
         if not self.twitter:
             return
+        self.triage_stats = TriageStats()
+        self._nlp_results = {}
+
+        # One search per query for new tweets, one per gap an earlier truncated search left. They run
+        # concurrently; the rate limiter only makes them wait once the window's budget is spent
+        searches = [(plan, window) for plan in self.plans for window in self.checkpoint.windows(plan.query)]
+        for (plan, window), (tweets, complete) in self.scheduler.run(self._search, searches):
+            self.metrics.count("tweets_fetched", len(tweets), key=plan.label)
+            # Overlapping queries, and scans whose checkpoint wasn't saved, return tweets we already handled
+            fresh = [t for t in tweets if RECENT_TWEETS.add(tweet_hash(t))]
+            if len(fresh) < len(tweets):
+                self.metrics.skip("duplicate", key=plan.label, n=len(tweets) - len(fresh))
+            self._process_tweets(fresh, plan)
+            # An incomplete search still moves the checkpoint, leaving the part it didn't reach as a gap
+            self.checkpoint.advance(plan.query, tweets, complete, window)
+        # Saved only once the threats are out of the writer's buffer (sent, or spooled to disk) –
+        # a crash before that repeats the scan instead of skipping its tweets
+        if self.db.writer:
+            self.db.writer.flush()
+        self.checkpoint.save()
+
+    def _search(self, search: Tuple[QueryPlan, Tuple]) -> Tuple[List, bool]:
+        plan, (since_id, until_id) = search
+        with self.metrics.timer("search", plan.label):
+            return self.twitter.search(plan, since_id=since_id, until_id=until_id)
+
+    def close(self):
+        self.scheduler.close()
+        self.db.close()
+
+    def _gate(self, text: str):
+        """Tier 1: one matcher pass per tweet; returns (threat, hits) for tweets worth analyzing."""
+        hits = THREAT_MATCHER.scan(text)
+        threat = self.analyzer.score_hits(hits)
+        return (threat, hits) if threat["threat_score"] > self.analyzer.THRESHOLD else None
+
+    def _process_tweets(self, tweets: List, plan: QueryPlan):
+        metrics = self.metrics
+        index = get_near_dup_index("tweets")
+        # Keyword gate, then near-duplicate folding – only distinct survivors reach the models. With
+        # the index, a survivor's key is its cluster id, so looser copies fold too
+        key = near_duplicate_key
+        if index is not None:
+            key = lambda text: index.assign(near_duplicate_key(text), text, commit=False).cluster_id
+        with metrics.timer("keywords", plan.label):
+            survivors, to_analyze, stats = triage(tweets, self._gate, text_of=lambda t: t.text,
+                                                  known=self._nlp_results, key=key)
+        if index is not None:
+            index.commit()
+            # Clusters analyzed in an earlier scan
+            stored = index.results(list(to_analyze), CLUSTER_RESULT_KIND)
+            self._nlp_results.update((k, tuple(v)) for k, v in stored.items())
+            to_analyze = {k: t for k, t in to_analyze.items() if k not in stored}
+            stats.distinct = len(to_analyze)
+        self.triage_stats.add(stats)
+        metrics.count("triage_in", stats.received, key=plan.label)
+        metrics.count("triage_gate_passed", stats.passed_gate, key=plan.label)
+        metrics.count("triage_distinct", stats.distinct, key=plan.label)
+        if stats.received > stats.passed_gate:
+            metrics.skip("below_threshold", key=plan.label, n=stats.received - stats.passed_gate)
+        if stats.passed_gate > stats.distinct:
+            metrics.skip("near_duplicate_nlp", key=plan.label, n=stats.passed_gate - stats.distinct)
+        if not survivors:
+            return
 
-        for keyword in Config.KEYWORDS:
-            tweets = self.twitter.search_keyword(keyword)
-            self._process_tweets(tweets, keyword)
-            time.sleep(random.uniform(*Config.DELAY_BETWEEN_SEARCHES))
-
-    def _process_tweets(self, tweets: List, keyword: str):
-        for tweet in tweets:
-            threat = self.analyzer.analyze_threat(tweet.text)
-            if threat["threat_score"] <= 50:
-                continue
-            sentiment = self.analyzer.analyze_sentiment(tweet.text)
-            entities = self.analyzer.analyze_entities(tweet.text)
-
+        # One batched call runs both models over every distinct survivor of the page
+        if to_analyze:
+            with metrics.timer("nlp"):
+                analyses = self.analyzer.analyze_batch(list(to_analyze.values()))
+            self._nlp_results.update(zip(to_analyze, analyses))
+            if index is not None:
+                index.put_results(CLUSTER_RESULT_KIND, {k: a for k, a in zip(to_analyze, analyses)
+                                                        if a[0]["sentiment"] not in ("N/A", "Error")})
+        metrics.count("threats_saved", len(survivors), key=plan.label)
+
+        for survivor in survivors:
+            tweet, (threat, hits) = survivor.item, survivor.gate
+            sentiment, ents = self._nlp_results[survivor.key]
+            if metrics.enabled:
+                metrics.keyword_hits(hits.terms)
             record = {
-                "tweet_hash": hashlib.sha256(str(tweet.id).encode()).hexdigest()[:16],
-                "keyword_trigger": keyword,
+                "tweet_hash": tweet_hash(tweet),
+                # Every search keyword the tweet contains, e.g. "gbv | domestic violence"
+                "keyword_trigger": self.attributor.trigger(tweet.text, plan),
                 "content": tweet.text[:500],
                 "created_at": str(tweet.created_at),
                 "threat_score": threat["threat_score"],
                 "threat_category": threat["threat_category"],
                 "sentiment_label": sentiment["sentiment"],
                 "sentiment_score": sentiment["sentiment_score"],
-                "entities": entities,
-                "location_boosted": any(loc in tweet.text.lower() for loc in Config.KENYAN_LOCATIONS)
+                "entities": ents,
+                "location_boosted": bool(hits.counts.get("location")),
+                "cluster_id": survivor.key
             }
             self.db.save_threat(record)
 
@@ -224,23 +378,47 @@ class SafeGuardScanner:
 
 SCAN_INTERVAL_MINUTES = 15  # adjust as needed
 
-def run_scan():
+def run_scan(scanner: SafeGuardScanner = None):
+    """
+    One scan. Pass a long-lived scanner to keep its clients, rate-limit state and writer between
+    scans (see safeguard_service.py); without one a scanner is built and closed for this scan only.
+    """
     print("\n Starting scan at", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    scanner = SafeGuardScanner()
+    metrics = new_run("twitter", breakdown="query")
+    one_shot = scanner is None
+    if one_shot:
+        scanner = SafeGuardScanner(metrics)
+    else:
+        scanner.use_metrics(metrics)
     scanner.run()
+    if scanner.twitter:
+        print(" Triage:", scanner.triage_stats.summary())
+    if one_shot:
+        scanner.close()
     scanner.db.export_backup()
+    if get_cache() is not None:
+        print(" Analysis cache:", get_cache().stats())
+    if metrics.enabled:
+        metrics.finish()
+        print_stage_summary(metrics.report())
     print(" Scan complete\n")
 
-# Initial scan on startup
-run_scan()
 
-# Schedule continuous scans
-schedule.every(SCAN_INTERVAL_MINUTES).minutes.do(run_scan)
+if __name__ == "__main__":
+    # One scanner for the life of the process; for running alongside the news crawl use safeguard_service.py
+    scanner = SafeGuardScanner()
+
+    # Initial scan on startup
+    run_scan(scanner)
 
+    # Schedule continuous scans
+    schedule.every(SCAN_INTERVAL_MINUTES).minutes.do(run_scan, scanner)
 
-try:
-    while True:
-        schedule.run_pending()
-        time.sleep(10)
-except KeyboardInterrupt:
-    print("\n Monitoring stopped by user")
+    try:
+        while True:
+            schedule.run_pending()
+            time.sleep(10)
+    except KeyboardInterrupt:
+        print("\n Monitoring stopped by user")
+    finally:
+        scanner.close()
@@ -1,12 +1,34 @@
-# First, install the Supabase Python client if you haven't already:
-# pip install supabase
-
-# Optional: For a nicer tabular display, install pandas:
-# pip install pandas
+# Pages through the scraped_articles table over Supabase's REST endpoint instead of pulling the
+# whole table (with every full_text) in one response. Only needs requests:
+# pip install requests
+#
+#   python view_scraped_articles.py
+#   python view_scraped_articles.py --since 2025-11-01 --category GBV --site nation.africa
+#   python view_scraped_articles.py --columns id,title,publish_date --limit 200
+#   python view_scraped_articles.py --export archive/ --partition month     # date-partitioned Parquet (sinks.py)
+#   python view_scraped_articles.py --export gbv.csv --category GBV --resume
+#
+# Pages use keyset pagination on the primary key (id=gt.<last id>&order=id.asc), so every page is
+# an index range scan however deep into the table it is – unlike offset pages, which get slower.
+# Date, category and site filters run on the server, and only the selected columns come back
+# (full_text is left out unless asked for). Rows are printed or exported page by page, so memory
+# stays at one page whatever the table size.
+#
+# --resume keeps the last exported id in <export>.cursor and starts after it next time, so repeat
+# exports only fetch new rows. The cursor is only saved when an export finishes – a failed or
+# interrupted one starts over from the previous cursor. Rows updated in place (an upsert hitting
+# an existing article_url) keep their id and aren't picked up again.
 
+import argparse
+import json
 import os
-from supabase import create_client, Client
-import pandas as pd  # Optional: for better table formatting
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+
+from sinks import ARCHIVE_PARTITION, ARCHIVE_PARTITIONS, CsvSink, JsonlSink, PartitionedSink
 
 # Set up your Supabase credentials
 # Replace with your actual Supabase project URL and anon key
@@ -14,35 +36,192 @@ import pandas as pd  # Optional: for better table formatting
 SUPABASE_URL = os.getenv("SUPABASE_URL", "https://aanenqfgmnuosyfbfxbk.supabase.co")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "sb_secret_rZc47DbEIZpLf2nRrnj6ZA_FImuYy0C")
 
-# Initialize the Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 # Table name based on your schema
 TABLE_NAME = 'scraped_articles'
 
-# Fetch all rows from the table
-response = supabase.table(TABLE_NAME).select('*').execute()
+# Supabase answers at most 1000 rows per request by default
+PAGE_SIZE = 1000
+DEFAULT_COLUMNS = ["id", "site_url", "article_url", "title", "publish_date", "keyword_category",
+                   "sentiment", "sentiment_score"]
+MAX_CELL = 60
+
+
+def build_filters(since: Optional[str] = None, until: Optional[str] = None, categories: Sequence[str] = (),
+                  site: Optional[str] = None) -> List[Tuple[str, str]]:
+    """PostgREST query filters for a date range (inclusive), keyword categories and a site."""
+    filters = []
+    if since:
+        filters.append(("publish_date", f"gte.{since}"))
+    if until:
+        filters.append(("publish_date", f"lte.{until}"))
+    if len(categories) == 1:
+        filters.append(("keyword_category", f"eq.{categories[0]}"))
+    elif categories:
+        filters.append(("keyword_category", "in.(" + ",".join(f'"{c}"' for c in categories) + ")"))
+    if site:
+        filters.append(("site_url", f"ilike.*{site}*"))
+    return filters
+
+
+class ArticlePager:
+    def __init__(self, base_url: str = SUPABASE_URL, api_key: str = SUPABASE_KEY, table: str = TABLE_NAME,
+                 key: str = "id", page_size: int = PAGE_SIZE, timeout: float = 60.0, max_retries: int = 3,
+                 session=None):
+        self.url = f"{base_url.rstrip('/')}/rest/v1/{table}"
+        self.key = key
+        self.page_size = page_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = session or requests.Session()
+        self.session.headers.update({"apikey": api_key, "Authorization": f"Bearer {api_key}",
+                                     "Accept": "application/json"})
+        self.stats = {"requests": 0, "rows": 0, "bytes": 0, "retries": 0}
+        self.last_key = None
+
+    def _get(self, params: List[Tuple[str, str]]) -> List[Dict]:
+        for attempt in range(self.max_retries + 1):
+            self.stats["requests"] += 1
+            try:
+                resp = self.session.get(self.url, params=params, timeout=self.timeout)
+            except requests.RequestException:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if resp.status_code < 500 and resp.status_code != 429:
+                    resp.raise_for_status()
+                    self.stats["bytes"] += len(resp.content)
+                    return resp.json()
+                if attempt == self.max_retries:
+                    resp.raise_for_status()
+            self.stats["retries"] += 1
+            time.sleep(0.5 * 2 ** attempt)
+        return []
+
+    def pages(self, columns: Sequence[str] = DEFAULT_COLUMNS, filters: Sequence[Tuple[str, str]] = (),
+              after=None, limit: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Pages of rows in key order, starting after `after`, until the table or `limit` runs out."""
+        # The key has to come back too – it's where the next page starts
+        select = list(columns) if self.key in columns else [self.key] + list(columns)
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = self.page_size if remaining is None else min(self.page_size, remaining)
+            params = [("select", ",".join(select)), ("order", f"{self.key}.asc"), ("limit", str(size))]
+            params += list(filters)
+            if after is not None:
+                params.append((self.key, f"gt.{after}"))
+            rows = self._get(params)
+            if not rows:
+                return
+            after = self.last_key = rows[-1][self.key]
+            self.stats["rows"] += len(rows)
+            if remaining is not None:
+                remaining -= len(rows)
+            yield rows if self.key in columns else [{c: r.get(c) for c in columns} for r in rows]
+            if len(rows) < size:
+                return
+
+    def rows(self, *args, **kwargs) -> Iterator[Dict]:
+        for page in self.pages(*args, **kwargs):
+            yield from page
+
+
+def _cell(value) -> str:
+    text = "" if value is None else str(value).replace("\n", " ")
+    return text if len(text) <= MAX_CELL else text[:MAX_CELL - 1] + "…"
 
-# Check if data was fetched successfully
-if response.data:
-    print("Scraped Articles Table Data:")
-    print("-" * 100)
 
-    # Use pandas for a formatted table display (if available)
+def print_rows(rows: Iterator[Dict], columns: Sequence[str]) -> int:
+    """A markdown-style table, printed as the rows arrive."""
+    count = 0
+    print("| " + " | ".join(columns) + " |")
+    print("| " + " | ".join(["---"] * len(columns)) + " |")
+    for row in rows:
+        print("| " + " | ".join(_cell(row.get(c)) for c in columns) + " |")
+        count += 1
+    return count
+
+
+def open_export(path: str, columns: List[str], partition: str = ARCHIVE_PARTITION):
+    """A sink for --export: .csv, .jsonl, or a directory for the date-partitioned archive."""
+    if path.endswith(".csv"):
+        return CsvSink(path, columns)
+    if path.endswith(".jsonl"):
+        return JsonlSink(path, columns)
+    return PartitionedSink(path, columns=columns, partition=partition)
+
+
+def _read_cursor(path: str):
     try:
-        df = pd.DataFrame(response.data)
-        print(df.to_string(index=False))
-    except ImportError:
-        # Fallback to manual formatting
-        headers = list(response.data[0].keys())
-        print("| " + " | ".join(headers) + " |")
-        print("| " + " | ".join(["---"] * len(headers)) + " |")
-
-        for row in response.data:
-            print("| " + " | ".join(str(row.get(header, '')) for header in headers) + " |")
-
-    print(f"\nTotal rows: {len(response.data)}")
-else:
-    print("No data found in the table or an error occurred.")
-    if hasattr(response, 'error') and response.error:
-        print(f"Error: {response.error}")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("after")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cursor(path: str, after):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"after": after}, f)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Page through the scraped_articles table.")
+    ap.add_argument("--columns", default=",".join(DEFAULT_COLUMNS),
+                    help="comma-separated columns (add full_text to get the article bodies)")
+    ap.add_argument("--since", help="publish_date on or after (YYYY-MM-DD)")
+    ap.add_argument("--until", help="publish_date on or before (YYYY-MM-DD)")
+    ap.add_argument("--category", action="append", default=[], help="keyword_category (repeatable)")
+    ap.add_argument("--site", help="part of site_url, e.g. nation.africa")
+    ap.add_argument("--after", help="start after this id")
+    ap.add_argument("--limit", type=int, help="stop after this many rows")
+    ap.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    ap.add_argument("--export", help="write to a .csv / .jsonl file or an archive directory instead of printing")
+    ap.add_argument("--partition", choices=ARCHIVE_PARTITIONS, default=ARCHIVE_PARTITION,
+                    help="archive directories per publish day or month (exporting to a directory)")
+    ap.add_argument("--resume", action="store_true", help="with --export: continue after the last exported id")
+    ap.add_argument("--url", default=SUPABASE_URL)
+    args = ap.parse_args(argv)
+
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()]
+    pager = ArticlePager(args.url, SUPABASE_KEY, page_size=args.page_size)
+    filters = build_filters(args.since, args.until, args.category, args.site)
+    cursor_path = f"{args.export.rstrip('/')}.cursor" if args.export else None
+    after = args.after
+    if args.resume and cursor_path:
+        after = _read_cursor(cursor_path) or after
+
+    try:
+        if args.export:
+            export_columns = columns
+            if not args.export.endswith((".csv", ".jsonl")) and "publish_date" not in columns:
+                export_columns = columns + ["publish_date"]  # the archive is partitioned by it
+            sink = open_export(args.export, export_columns, args.partition)
+            written = None
+            try:
+                for page in pager.pages(export_columns, filters, after, args.limit):
+                    for row in page:
+                        sink.write(row)
+                    # The pager moves last_key before handing a page out – this is once all of it is written
+                    written = pager.last_key
+            finally:
+                sink.close()
+            if cursor_path and written is not None:
+                _write_cursor(cursor_path, written)
+            print(f"Exported {sink.count} rows to {args.export} ({pager.stats['requests']} requests, "
+                  f"last id {after if written is None else written}).")
+        else:
+            print("Scraped Articles Table Data:")
+            print("-" * 100)
+            count = print_rows(pager.rows(columns, filters, after, args.limit), columns)
+            if count:
+                print(f"\nTotal rows: {count}")
+            else:
+                print("No data found in the table for these filters.")
+    except requests.RequestException as e:
+        print(f"Error reading {TABLE_NAME}: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+A leased work queue in SQLite, shared by crawl worker processes on one box – or, through
+QueueServer, by workers on several.
+
+Items are (kind, JSON payload) rows – a site to crawl, an article URL to download. A worker
+claim()s a batch and holds a lease on it for lease_seconds (extend() renews it while a batch
+is slow); ack() marks items done, fail() puts them back after a growing delay, or marks them
+failed after max_attempts. A worker that dies simply stops renewing: once its lease runs out
+the items are claimable again, and each such reclaim counts as an attempt, so an item that
+kills every worker that takes it ends up failed instead of going round forever.
+
+Items can carry a key – while an item with that key is waiting or leased, putting the same key
+again is a no-op – and a group, the article's host: a claim skips groups that other workers
+hold max_per_group leases in, or finished an item of less than group_gap seconds ago, and takes
+at most per_group items of one group, so a batch spans hosts and per-host politeness holds
+across workers.
+
+Claims run in one BEGIN IMMEDIATE transaction, which SQLite serializes across processes; the
+database runs in WAL mode so counts and stats never block a claim. SQLite must not sit on a
+network file system – for workers on other hosts, run QueueServer next to the file and point
+them at its URL (open_queue accepts either).
+
+    SAFEGUARD_WORK_QUEUE=work_queue.sqlite
+    SAFEGUARD_LEASE_SECONDS=120
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+QUEUE_PATH = os.getenv("SAFEGUARD_WORK_QUEUE", "work_queue.sqlite")
+LEASE_SECONDS = float(os.getenv("SAFEGUARD_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = 4
+RETRY_SECONDS = 30.0
+
+STATES = ("ready", "leased", "done", "failed")
+
+
+@dataclass
+class WorkItem:
+    id: int
+    kind: str
+    payload: Dict
+    key: Optional[str] = None
+    group: Optional[str] = None
+    attempts: int = 0
+    lease_expires: float = 0.0
+
+
+class WorkQueue:
+    def __init__(self, path: str = QUEUE_PATH, name: str = "news", lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS, busy_timeout: float = 30.0):
+        self.path = path
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # Autocommit – every write below opens its own transaction
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS work_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL,
+            item_key TEXT, grp TEXT, priority INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL DEFAULT 'ready',
+            attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_expires REAL, not_before REAL NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL, updated_at REAL NOT NULL, error TEXT)""")
+        self._db.execute("""CREATE UNIQUE INDEX IF NOT EXISTS work_items_live_key ON work_items (queue, item_key)
+            WHERE state IN ('ready', 'leased')""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS work_items_claim ON work_items (queue, state, not_before)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS work_items_leases ON work_items (queue, grp) WHERE state = 'leased'")
+        self._db.execute("CREATE INDEX IF NOT EXISTS work_items_recent ON work_items (queue, updated_at)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _write(self, fn):
+        """Runs fn(db) in one write transaction, taken up front so claims never interleave."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    # -------------------------- Producing --------------------------
+    def put(self, kind: str, payload: Dict, key: Optional[str] = None, group: Optional[str] = None,
+            priority: int = 0, delay: float = 0.0) -> bool:
+        """Adds one item; False when an item with the same key is already waiting or leased."""
+        return self.put_many([(kind, payload, key, group)], priority, delay) == 1
+
+    def put_many(self, items: Iterable[Tuple[str, Dict, Optional[str], Optional[str]]], priority: int = 0,
+                 delay: float = 0.0) -> int:
+        """(kind, payload, key, group) tuples. Returns how many were added."""
+        now = time.time()
+        rows = [(self.name, kind, json.dumps(payload, ensure_ascii=False, default=str), key, group, priority,
+                 now + delay, now, now) for kind, payload, key, group in items]
+
+        def insert(db):
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO work_items (queue, kind, payload, item_key, grp, priority, "
+                           "not_before, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return db.total_changes - before
+        return self._write(insert) if rows else 0
+
+    # -------------------------- Consuming --------------------------
+    def claim(self, worker: str, kinds: Optional[Sequence[str]] = None, limit: int = 1,
+              lease_seconds: Optional[float] = None, per_group: int = 2, max_per_group: int = 1,
+              group_gap: float = 0.0) -> List[WorkItem]:
+        """
+        Leases up to `limit` claimable items – waiting ones whose retry delay has passed, and
+        leased ones whose lease ran out – highest priority, then oldest first.
+        """
+        lease = lease_seconds or self.lease_seconds
+        kinds = list(kinds or [])
+        kind_filter = f"AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+        # Another worker's last request to a host was at the latest when it acked
+        gap_filter = ("AND (grp IS NULL OR grp NOT IN (SELECT grp FROM work_items WHERE queue = ? AND updated_at > ? "
+                      "AND state = 'done' AND owner != ? AND grp IS NOT NULL))") if group_gap > 0 else ""
+
+        def take(db):
+            now = time.time()
+            # Leases that ran out on their last attempt go to the failed pile, not back in the queue
+            db.execute("UPDATE work_items SET state = 'failed', error = 'lease expired', owner = NULL, updated_at = ? "
+                       "WHERE queue = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                       (now, self.name, now, self.max_attempts))
+            rows = db.execute(f"""
+                SELECT id, kind, payload, item_key, grp, attempts FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY grp ORDER BY priority DESC, id) AS nth
+                    FROM work_items
+                    WHERE queue = ? {kind_filter}
+                      AND ((state = 'ready' AND not_before <= ?) OR (state = 'leased' AND lease_expires < ?))
+                      AND (grp IS NULL OR grp NOT IN (
+                          SELECT grp FROM work_items WHERE queue = ? AND state = 'leased' AND lease_expires >= ?
+                            AND owner != ? AND grp IS NOT NULL GROUP BY grp HAVING COUNT(*) >= ?))
+                      {gap_filter}
+                ) WHERE grp IS NULL OR nth <= ?
+                ORDER BY priority DESC, id LIMIT ?""",
+                              [self.name, *kinds, now, now, self.name, now, worker, max_per_group,
+                               *([self.name, now - group_gap, worker] if gap_filter else []), per_group,
+                               limit]).fetchall()
+            if not rows:
+                return []
+            expires = now + lease
+            db.executemany("UPDATE work_items SET state = 'leased', owner = ?, lease_expires = ?, "
+                           "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                           [(worker, expires, now, row[0]) for row in rows])
+            return [WorkItem(id_, kind, json.loads(payload), key, grp, attempts + 1, expires)
+                    for id_, kind, payload, key, grp, attempts in rows]
+        return self._write(take)
+
+    def extend(self, worker: str, ids: Sequence[int], lease_seconds: Optional[float] = None) -> int:
+        """Renews the worker's leases on these items; returns how many it still held."""
+        expires = time.time() + (lease_seconds or self.lease_seconds)
+        return self._update(ids, "lease_expires = ?", (expires,), worker)
+
+    def ack(self, worker: str, ids: Sequence[int]) -> int:
+        """
+        Marks items done. Returns how many were – an item whose lease ran out and was claimed by
+        another worker isn't the caller's to ack any more.
+        """
+        return self._update(ids, "state = 'done', error = NULL", (), worker)  # owner stays, for group_gap
+
+    def release(self, worker: str, ids: Sequence[int]) -> int:
+        """Hands items back untouched (a worker shutting down) – the attempt isn't counted."""
+        return self._update(ids, "state = 'ready', owner = NULL, attempts = attempts - 1", (), worker)
+
+    def fail(self, worker: str, id_: int, error: str, retry_after: float = RETRY_SECONDS) -> Optional[str]:
+        """Puts an item back after retry_after × 2^(attempts-1) seconds, or fails it for good. Returns its new state."""
+        def update(db):
+            row = db.execute("SELECT attempts FROM work_items WHERE id = ? AND owner = ? AND state = 'leased'",
+                             (id_, worker)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            state = "failed" if row[0] >= self.max_attempts else "ready"
+            db.execute("UPDATE work_items SET state = ?, owner = NULL, error = ?, not_before = ?, updated_at = ? "
+                       "WHERE id = ?", (state, error[:500], now + retry_after * 2 ** (row[0] - 1), now, id_))
+            return state
+        return self._write(update)
+
+    def _update(self, ids: Sequence[int], assignments: str, values: tuple, worker: str) -> int:
+        ids = list(ids)
+        if not ids:
+            return 0
+
+        def update(db):
+            changed = 0
+            now = time.time()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                changed += db.execute(
+                    f"UPDATE work_items SET {assignments}, updated_at = ? WHERE id IN ({','.join('?' * len(chunk))}) "
+                    f"AND owner = ? AND state = 'leased'", (*values, now, *chunk, worker)).rowcount
+            return changed
+        return self._write(update)
+
+    # -------------------------- Looking --------------------------
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM work_items WHERE queue = ? GROUP BY state",
+                                    (self.name,)).fetchall()
+        return {state: dict(rows).get(state, 0) for state in STATES}
+
+    def pending(self) -> int:
+        """Items not finished yet – waiting, or leased (possibly by a worker that died)."""
+        counts = self.counts()
+        return counts["ready"] + counts["leased"]
+
+    def failures(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT id, kind, item_key, attempts, error FROM work_items WHERE queue = ? "
+                                    "AND state = 'failed' ORDER BY updated_at DESC LIMIT ?", (self.name, limit))
+            return [dict(zip(("id", "kind", "key", "attempts", "error"), row)) for row in rows]
+
+    def purge(self, older_than_hours: float = 72.0) -> int:
+        """Deletes done and failed items last touched before the cut-off."""
+        cutoff = time.time() - older_than_hours * 3600
+        return self._write(lambda db: db.execute(
+            "DELETE FROM work_items WHERE queue = ? AND state IN ('done', 'failed') AND updated_at < ?",
+            (self.name, cutoff)).rowcount)
+
+
+# -------------------------- Sharing across hosts --------------------------
+_REMOTE_METHODS = ("put_many", "claim", "extend", "ack", "release", "fail", "counts", "pending", "failures", "purge")
+
+
+class QueueServer:
+    """
+    Serves a WorkQueue over HTTP – POST /<method> with the keyword arguments as a JSON object.
+    No authentication: bind it to a private network.
+    """
+
+    def __init__(self, queue: WorkQueue, host: str = "127.0.0.1", port: int = 8765):
+        self.queue = queue
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                method = self.path.strip("/")
+                try:
+                    if method not in _REMOTE_METHODS:
+                        raise AttributeError(f"no method {method!r}")
+                    kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    result = getattr(server.queue, method)(**kwargs)
+                    if method == "claim":
+                        result = [asdict(item) for item in result]
+                    status, body = 200, {"result": result}
+                except Exception as e:
+                    status, body = 400, {"error": f"{type(e).__name__}: {e}"}
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self) -> "QueueServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class RemoteQueue:
+    """The WorkQueue interface for a queue served by QueueServer on another host."""
+
+    def __init__(self, url: str, timeout: float = 30.0, session=None):
+        import requests
+
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def _call(self, method: str, **kwargs):
+        resp = self.session.post(f"{self.url}/{method}", json=kwargs, timeout=self.timeout)
+        body = resp.json()
+        if resp.status_code != 200:
+            raise RuntimeError(f"queue {method} failed: {body.get('error')}")
+        return body["result"]
+
+    def put(self, kind, payload, key=None, group=None, priority=0, delay=0.0) -> bool:
+        return self.put_many([(kind, payload, key, group)], priority, delay) == 1
+
+    def put_many(self, items, priority=0, delay=0.0) -> int:
+        return self._call("put_many", items=[list(item) for item in items], priority=priority, delay=delay)
+
+    def claim(self, worker, kinds=None, limit=1, lease_seconds=None, per_group=2, max_per_group=1,
+              group_gap=0.0) -> List[WorkItem]:
+        return [WorkItem(**item) for item in self._call("claim", worker=worker, kinds=kinds, limit=limit,
+                                                        lease_seconds=lease_seconds, per_group=per_group,
+                                                        max_per_group=max_per_group, group_gap=group_gap)]
+
+    def extend(self, worker, ids, lease_seconds=None) -> int:
+        return self._call("extend", worker=worker, ids=list(ids), lease_seconds=lease_seconds)
+
+    def ack(self, worker, ids) -> int:
+        return self._call("ack", worker=worker, ids=list(ids))
+
+    def release(self, worker, ids) -> int:
+        return self._call("release", worker=worker, ids=list(ids))
+
+    def fail(self, worker, id_, error, retry_after=RETRY_SECONDS):
+        return self._call("fail", worker=worker, id_=id_, error=error, retry_after=retry_after)
+
+    def counts(self) -> Dict[str, int]:
+        return self._call("counts")
+
+    def pending(self) -> int:
+        return self._call("pending")
+
+    def failures(self, limit=20) -> List[Dict]:
+        return self._call("failures", limit=limit)
+
+    def purge(self, older_than_hours=72.0) -> int:
+        return self._call("purge", older_than_hours=older_than_hours)
+
+    def close(self):
+        self.session.close()
+
+
+def open_queue(target: str = QUEUE_PATH, name: str = "news", **kwargs):
+    """A WorkQueue for a file path, a RemoteQueue for an http(s):// URL."""
+    if target.startswith(("http://", "https://")):
+        return RemoteQueue(target)
+    return WorkQueue(target, name, **kwargs)